@@ -58,7 +58,9 @@ class Events:
     def tcp_message(self, flow: mitmproxy.tcp.TCPFlow):
         """
             A TCP connection has received a message. The most recent message
-            will be flow.messages[-1]. The message is user-modifiable.
+            will be flow.messages[-1]. The message is user-modifiable. If
+            tcp_message_interval is set, one event covers the last
+            flow.new_messages messages.
         """
 
     def tcp_error(self, flow: mitmproxy.tcp.TCPFlow):
@@ -61,19 +61,26 @@ def response(flow):
     # -1 indicates that these values do not apply to current request
     ssl_time = -1
     connect_time = -1
+    dns_time = -1
 
     if flow.server_conn and flow.server_conn not in SERVERS_SEEN:
         connect_time = (flow.server_conn.timestamp_tcp_setup -
                         flow.server_conn.timestamp_start)
 
+        if flow.server_conn.timestamp_dns_setup is not None:
+            dns_time = (flow.server_conn.timestamp_dns_setup -
+                        flow.server_conn.timestamp_start)
+            connect_time = (flow.server_conn.timestamp_tcp_setup -
+                            flow.server_conn.timestamp_dns_setup)
+
         if flow.server_conn.timestamp_tls_setup is not None:
             ssl_time = (flow.server_conn.timestamp_tls_setup -
                         flow.server_conn.timestamp_tcp_setup)
 
         SERVERS_SEEN.add(flow.server_conn)
 
-    # Calculate raw timings from timestamps. DNS timings can not be calculated
-    # for lack of a way to measure it. The same goes for HAR blocked.
+    # Calculate raw timings from timestamps. HAR blocked can not be calculated
+    # for lack of a way to measure it.
     # mitmproxy will open a server connection as soon as it receives the host
     # and port from the client connection. So, the time spent waiting is actually
     # spent waiting between request.timestamp_end and response.timestamp_start
@@ -82,6 +89,7 @@ def response(flow):
         'send': flow.request.timestamp_end - flow.request.timestamp_start,
         'receive': flow.response.timestamp_end - flow.response.timestamp_start,
         'wait': flow.response.timestamp_start - flow.request.timestamp_end,
+        'dns': dns_time,
         'connect': connect_time,
         'ssl': ssl_time,
     }
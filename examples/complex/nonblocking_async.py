@@ -0,0 +1,11 @@
+import asyncio
+
+from mitmproxy import ctx
+
+
+async def request(flow):
+    # Async hooks are awaited on the event loop. The flow is held until the
+    # coroutine completes, but other flows are processed in the meantime.
+    ctx.log.info("handle request: %s%s" % (flow.request.host, flow.request.path))
+    await asyncio.sleep(5)
+    ctx.log.info("start  request: %s%s" % (flow.request.host, flow.request.path))
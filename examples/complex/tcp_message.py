@@ -14,14 +14,15 @@ from mitmproxy import tcp
 
 
 def tcp_message(flow: tcp.TCPFlow):
-    message = flow.messages[-1]
-    old_content = message.content
-    message.content = old_content.replace(b"foo", b"bar")
+    # With tcp_message_interval, one event covers several messages.
+    for message in flow.messages[-flow.new_messages:]:
+        old_content = message.content
+        message.content = old_content.replace(b"foo", b"bar")
 
-    ctx.log.info(
-        "[tcp_message{}] from {} to {}:\n{}".format(
-            " (modified)" if message.content != old_content else "",
-            "client" if message.from_client else "server",
-            "server" if message.from_client else "client",
-            strutils.bytes_to_escaped_str(message.content))
-    )
+        ctx.log.info(
+            "[tcp_message{}] from {} to {}:\n{}".format(
+                " (modified)" if message.content != old_content else "",
+                "client" if message.from_client else "server",
+                "server" if message.from_client else "client",
+                strutils.bytes_to_escaped_str(message.content))
+        )
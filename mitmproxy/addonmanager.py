@@ -1,3 +1,4 @@
+import asyncio
 import types
 import typing
 import traceback
@@ -44,7 +45,8 @@ def safecall():
         raise
     except Exception:
         etype, value, tb = sys.exc_info()
-        tb = cut_traceback(tb, "invoke_addon")
+        tb = cut_traceback(tb, "_call_handlers")
+        tb = cut_traceback(tb, "_acall_handlers")
         ctx.log.error(
             "Addon error: %s" % "".join(
                 traceback.format_exception(etype, value, tb)
@@ -99,6 +101,43 @@ class Loader:
         self.master.commands.add(path, func)
 
 
+async def _background(coro):
+    with safecall():
+        await coro
+
+
+def observer(obj):
+    """
+        Mark an addon class or a single hook as an observer. Observers only
+        look at flows and never change them. For events after which the proxy
+        is done with the flow, such as response or tcp_end, they run after the
+        reply has been sent back to the proxy, off the flow's critical path.
+        For all other events, they run after the regular handlers, but
+        before the reply.
+    """
+    obj.observer = True
+    return obj
+
+
+def is_observer(handler) -> bool:
+    if getattr(handler, "observer", False) is True:
+        return True
+    addon = getattr(handler, "__self__", None)
+    return getattr(addon, "observer", False) is True
+
+
+def _settled(name, message) -> bool:
+    """
+        Check whether the proxy is done with a message once its reply is
+        committed, so that observers can look at it in the meantime.
+    """
+    if name not in eventsequence.FinalEvents:
+        return False
+    # The handshake of a WebSocket connection is linked to the WebSocket
+    # flow after its response.
+    return not (isinstance(message, flow.Flow) and message.metadata.get("websocket"))
+
+
 def traverse(chain):
     """
         Recursively traverse an addon chain.
@@ -113,6 +152,10 @@ class AddonManager:
     def __init__(self, master):
         self.lookup = {}
         self.chain = []
+        self._dispatch = {}
+        # If set, lifecycle events are passed to relay(name, message) instead
+        # of the observers, e.g. to observe them in another process.
+        self.relay: typing.Optional[typing.Callable] = None
         self.master = master
         master.options.changed.connect(self._configure_all)
 
@@ -127,6 +170,7 @@ class AddonManager:
             self.invoke_addon(a, "done")
         self.lookup = {}
         self.chain = []
+        self.invalidate()
 
     def get(self, name):
         """
@@ -159,6 +203,7 @@ class AddonManager:
             self.lookup[name] = a
         for a in traverse([addon]):
             self.master.commands.collect_commands(a)
+        self.invalidate()
         self.master.options.process_deferred()
         return addon
 
@@ -169,6 +214,7 @@ class AddonManager:
         """
         for i in addons:
             self.chain.append(self.register(i))
+            self.invalidate()
 
     def remove(self, addon):
         """
@@ -184,6 +230,7 @@ class AddonManager:
                 raise exceptions.AddonManagerError("No such addon: %s" % n)
             self.chain = [i for i in self.chain if i is not a]
             del self.lookup[_get_name(a)]
+        self.invalidate()
         self.invoke_addon(a, "done")
 
     def __len__(self):
@@ -211,7 +258,18 @@ class AddonManager:
         if isinstance(message.reply, controller.DummyReply):
             message.reply.reset()
 
-        self.trigger(name, message)
+        if not self._check_event(name):
+            return
+
+        await self._atrigger(self._dispatch_table(name, observers=False), message)
+
+        # Observers only look at the message, so the requesting party does not
+        # need to wait for them - unless it goes on to change the message.
+        # Relayed messages are serialized right away, so they are relayed
+        # before the reply as well.
+        settled = self.relay is None and _settled(name, message)
+        if not settled:
+            await self._observe(name, message)
 
         if message.reply.state == "start":
             message.reply.take()
@@ -222,20 +280,42 @@ class AddonManager:
             if isinstance(message.reply, controller.DummyReply):
                 message.reply.mark_reset()
 
+        if settled:
+            await self._observe(name, message)
+
         if isinstance(message, flow.Flow):
             self.trigger("update", [message])
 
-    def invoke_addon(self, addon, name, *args, **kwargs):
+    async def _observe(self, name, message):
+        if self.relay:
+            self.relay(name, message)
+        else:
+            await self._atrigger(self._dispatch_table(name, observers=True), message)
+
+    async def observe(self, name, message):
         """
-            Invoke an event on an addon and all its children.
+            Run only the observers for a lifecycle event that has already been
+            handled elsewhere, e.g. by a proxy worker process.
         """
-        if name not in eventsequence.Events:
-            raise exceptions.AddonManagerError("Unknown event: %s" % name)
+        if not self._check_event(name):
+            return
+        await self._atrigger(self._dispatch_table(name, observers=True), message)
+        if isinstance(message, flow.Flow):
+            self.trigger("update", [message])
+
+    def _collect(self, addon, name):
+        """
+            Collect the handlers for an event from an addon and all its
+            children. Returns a (handlers, ok) tuple. If a handler is not
+            callable, the list ends with a function that raises an error
+            and ok is False.
+        """
+        handlers = []
         for a in traverse([addon]):
             func = getattr(a, name, None)
             if func:
                 if callable(func):
-                    func(*args, **kwargs)
+                    handlers.append(func)
                 elif isinstance(func, types.ModuleType):
                     # we gracefully exclude module imports with the same name as hooks.
                     # For example, a user may have "from mitmproxy import log" in an addon,
@@ -243,17 +323,128 @@ class AddonManager:
                     # we end up in an error loop because we "log" this error.
                     pass
                 else:
-                    raise exceptions.AddonManagerError(
-                        "Addon handler {} ({}) not callable".format(name, a)
-                    )
+                    def not_callable(*args, a=a, **kwargs):
+                        raise exceptions.AddonManagerError(
+                            "Addon handler {} ({}) not callable".format(name, a)
+                        )
+                    handlers.append(not_callable)
+                    return handlers, False
+        return handlers, True
+
+    def _dispatch_table(self, name, observers=None):
+        """
+            Returns a list of handler lists for an event, one for each addon in
+            the chain that handles it. If observers is True or False, only
+            observer or only regular handlers are included.
+
+            Tables are cached until the addon chain changes. Tables containing
+            an invalid handler are not cached, so that fixing the handler takes
+            effect immediately.
+        """
+        key = name if observers is None else (name, observers)
+        table = self._dispatch.get(key)
+        if table is None:
+            table = []
+            cacheable = True
+            for i in self.chain:
+                handlers, ok = self._collect(i, name)
+                cacheable = cacheable and ok
+                if observers is not None:
+                    handlers = [h for h in handlers if is_observer(h) == observers]
+                if handlers:
+                    table.append(handlers)
+            if cacheable:
+                self._dispatch[key] = table
+        return table
+
+    def has_subscribers(self, name, message=None) -> bool:
+        """
+            Check whether any addon handles an event. For flows, this includes
+            the "update" event that follows every flow event.
+
+            This is safe to call from outside the event loop. It only consults
+            dispatch tables that have already been built on the loop, and
+            answers True for events that have not been dispatched yet.
+        """
+        if self.relay:
+            return True
+        events = [name, "update"] if isinstance(message, flow.Flow) else [name]
+        return any(self._subscribed(e) for e in events)
+
+    def _subscribed(self, name) -> bool:
+        dispatch = self._dispatch
+        # handle_lifecycle builds separate tables for regular handlers and
+        # observers, trigger() builds one for all handlers.
+        tables = [dispatch.get((name, False)), dispatch.get((name, True))]
+        if None not in tables:
+            return any(tables)
+        table = dispatch.get(name)
+        return table is None or bool(table)
+
+    def invalidate(self):
+        """
+            Discard the cached event dispatch tables. This is done
+            automatically when addons are registered or removed, but has to be
+            called by addons that change their sub-addons in any other way.
+        """
+        self._dispatch = {}
+
+    def _call_handlers(self, handlers, *args, **kwargs):
+        for func in handlers:
+            ret = func(*args, **kwargs)
+            if asyncio.iscoroutine(ret):
+                # We cannot wait for async handlers here, so we run them in
+                # the background.
+                asyncio.ensure_future(_background(ret))
+
+    async def _acall_handlers(self, handlers, *args, **kwargs):
+        for func in handlers:
+            ret = func(*args, **kwargs)
+            if asyncio.iscoroutine(ret):
+                await ret
+
+    def invoke_addon(self, addon, name, *args, **kwargs):
+        """
+            Invoke an event on an addon and all its children.
+        """
+        if name not in eventsequence.Events:
+            raise exceptions.AddonManagerError("Unknown event: %s" % name)
+        handlers, _ = self._collect(addon, name)
+        self._call_handlers(handlers, *args, **kwargs)
+
+    def _check_event(self, name) -> bool:
+        if name not in eventsequence.Events:
+            with safecall():
+                raise exceptions.AddonManagerError("Unknown event: %s" % name)
+            return False
+        return True
 
     def trigger(self, name, *args, **kwargs):
         """
             Trigger an event across all addons.
         """
-        for i in self.chain:
+        if not self._check_event(name):
+            return
+        for handlers in self._dispatch_table(name):
+            try:
+                with safecall():
+                    self._call_handlers(handlers, *args, **kwargs)
+            except exceptions.AddonHalt:
+                return
+
+    async def async_trigger(self, name, *args, **kwargs):
+        """
+            Trigger an event across all addons, and wait for the handlers that
+            are coroutines to complete. Addons are called in order, so a
+            handler only runs once the previous handlers have finished.
+        """
+        if self._check_event(name):
+            await self._atrigger(self._dispatch_table(name), *args, **kwargs)
+
+    async def _atrigger(self, table, *args, **kwargs):
+        for handlers in table:
             try:
                 with safecall():
-                    self.invoke_addon(i, name, *args, **kwargs)
+                    await self._acall_handlers(handlers, *args, **kwargs)
             except exceptions.AddonHalt:
                 return
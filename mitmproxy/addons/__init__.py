@@ -2,6 +2,7 @@ from mitmproxy.addons import anticache
 from mitmproxy.addons import anticomp
 from mitmproxy.addons import block
 from mitmproxy.addons import browser
+from mitmproxy.addons import cert_prewarm
 from mitmproxy.addons import check_ca
 from mitmproxy.addons import clientplayback
 from mitmproxy.addons import core
@@ -29,6 +30,7 @@ def default_addons():
         anticache.AntiCache(),
         anticomp.AntiComp(),
         check_ca.CheckCA(),
+        cert_prewarm.CertPrewarm(),
         clientplayback.ClientPlayback(),
         cut.Cut(),
         disable_h2c.DisableH2C(),
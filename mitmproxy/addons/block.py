@@ -1,8 +1,95 @@
 import ipaddress
+import os
+import typing
+
+from mitmproxy import command
 from mitmproxy import ctx
+from mitmproxy import exceptions
+
+
+class PrefixTrie:
+    """
+        A set of IPv4 and IPv6 networks, stored as binary prefix tries.
+
+        Lookups take at most one step per address bit, independent of the
+        number of networks.
+    """
+    def __init__(self, networks=()):
+        # Nodes are [zero, one] lists of children. A missing child is False,
+        # None marks the end of a network and matches everything below it.
+        self.roots = {4: [False, False], 6: [False, False]}
+        self.count = 0
+        for n in networks:
+            self.add(n)
+
+    def add(self, network: typing.Union[ipaddress.IPv4Network, ipaddress.IPv6Network]) -> None:
+        self.count += 1
+        node = self.roots[network.version]
+        if network.prefixlen == 0:
+            self.roots[network.version] = None
+            return
+        if node is None:
+            return
+        addr = int(network.network_address)
+        bits = network.max_prefixlen
+        for i in range(network.prefixlen - 1):
+            bit = (addr >> (bits - 1 - i)) & 1
+            child = node[bit]
+            if child is None:
+                # A shorter network already covers this one.
+                return
+            if child is False:
+                child = node[bit] = [False, False]
+            node = child
+        node[(addr >> (bits - network.prefixlen)) & 1] = None
+
+    def __contains__(self, address: typing.Union[ipaddress.IPv4Address, ipaddress.IPv6Address]) -> bool:
+        node = self.roots[address.version]
+        addr = int(address)
+        bits = address.max_prefixlen
+        for i in range(bits - 1, -1, -1):
+            if node is None:
+                return True
+            if node is False:
+                return False
+            node = node[(addr >> i) & 1]
+        return node is None
+
+    def __len__(self):
+        return self.count
+
+
+def load_networks(path: str) -> PrefixTrie:
+    """
+        Load networks in CIDR notation from a file, one per line. Empty lines
+        and lines starting with # are ignored.
+
+        Raises:
+            OptionsError, if the file cannot be read or contains an invalid network.
+    """
+    trie = PrefixTrie()
+    try:
+        with open(os.path.expanduser(path)) as f:
+            for lineno, line in enumerate(f, 1):
+                line = line.split("#", 1)[0].strip()
+                if not line:
+                    continue
+                try:
+                    trie.add(ipaddress.ip_network(line, strict=False))
+                except ValueError as e:
+                    raise exceptions.OptionsError(
+                        "Invalid network in %s, line %d: %s" % (path, lineno, e)
+                    )
+    except OSError as e:
+        raise exceptions.OptionsError("Could not read %s: %s" % (path, e))
+    return trie
 
 
 class Block:
+    def __init__(self):
+        self.allow: typing.Optional[PrefixTrie] = None
+        self.deny: typing.Optional[PrefixTrie] = None
+
     def load(self, loader):
         loader.add_option(
             "block_global", bool, True,
@@ -19,6 +106,40 @@ class Block:
             addresses.
             """
         )
+        loader.add_option(
+            "block_list", typing.Optional[str], None,
+            """
+            Block connections from the networks listed in this file, one
+            network in CIDR notation per line.
+            """
+        )
+        loader.add_option(
+            "allow_list", typing.Optional[str], None,
+            """
+            Only accept connections from the networks listed in this file, one
+            network in CIDR notation per line. Connections from these networks
+            are not affected by block_global and block_private. This option
+            does not affect loopback addresses.
+            """
+        )
+
+    def configure(self, updated):
+        if "block_list" in updated or "allow_list" in updated:
+            self.reload()
+
+    @command.command("block.reload")
+    def reload(self) -> None:
+        """
+            Reload the allow_list and block_list files.
+        """
+        allow = deny = None
+        if ctx.options.allow_list:
+            allow = load_networks(ctx.options.allow_list)
+            ctx.log.info("Loaded %d network(s) from %s" % (len(allow), ctx.options.allow_list))
+        if ctx.options.block_list:
+            deny = load_networks(ctx.options.block_list)
+            ctx.log.info("Loaded %d network(s) from %s" % (len(deny), ctx.options.block_list))
+        self.allow, self.deny = allow, deny
 
     def clientconnect(self, layer):
         astr = layer.client_conn.address[0]
@@ -31,9 +152,19 @@ class Block:
         if address.is_loopback:
             return
 
+        if self.deny is not None and address in self.deny:
+            ctx.log.warn("Client connection from %s killed by block_list" % astr)
+            layer.reply.kill()
+            return
+        if self.allow is not None:
+            if address not in self.allow:
+                ctx.log.warn("Client connection from %s killed by allow_list" % astr)
+                layer.reply.kill()
+            return
+
         if ctx.options.block_private and address.is_private:
             ctx.log.warn("Client connection from %s killed by block_private" % astr)
             layer.reply.kill()
         if ctx.options.block_global and address.is_global:
             ctx.log.warn("Client connection from %s killed by block_global" % astr)
-            layer.reply.kill()
\ No newline at end of file
+            layer.reply.kill()
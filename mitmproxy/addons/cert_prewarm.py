@@ -0,0 +1,87 @@
+import ipaddress
+import typing
+
+from mitmproxy import ctx
+from mitmproxy import exceptions
+from mitmproxy import log
+from mitmproxy.coretypes import basethread
+from mitmproxy.net import server_spec
+from mitmproxy.net import tcp
+from mitmproxy.proxy.protocol import tls
+
+
+def is_ip_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+class CertPrewarm:
+    """
+        Generate interception certificates for a list of hosts at startup,
+        so that the first client handshake does not have to wait for them.
+    """
+    def __init__(self):
+        self.addresses: typing.List[typing.Tuple[str, int]] = []
+        self.thread: typing.Optional[basethread.BaseThread] = None
+
+    def configure(self, updated):
+        if "cert_prewarm" in updated:
+            addresses = []
+            for spec in ctx.options.cert_prewarm:
+                try:
+                    addresses.append(server_spec.parse(spec).address)
+                except ValueError as e:
+                    raise exceptions.OptionsError(
+                        "Invalid cert_prewarm specification: {}".format(e)
+                    )
+            self.addresses = addresses
+
+    def running(self):
+        server = ctx.master.server
+        if not (self.addresses and server and server.config and server.config.certstore):
+            return
+        self.thread = basethread.BaseThread(
+            "CertPrewarm",
+            target=self.prewarm,
+            args=(
+                server.config.certstore,
+                list(self.addresses),
+                ctx.options.upstream_cert,
+                ctx.master.channel,
+                ctx.options.cert_prewarm_timeout,
+            ),
+            daemon=True,
+        )
+        self.thread.start()
+
+    def prewarm(self, certstore, addresses, upstream_cert, channel, timeout=None):
+        pending = []
+        for host, port in addresses:
+            cert = None
+            if upstream_cert:
+                cert = self.fetch_cert(host, port, channel, timeout)
+            # Clients do not send SNI for IP addresses.
+            names = [] if is_ip_address(host) else [host.encode("idna")]
+            pending.append(certstore.prewarm(*tls.cert_identity(host.encode("idna"), cert, names)))
+        for f in pending:
+            f.result()
+        channel.tell("log", log.LogEntry(
+            "Pre-generated {} certificate(s).".format(len(pending)), "debug"
+        ))
+
+    def fetch_cert(self, host, port, channel, timeout=None):
+        c = tcp.TCPClient((host, port))
+        try:
+            c.connect(timeout=timeout)
+            c.convert_to_tls(sni=None if is_ip_address(host) else host)
+            return c.cert
+        except exceptions.NetlibException as e:
+            channel.tell("log", log.LogEntry(
+                "Cannot look up certificate details for {}:{}: {}".format(host, port, e), "warn"
+            ))
+            return None
+        finally:
+            c.close()
@@ -58,6 +58,22 @@ class Core:
                     "Invalid body size limit specification: %s" %
                     opts.body_size_limit
                 )
+        if "tcp_message_size_limit" in updated:
+            try:
+                human.parse_size(opts.tcp_message_size_limit)
+            except ValueError:
+                raise exceptions.OptionsError(
+                    "Invalid TCP message size limit specification: %s" %
+                    opts.tcp_message_size_limit
+                )
+        if "websocket_message_size_limit" in updated:
+            try:
+                human.parse_size(opts.websocket_message_size_limit)
+            except ValueError:
+                raise exceptions.OptionsError(
+                    "Invalid WebSocket message size limit specification: %s" %
+                    opts.websocket_message_size_limit
+                )
         if "mode" in updated:
             mode = opts.mode
             if mode.startswith("reverse:") or mode.startswith("upstream:"):
@@ -6,6 +6,7 @@ import shutil
 
 import typing  # noqa
 
+from mitmproxy import addonmanager
 from mitmproxy import contentviews
 from mitmproxy import ctx
 from mitmproxy import exceptions
@@ -26,6 +27,7 @@ def colorful(line, styles):
         yield click.style(text, **styles.get(style, {}))
 
 
+@addonmanager.observer
 class Dumper:
     def __init__(self, outfile=sys.stdout, errfile=sys.stderr):
         self.filter: flowfilter.TFilter = None
@@ -283,12 +285,12 @@ class Dumper:
 
     def tcp_message(self, f):
         if self.match(f):
-            message = f.messages[-1]
-            direction = "->" if message.from_client else "<-"
-            self.echo("{client} {direction} tcp {direction} {server}".format(
-                client=human.format_address(f.client_conn.address),
-                server=human.format_address(f.server_conn.address),
-                direction=direction,
-            ))
-            if ctx.options.flow_detail >= 3:
-                self._echo_message(message)
+            for message in f.messages[-f.new_messages:]:
+                direction = "->" if message.from_client else "<-"
+                self.echo("{client} {direction} tcp {direction} {server}".format(
+                    client=human.format_address(f.client_conn.address),
+                    server=human.format_address(f.server_conn.address),
+                    direction=direction,
+                ))
+                if ctx.options.flow_detail >= 3:
+                    self._echo_message(message)
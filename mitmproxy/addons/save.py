@@ -1,20 +1,25 @@
 import os.path
 import typing
 
+from mitmproxy import addonmanager
 from mitmproxy import command
 from mitmproxy import exceptions
 from mitmproxy import flowfilter
 from mitmproxy import io
 from mitmproxy import ctx
 from mitmproxy import flow
+from mitmproxy import websocket
 import mitmproxy.types
 
 
+@addonmanager.observer
 class Save:
     def __init__(self):
         self.stream = None
         self.filt = None
         self.active_flows: typing.Set[flow.Flow] = set()
+        # The batch of evicted WebSocket messages last written for each flow.
+        self.evicted: typing.Dict[flow.Flow, typing.List[websocket.WebSocketMessage]] = {}
 
     def load(self, loader):
         loader.add_option(
@@ -42,6 +47,7 @@ class Save:
             raise exceptions.OptionsError(str(v))
         self.stream = io.FilteredFlowWriter(f, flt)
         self.active_flows = set()
+        self.evicted = {}
 
     def configure(self, updated):
         # We're already streaming - stop the previous stream and restart
@@ -89,10 +95,28 @@ class Save:
         if self.stream:
             self.active_flows.add(flow)
 
+    def websocket_message(self, flow):
+        if self.stream:
+            self.add_evicted(flow)
+
     def websocket_end(self, flow):
         if self.stream:
+            self.add_evicted(flow)
             self.stream.add(flow)
             self.active_flows.discard(flow)
+            self.evicted.pop(flow, None)
+
+    def add_evicted(self, flow):
+        """
+            Write messages that have been evicted from a WebSocket flow's
+            message window. A batch stays on the flow until the WebSocket
+            layer replaces it after the next message, so it is only written
+            the first time it is seen.
+        """
+        evicted = flow.evicted_messages
+        if evicted and self.evicted.get(flow) is not evicted:
+            self.stream.add_partial(flow, evicted)
+            self.evicted[flow] = evicted
 
     def response(self, flow):
         if self.stream:
@@ -106,7 +130,10 @@ class Save:
     def done(self):
         if self.stream:
             for f in self.active_flows:
+                if isinstance(f, websocket.WebSocketFlow):
+                    self.add_evicted(f)
                 self.stream.add(f)
             self.active_flows = set([])
+            self.evicted = {}
             self.stream.fo.close()
             self.stream = None
@@ -13,6 +13,7 @@ from mitmproxy import flow
 from mitmproxy import command
 from mitmproxy import eventsequence
 from mitmproxy import ctx
+from mitmproxy.script.concurrent import DEFAULT_WORKERS, executor
 import mitmproxy.types as mtypes
 
 
@@ -101,6 +102,7 @@ class Script:
             ns = load_script(self.fullpath)
             ctx.master.addons.register(ns)
             self.ns = ns
+        ctx.master.addons.invalidate()
         if self.ns:
             ctx.master.addons.invoke_addon(
                 self.ns,
@@ -138,6 +140,19 @@ class ScriptLoader:
             "scripts", typing.Sequence[str], [],
             "Execute a script."
         )
+        loader.add_option(
+            "concurrent_workers", int, DEFAULT_WORKERS,
+            "Number of threads shared by all hooks using the @concurrent decorator."
+        )
+        loader.add_option(
+            "concurrent_queue_size", int, 0,
+            """
+            Maximum number of @concurrent hook invocations waiting for a free
+            thread. If the queue is full, further invocations are held back
+            until there is room, and the connections that triggered them wait
+            for their reply. 0 means unbounded.
+            """
+        )
 
     def running(self):
         self.is_running = True
@@ -166,6 +181,13 @@ class ScriptLoader:
                         ctx.master.addons.invoke_addon(mod, evt, arg)
 
     def configure(self, updated):
+        if "concurrent_workers" in updated or "concurrent_queue_size" in updated:
+            if ctx.options.concurrent_workers < 1:
+                raise exceptions.OptionsError("concurrent_workers must be at least 1.")
+            executor.configure(
+                ctx.options.concurrent_workers,
+                ctx.options.concurrent_queue_size,
+            )
         if "scripts" in updated:
             for s in ctx.options.scripts:
                 if ctx.options.scripts.count(s) > 1:
@@ -198,6 +220,7 @@ class ScriptLoader:
                     newscripts.append(sc)
 
             self.addons = ordered
+            ctx.master.addons.invalidate()
 
             for s in newscripts:
                 ctx.master.addons.register(s)
@@ -1,6 +1,7 @@
 import sys
 import click
 
+from mitmproxy import addonmanager
 from mitmproxy import log
 from mitmproxy import ctx
 
@@ -10,6 +11,7 @@ realstdout = sys.stdout
 realstderr = sys.stderr
 
 
+@addonmanager.observer
 class TermLog:
     def __init__(self, outfile=None):
         self.outfile = outfile
@@ -15,6 +15,7 @@ import blinker
 import sortedcontainers
 
 import mitmproxy.flow
+from mitmproxy import addonmanager
 from mitmproxy import flowfilter
 from mitmproxy import exceptions
 from mitmproxy import command
@@ -531,12 +532,15 @@ class View(collections.abc.Sequence):
         if "console_focus_follow" in updated:
             self.focus_follow = ctx.options.console_focus_follow
 
+    @addonmanager.observer
     def request(self, f):
         self.add([f])
 
+    @addonmanager.observer
     def error(self, f):
         self.update([f])
 
+    @addonmanager.observer
     def response(self, f):
         self.update([f])
 
@@ -1,16 +1,23 @@
+import collections
 import os
 import ssl
 import time
 import datetime
+import hashlib
 import ipaddress
 import sys
+import threading
 import typing
 import contextlib
+from concurrent import futures
 
 from pyasn1.type import univ, constraint, char, namedtype, tag
 from pyasn1.codec.der.decoder import decode
 from pyasn1.error import PyAsn1Error
 import OpenSSL
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
 
 from mitmproxy.coretypes import serializable
 
@@ -35,10 +42,37 @@ rD693XKIHUCWOjMh1if6omGXKHH40QuME2gNa50+YPn1iYDl88uDbbMCAQI=
 -----END DH PARAMETERS-----
 """
 
+KEY_TYPES = ("rsa", "ecdsa")
 
-def create_ca(organization, cn, exp):
+
+def create_key(key_type: str = "rsa") -> OpenSSL.crypto.PKey:
+    """
+        Generates a private key, either RSA 2048 or ECDSA on the P-256 curve.
+    """
+    if key_type == "ecdsa":
+        # pyOpenSSL cannot convert EC keys from cryptography directly.
+        key = ec.generate_private_key(ec.SECP256R1(), default_backend())
+        return OpenSSL.crypto.load_privatekey(
+            OpenSSL.crypto.FILETYPE_PEM,
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.TraditionalOpenSSL,
+                serialization.NoEncryption(),
+            )
+        )
     key = OpenSSL.crypto.PKey()
     key.generate_key(OpenSSL.crypto.TYPE_RSA, 2048)
+    return key
+
+
+def get_key_type(key: OpenSSL.crypto.PKey) -> str:
+    if key.type() == OpenSSL.crypto.TYPE_RSA:
+        return "rsa"
+    return "ecdsa"
+
+
+def create_ca(organization, cn, exp, key_type="rsa"):
+    key = create_key(key_type)
     cert = OpenSSL.crypto.X509()
     cert.set_serial_number(int(time.time() * 10000))
     cert.set_version(2)
@@ -80,7 +114,7 @@ def create_ca(organization, cn, exp):
     return key, cert
 
 
-def dummy_cert(privkey, cacert, commonname, sans, organization):
+def dummy_cert(privkey, cacert, commonname, sans, organization, pubkey=None):
     """
         Generates a dummy certificate.
 
@@ -89,6 +123,7 @@ def dummy_cert(privkey, cacert, commonname, sans, organization):
         commonname: Common name for the generated certificate.
         sans: A list of Subject Alternate Names.
         organization: Organization name for the generated certificate.
+        pubkey: Key for the generated certificate. Defaults to the CA's key.
 
         Returns cert if operation succeeded, None if not.
     """
@@ -115,7 +150,7 @@ def dummy_cert(privkey, cacert, commonname, sans, organization):
         cert.set_version(2)
         cert.add_extensions(
             [OpenSSL.crypto.X509Extension(b"subjectAltName", False, ss)])
-    cert.set_pubkey(cacert.get_pubkey())
+    cert.set_pubkey(pubkey or cacert.get_pubkey())
     cert.sign(privkey, "sha256")
     return Cert(cert)
 
@@ -129,37 +164,100 @@ class CertStoreEntry:
 
 
 TCustomCertId = bytes  # manually provided certs (e.g. mitmproxy's --certs)
-TGeneratedCertId = typing.Tuple[typing.Optional[bytes], typing.Tuple[bytes, ...]]  # (common_name, sans)
-TCertId = typing.Union[TCustomCertId, TGeneratedCertId]
+TGeneratedCertId = typing.Tuple[
+    typing.Optional[bytes], typing.Tuple[bytes, ...], typing.Optional[bytes]
+]  # (common_name, sans, organization)
 
 
 class CertStore:
 
     """
         Implements an in-memory certificate store.
+
+        Generated certificates are kept in an LRU cache of cache_size entries.
+        Certificates added with add_cert are never evicted.
+
+        If cache_dir is given, generated certificates are also stored there,
+        so that they do not have to be signed again after a restart. They
+        are keyed by common name, SANs, organization and CA fingerprint, and
+        loaded when they are first needed.
+
+        Certificates are generated on a small thread pool. Concurrent
+        requests for the same certificate wait for a single generation.
     """
-    STORE_CAP = 100
+    DEFAULT_CACHE_SIZE = 100
+    GENERATE_WORKERS = min(4, os.cpu_count() or 1)
+    # Certificates loaded from disk must be valid for at least this long.
+    MIN_REMAINING_VALIDITY = datetime.timedelta(days=1)
 
     def __init__(
             self,
             default_privatekey,
             default_ca,
             default_chain_file,
-            dhparams):
+            dhparams,
+            cache_size: int = DEFAULT_CACHE_SIZE,
+            cache_dir: typing.Optional[str] = None,
+            leaf_privatekey=None):
         self.default_privatekey = default_privatekey
+        # Generated certificates use the CA key unless a separate leaf key is given.
+        self.leaf_privatekey = leaf_privatekey or default_privatekey
         self.default_ca = default_ca
         self.default_chain_file = default_chain_file
         self.dhparams = dhparams
-        self.certs: typing.Dict[TCertId, CertStoreEntry] = {}
-        self.expire_queue = []
-
-    def expire(self, entry):
-        self.expire_queue.append(entry)
-        if len(self.expire_queue) > self.STORE_CAP:
-            d = self.expire_queue.pop(0)
-            for k, v in list(self.certs.items()):
-                if v == d:
-                    del self.certs[k]
+        self.cache_size = cache_size
+        self.cache_dir = cache_dir
+        self.ca_fingerprint = default_ca.digest("sha256")
+        self.leaf_fingerprint = hashlib.sha256(OpenSSL.crypto.dump_publickey(
+            OpenSSL.crypto.FILETYPE_ASN1, self.leaf_privatekey
+        )).hexdigest()
+        self.certs: typing.Dict[TCustomCertId, CertStoreEntry] = {}
+        self.generated: typing.Dict[TGeneratedCertId, CertStoreEntry] = collections.OrderedDict()
+
+        self._lock = threading.Lock()
+        self._pending: typing.Dict[TGeneratedCertId, futures.Future] = {}
+        self._executor: typing.Optional[futures.ThreadPoolExecutor] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.loaded = 0
+        # Requests that waited for a generation started by another thread.
+        self.coalesced = 0
+
+    def _cache_path(self, cert_id: TGeneratedCertId) -> str:
+        h = hashlib.sha256(repr(cert_id + (self.ca_fingerprint, self.leaf_fingerprint)).encode()).hexdigest()
+        return os.path.join(self.cache_dir, h[:2], h + ".pem")
+
+    def _load_cached(self, cert_id: TGeneratedCertId) -> typing.Optional["Cert"]:
+        try:
+            with open(self._cache_path(cert_id), "rb") as f:
+                cert = Cert.from_pem(f.read())
+        except (OSError, OpenSSL.crypto.Error):
+            return None
+        now = datetime.datetime.utcnow()
+        if cert.notbefore > now or cert.notafter - now < self.MIN_REMAINING_VALIDITY:
+            return None
+        return cert
+
+    def _save_cached(self, cert_id: TGeneratedCertId, cert: "Cert") -> None:
+        path = self._cache_path(cert_id)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first, so that concurrent readers
+            # (e.g. other worker processes) never see a partial file.
+            tmp = "{}.{}.tmp".format(path, os.getpid())
+            with open(tmp, "wb") as f:
+                f.write(cert.to_pem())
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        # Drop the least recently used generated certificates.
+        while len(self.generated) > self.cache_size:
+            self.generated.popitem(last=False)
+            self.evictions += 1
 
     @staticmethod
     def load_dhparam(path):
@@ -181,11 +279,22 @@ class CertStore:
             dh = OpenSSL.SSL._ffi.gc(dh, OpenSSL.SSL._lib.DH_free)
             return dh
 
+    @staticmethod
+    def load_leaf_key(path, basename, key_type):
+        leaf_path = os.path.join(path, "{}-leaf-{}.pem".format(basename, key_type))
+        if os.path.exists(leaf_path):
+            with open(leaf_path, "rb") as f:
+                return OpenSSL.crypto.load_privatekey(OpenSSL.crypto.FILETYPE_PEM, f.read())
+        key = create_key(key_type)
+        with CertStore.umask_secret(), open(leaf_path, "wb") as f:
+            f.write(OpenSSL.crypto.dump_privatekey(OpenSSL.crypto.FILETYPE_PEM, key))
+        return key
+
     @classmethod
-    def from_store(cls, path, basename):
+    def from_store(cls, path, basename, cache_size=DEFAULT_CACHE_SIZE, persist=False, key_type="rsa"):
         ca_path = os.path.join(path, basename + "-ca.pem")
         if not os.path.exists(ca_path):
-            key, ca = cls.create_store(path, basename)
+            key, ca = cls.create_store(path, basename, key_type=key_type)
         else:
             with open(ca_path, "rb") as f:
                 raw = f.read()
@@ -197,7 +306,12 @@ class CertStore:
                 raw)
         dh_path = os.path.join(path, basename + "-dhparam.pem")
         dh = cls.load_dhparam(dh_path)
-        return cls(key, ca, ca_path, dh)
+        cache_dir = os.path.join(path, basename + "-certs") if persist else None
+        # An existing CA of another key type signs leaf certificates for a separate key.
+        leaf_key = None
+        if get_key_type(key) != key_type:
+            leaf_key = cls.load_leaf_key(path, basename, key_type)
+        return cls(key, ca, ca_path, dh, cache_size, cache_dir, leaf_key)
 
     @staticmethod
     @contextlib.contextmanager
@@ -215,14 +329,14 @@ class CertStore:
             os.umask(original_umask)
 
     @staticmethod
-    def create_store(path, basename, organization=None, cn=None, expiry=DEFAULT_EXP):
+    def create_store(path, basename, organization=None, cn=None, expiry=DEFAULT_EXP, key_type="rsa"):
         if not os.path.exists(path):
             os.makedirs(path)
 
         organization = organization or basename
         cn = cn or basename
 
-        key, ca = create_ca(organization=organization, cn=cn, exp=expiry)
+        key, ca = create_ca(organization=organization, cn=cn, exp=expiry, key_type=key_type)
         # Dump the CA plus private key
         with CertStore.umask_secret(), open(os.path.join(path, basename + "-ca.pem"), "wb") as f:
             f.write(
@@ -308,6 +422,73 @@ class CertStore:
             ret.append(b"*." + b".".join(parts[i:]))
         return ret
 
+    def prewarm(
+            self,
+            commonname: typing.Optional[bytes],
+            sans: typing.List[bytes],
+            organization: typing.Optional[bytes] = None
+    ) -> futures.Future:
+        """
+            Generate a certificate in the background, so that a later
+            get_cert call with the same arguments finds it in the cache.
+        """
+        return self._get_generated(commonname, sans, organization)
+
+    def _get_generated(self, commonname, sans, organization) -> futures.Future:
+        # The order of SANs does not matter for the identity of a certificate.
+        cert_id = (commonname, tuple(sorted(set(sans))), organization)
+        with self._lock:
+            entry = self.generated.get(cert_id)
+            if entry:
+                self.generated.move_to_end(cert_id)
+                self.hits += 1
+                f: futures.Future = futures.Future()
+                f.set_result(entry)
+                return f
+            f = self._pending.get(cert_id)
+            if f:
+                self.coalesced += 1
+                return f
+            self.misses += 1
+            if self._executor is None:
+                self._executor = futures.ThreadPoolExecutor(
+                    max_workers=self.GENERATE_WORKERS,
+                    thread_name_prefix="certs.generate",
+                )
+            f = self._executor.submit(self._generate, cert_id, commonname, sans, organization)
+            self._pending[cert_id] = f
+            return f
+
+    def _generate(self, cert_id, commonname, sans, organization) -> CertStoreEntry:
+        try:
+            cert = None
+            if self.cache_dir:
+                cert = self._load_cached(cert_id)
+            if cert:
+                with self._lock:
+                    self.loaded += 1
+            else:
+                cert = dummy_cert(
+                    self.default_privatekey,
+                    self.default_ca,
+                    commonname,
+                    sans,
+                    organization,
+                    self.leaf_privatekey)
+                if self.cache_dir:
+                    self._save_cached(cert_id, cert)
+            entry = CertStoreEntry(
+                cert=cert,
+                privatekey=self.leaf_privatekey,
+                chain_file=self.default_chain_file)
+            with self._lock:
+                self.generated[cert_id] = entry
+                self._evict()
+            return entry
+        finally:
+            with self._lock:
+                del self._pending[cert_id]
+
     def get_cert(self, commonname: typing.Optional[bytes], sans: typing.List[bytes], organization: typing.Optional[bytes] = None):
         """
             Returns an (cert, privkey, cert_chain) tuple.
@@ -320,13 +501,12 @@ class CertStore:
             organization: Organization name for the generated certificate.
         """
 
-        potential_keys: typing.List[TCertId] = []
+        potential_keys: typing.List[TCustomCertId] = []
         if commonname:
             potential_keys.extend(self.asterisk_forms(commonname))
         for s in sans:
             potential_keys.extend(self.asterisk_forms(s))
         potential_keys.append(b"*")
-        potential_keys.append((commonname, tuple(sans)))
 
         name = next(
             filter(lambda key: key in self.certs, potential_keys),
@@ -335,17 +515,7 @@ class CertStore:
         if name:
             entry = self.certs[name]
         else:
-            entry = CertStoreEntry(
-                cert=dummy_cert(
-                    self.default_privatekey,
-                    self.default_ca,
-                    commonname,
-                    sans,
-                    organization),
-                privatekey=self.default_privatekey,
-                chain_file=self.default_chain_file)
-            self.certs[(commonname, tuple(sans))] = entry
-            self.expire(entry)
+            entry = self._get_generated(commonname, sans, organization).result()
 
         return entry.cert, entry.privatekey, entry.chain_file
 
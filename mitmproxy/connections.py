@@ -174,6 +174,7 @@ class ServerConnection(tcp.TCPClient, stateobject.StateObject):
         tls_version: TLS version
         via: The underlying server connection (e.g. the connection to the upstream proxy in upstream proxy mode)
         timestamp_start: Connection start timestamp
+        timestamp_dns_setup: Name resolution completed timestamp
         timestamp_tcp_setup: TCP ACK received timestamp
         timestamp_tls_setup: TLS established timestamp
         timestamp_end: Connection end timestamp
@@ -188,8 +189,14 @@ class ServerConnection(tcp.TCPClient, stateobject.StateObject):
         self.via = None
         self.timestamp_start = None
         self.timestamp_end = None
+        self.timestamp_dns_setup = None
         self.timestamp_tcp_setup = None
         self.timestamp_tls_setup = None
+        # True between a completed HTTP/1 exchange and the next request,
+        # i.e. while the connection may be handed to another client.
+        self.keep_alive = False
+        # The id of the connection whose socket has been taken over, if any.
+        self.reused_from = None
 
     def connected(self):
         return bool(self.connection) and not self.finished
@@ -232,6 +239,7 @@ class ServerConnection(tcp.TCPClient, stateobject.StateObject):
         alpn_proto_negotiated=bytes,
         tls_version=str,
         timestamp_start=float,
+        timestamp_dns_setup=float,
         timestamp_tcp_setup=float,
         timestamp_tls_setup=float,
         timestamp_end=float,
@@ -256,15 +264,18 @@ class ServerConnection(tcp.TCPClient, stateobject.StateObject):
             source_address=('', 0),
             tls_established=False,
             timestamp_start=None,
+            timestamp_dns_setup=None,
             timestamp_tcp_setup=None,
             timestamp_tls_setup=None,
             timestamp_end=None,
             via=None
         ))
 
-    def connect(self):
+    def connect(self, resolver=None, happy_eyeballs_delay=None):
         self.timestamp_start = time.time()
-        tcp.TCPClient.connect(self)
+        addrinfo = self.resolve(resolver)
+        self.timestamp_dns_setup = time.time()
+        tcp.TCPClient.connect(self, happy_eyeballs_delay=happy_eyeballs_delay, addrinfo=addrinfo)
         self.timestamp_tcp_setup = time.time()
 
     def send(self, message):
@@ -299,5 +310,42 @@ class ServerConnection(tcp.TCPClient, stateobject.StateObject):
         tcp.TCPClient.finish(self)
         self.timestamp_end = time.time()
 
+    def detach(self) -> "ServerConnection":
+        """
+        End this connection without closing the underlying socket, which is
+        handed to a new ServerConnection instead.
+        """
+        conn = ServerConnection(self.address, self.source_address, self.spoof_source_address)
+        conn.take_over(self)
+        conn.reused_from = self.id
+        return conn
+
+    def take_over(self, other: "ServerConnection") -> None:
+        """
+        Continue on the open socket of other, e.g. an idle connection from the
+        upstream pool. other is left without a socket and marked as finished.
+        """
+        now = time.time()
+        self.connection, self.rfile, self.wfile = other.connection, other.rfile, other.wfile
+        self.ip_address = other.ip_address
+        self.source_address = other.source_address
+        self.tls_established = other.tls_established
+        self.cert = other.cert
+        self.server_certs = other.server_certs
+        self.sni = other.sni
+        self.alpn_proto_negotiated = other.alpn_proto_negotiated
+        self.tls_version = other.tls_version
+        self._session_cache, self._session_key = other._session_cache, other._session_key
+        self.reused_from = other.reused_from
+        self.timestamp_start = now
+        self.timestamp_dns_setup = now
+        self.timestamp_tcp_setup = now
+        self.timestamp_tls_setup = now if other.tls_established else None
+
+        other.connection = other.rfile = other.wfile = None
+        other._session_key = None
+        other.finished = True
+        other.timestamp_end = now
+
 
 ServerConnection._stateobject_attributes["via"] = ServerConnection
@@ -23,10 +23,17 @@ class Channel:
         """
         if not self.should_exit.is_set():
             m.reply = Reply(m)
-            asyncio.run_coroutine_threadsafe(
-                self.master.addons.handle_lifecycle(mtype, m),
-                self.loop,
-            )
+            if self.master.addons.has_subscribers(mtype, m):
+                asyncio.run_coroutine_threadsafe(
+                    self.master.addons.handle_lifecycle(mtype, m),
+                    self.loop,
+                )
+            else:
+                # No addon handles this event, so we can skip the round trip
+                # through the event loop and acknowledge it right here.
+                m.reply.take()
+                m.reply.ack()
+                m.reply.commit()
             g = m.reply.q.get()
             if g == exceptions.Kill:
                 raise exceptions.Kill()
@@ -37,7 +44,7 @@ class Channel:
         Decorate a message with a dummy reply attribute, send it to the master,
         then return immediately.
         """
-        if not self.should_exit.is_set():
+        if not self.should_exit.is_set() and self.master.addons.has_subscribers(mtype, m):
             m.reply = DummyReply()
             asyncio.run_coroutine_threadsafe(
                 self.master.addons.handle_lifecycle(mtype, m),
@@ -39,6 +39,15 @@ Events = frozenset([
     "update",
 ])
 
+# Lifecycle events after which the proxy does not change the message anymore.
+FinalEvents = frozenset([
+    "response",
+    "error",
+    "tcp_end",
+    "websocket_end",
+    "log",
+])
+
 TEventGenerator = typing.Iterator[typing.Tuple[str, typing.Any]]
 
 
@@ -28,6 +28,18 @@ class Kill(MitmproxyException):
     pass
 
 
+class ClientIdle(MitmproxyException):
+
+    """
+    Signal that the client connection is idle between two requests, and that
+    the handler thread can be returned until the client sends more data.
+    layer.resume() continues handling the connection.
+    """
+    def __init__(self, layer):
+        super().__init__("Client connection is idle")
+        self.layer = layer
+
+
 class ProtocolException(MitmproxyException):
     """
     ProtocolExceptions are caused by invalid user input, unavailable network resources,
@@ -26,6 +26,13 @@ class FlowWriter:
         d = flow.get_state()
         tnetstring.dump(d, self.fo)
 
+    def add_partial(self, flow, messages):
+        """
+            Write some messages of a WebSocket flow ahead of the flow itself.
+        """
+        d = flow.get_partial_state(messages)
+        tnetstring.dump(d, self.fo)
+
 
 class FlowReader:
     def __init__(self, fo):
@@ -34,7 +41,11 @@ class FlowReader:
     def stream(self) -> Iterable[flow.Flow]:
         """
             Yields Flow objects from the dump.
+
+            Messages of partial WebSocket flows are prepended to the next
+            complete state of the same flow.
         """
+        partial: Dict[str, websocket.WebSocketFlow] = {}
         try:
             while True:
                 # FIXME: This cast hides a lack of dynamic type checking
@@ -48,11 +59,21 @@ class FlowReader:
                     raise exceptions.FlowReadException(str(e))
                 if mdata["type"] not in FLOW_TYPES:
                     raise exceptions.FlowReadException("Unknown flow type: {}".format(mdata["type"]))
-                yield FLOW_TYPES[mdata["type"]].from_state(mdata)
+                f = FLOW_TYPES[mdata["type"]].from_state(mdata)
+                if f.metadata.pop("websocket_partial", False):
+                    if f.id in partial:
+                        partial[f.id].messages.extend(f.messages)
+                    else:
+                        partial[f.id] = f
+                    continue
+                if f.id in partial:
+                    f.messages[:0] = partial.pop(f.id).messages
+                yield f
         except ValueError as e:
-            if str(e) == "not a tnetstring: empty file":
-                return  # Error is due to EOF
-            raise exceptions.FlowReadException("Invalid data format.")
+            if str(e) != "not a tnetstring: empty file":
+                raise exceptions.FlowReadException("Invalid data format.")
+        # The complete state is missing if the file ends while a connection was still open.
+        yield from partial.values()
 
 
 class FilteredFlowWriter:
@@ -66,6 +87,12 @@ class FilteredFlowWriter:
         d = f.get_state()
         tnetstring.dump(d, self.fo)
 
+    def add_partial(self, f: flow.Flow, messages):
+        if self.flt and not flowfilter.match(self.flt, f):
+            return
+        d = f.get_partial_state(messages)
+        tnetstring.dump(d, self.fo)
+
 
 def read_flows_from_paths(paths):
     """
@@ -67,7 +67,8 @@ def _dump_http_client_conn(cc: ClientConnection) -> http_pb2.ClientConnection:
 def _dump_http_server_conn(sc: ServerConnection) -> http_pb2.ServerConnection:
     psc = http_pb2.ServerConnection()
     _move_attrs(sc, psc, ['id', 'tls_established', 'sni', 'alpn_proto_negotiated', 'tls_version',
-                          'timestamp_start', 'timestamp_tcp_setup', 'timestamp_tls_setup', 'timestamp_end'])
+                          'timestamp_start', 'timestamp_dns_setup', 'timestamp_tcp_setup', 'timestamp_tls_setup',
+                          'timestamp_end'])
     for addr in ['address', 'ip_address', 'source_address']:
         if hasattr(sc, addr) and getattr(sc, addr) is not None:
             getattr(psc, addr).host = getattr(sc, addr)[0]
@@ -152,7 +153,8 @@ def _load_http_client_conn(o: http_pb2.ClientConnection) -> ClientConnection:
 def _load_http_server_conn(o: http_pb2.ServerConnection) -> ServerConnection:
     d: dict = {}
     _move_attrs(o, d, ['id', 'tls_established', 'sni', 'alpn_proto_negotiated', 'tls_version',
-                       'timestamp_start', 'timestamp_tcp_setup', 'timestamp_tls_setup', 'timestamp_end'])
+                       'timestamp_start', 'timestamp_dns_setup', 'timestamp_tcp_setup', 'timestamp_tls_setup',
+                       'timestamp_end'])
     for addr in ['address', 'ip_address', 'source_address']:
         if hasattr(o, addr):
             d[addr] = (getattr(o, addr).host, getattr(o, addr).port)
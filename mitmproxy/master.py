@@ -41,6 +41,11 @@ class Master:
     """
         The master handles mitmproxy's main event loop.
     """
+    # Whether the master can run the proxy in several worker processes.
+    # Live flows only exist in the workers, so masters that act on them,
+    # e.g. to intercept or replay, cannot.
+    multiprocess = False
+
     def __init__(self, opts):
         self.should_exit = threading.Event()
         self.channel = controller.Channel(
@@ -72,7 +77,10 @@ class Master:
     def start(self):
         self.should_exit.clear()
         if self.server:
-            ServerThread(self.server).start()
+            if self.options.server_asyncio:
+                self.server.serve_async(self.channel.loop)
+            else:
+                ServerThread(self.server).start()
 
     async def running(self):
         self.addons.trigger("running")
@@ -0,0 +1,72 @@
+import collections
+import socket
+import threading
+import time
+import typing
+
+AddrInfo = typing.List[typing.Tuple[int, int, int, str, tuple]]
+
+
+class Resolver:
+    """
+    Caches the results of getaddrinfo for upstream connections.
+
+    Successful lookups are cached for ttl seconds, failed lookups for
+    negative_ttl seconds. The cache does not know about the TTL of the
+    underlying DNS records, so ttl should be kept short.
+    """
+
+    def __init__(self, ttl: float = 60, negative_ttl: float = 5, max_size: int = 1000) -> None:
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: typing.Dict[tuple, tuple] = collections.OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def getaddrinfo(self, host: str, port: int) -> AddrInfo:
+        """
+        Returns getaddrinfo results for a TCP connection to (host, port).
+
+        Raises:
+            socket.gaierror, if the name cannot be resolved.
+        """
+        key = (host, port)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                result, expires = entry
+                if time.time() < expires:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    if isinstance(result, socket.gaierror):
+                        raise socket.gaierror(*result.args)
+                    return result
+                del self._entries[key]
+            self.misses += 1
+
+        try:
+            result = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            self._put(key, e, self.negative_ttl)
+            raise
+        self._put(key, result, self.ttl)
+        return result
+
+    def _put(self, key: tuple, result, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (result, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
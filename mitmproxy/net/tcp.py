@@ -1,5 +1,8 @@
+import asyncio
+import collections
 import os
 import errno
+import queue
 import select
 import socket
 import sys
@@ -107,48 +110,72 @@ class Reader(_FileLike):
         """
             If length is -1, we read until connection closes.
         """
-        result = b''
+        chunks = []
         start = time.time()
         while length == -1 or length > 0:
             if length == -1 or length > self.BLOCKSIZE:
                 rlen = self.BLOCKSIZE
             else:
                 rlen = length
-            try:
-                data = self.o.read(rlen)
-            except SSL.ZeroReturnError:
-                # TLS connection was shut down cleanly
-                break
-            except (SSL.WantWriteError, SSL.WantReadError):
-                # From the OpenSSL docs:
-                # If the underlying BIO is non-blocking, SSL_read() will also return when the
-                # underlying BIO could not satisfy the needs of SSL_read() to continue the
-                # operation. In this case a call to SSL_get_error with the return value of
-                # SSL_read() will yield SSL_ERROR_WANT_READ or SSL_ERROR_WANT_WRITE.
-                if (time.time() - start) < self.o.gettimeout():
-                    time.sleep(0.1)
-                    continue
-                else:
-                    raise exceptions.TcpTimeout()
-            except socket.timeout:
-                raise exceptions.TcpTimeout()
-            except socket.error as e:
-                raise exceptions.TcpDisconnect(str(e))
-            except SSL.SysCallError as e:
-                if e.args == (-1, 'Unexpected EOF'):
-                    break
-                raise exceptions.TlsException(str(e))
-            except SSL.Error as e:
-                raise exceptions.TlsException(str(e))
-            self.first_byte_timestamp = self.first_byte_timestamp or time.time()
+            data = self._read_chunk(rlen, start)
+            if data is None:
+                continue
             if not data:
                 break
-            result += data
+            chunks.append(data)
             if length != -1:
                 length -= len(data)
+        result = b''.join(chunks)
         self.add_log(result)
         return result
 
+    def read1(self, length):
+        """
+            Read up to length bytes with a single read from the underlying
+            file object, i.e. return what is available instead of waiting for
+            length bytes. Returns an empty bytestring if the connection closes.
+        """
+        start = time.time()
+        data = None
+        while data is None:
+            data = self._read_chunk(length, start)
+        self.add_log(data)
+        return data
+
+    def _read_chunk(self, rlen, start):
+        """
+            Read up to rlen bytes. Returns None if the read should be retried,
+            and an empty bytestring if the connection has been closed.
+        """
+        try:
+            data = self.o.read(rlen)
+        except SSL.ZeroReturnError:
+            # TLS connection was shut down cleanly
+            return b''
+        except (SSL.WantWriteError, SSL.WantReadError):
+            # From the OpenSSL docs:
+            # If the underlying BIO is non-blocking, SSL_read() will also return when the
+            # underlying BIO could not satisfy the needs of SSL_read() to continue the
+            # operation. In this case a call to SSL_get_error with the return value of
+            # SSL_read() will yield SSL_ERROR_WANT_READ or SSL_ERROR_WANT_WRITE.
+            if (time.time() - start) < self.o.gettimeout():
+                time.sleep(0.1)
+                return None
+            else:
+                raise exceptions.TcpTimeout()
+        except socket.timeout:
+            raise exceptions.TcpTimeout()
+        except socket.error as e:
+            raise exceptions.TcpDisconnect(str(e))
+        except SSL.SysCallError as e:
+            if e.args == (-1, 'Unexpected EOF'):
+                return b''
+            raise exceptions.TlsException(str(e))
+        except SSL.Error as e:
+            raise exceptions.TlsException(str(e))
+        self.first_byte_timestamp = self.first_byte_timestamp or time.time()
+        return data or b''
+
     def readline(self, size=None):
         result = b''
         bytes_read = 0
@@ -364,6 +391,8 @@ class TCPClient(_Connection):
         self.server_certs = []
         self.sni = None
         self.spoof_source_address = spoof_source_address
+        self._session_cache = None
+        self._session_key = None
 
     @property
     def ssl_verification_error(self) -> Optional[exceptions.InvalidCertificateException]:
@@ -375,68 +404,151 @@ class TCPClient(_Connection):
         # it tries to renegotiate...
         if self.connection:
             if isinstance(self.connection, SSL.Connection):
+                if self._session_cache is not None and self.tls_established:
+                    # With TLS 1.3, the server sends session tickets after
+                    # the handshake, so the session may have been updated.
+                    self._session_cache.put(
+                        self._session_key, self.connection.get_session(), self.server_certs
+                    )
+                    # OpenSSL marks the session as not resumable if the
+                    # connection is freed without a shutdown.
+                    self.connection.set_shutdown(SSL.SENT_SHUTDOWN | SSL.RECEIVED_SHUTDOWN)
                 close_socket(self.connection._socket)
             else:
                 close_socket(self.connection)
 
-    def convert_to_tls(self, sni=None, alpn_protos=None, **sslctx_kwargs):
-        context = tls.create_client_context(
-            alpn_protos=alpn_protos,
-            sni=sni,
-            **sslctx_kwargs
-        )
+    def convert_to_tls(self, sni=None, alpn_protos=None, session_cache=None, **sslctx_kwargs):
+        """
+        Convert connection to SSL.
+        If a tls.ClientSessionCache is passed, its context is used and a
+        cached session for this server is resumed if possible.
+        """
+        cached = None
+        if session_cache is not None:
+            context, context_key = session_cache.context(
+                alpn_protos=alpn_protos,
+                sni=sni,
+                **sslctx_kwargs
+            )
+            self._session_cache = session_cache
+            self._session_key = (self.address, sni, context_key)
+            cached = session_cache.get(self._session_key)
+        else:
+            context = tls.create_client_context(
+                alpn_protos=alpn_protos,
+                sni=sni,
+                **sslctx_kwargs
+            )
         self.connection = SSL.Connection(context, self.connection)
+        if session_cache is not None:
+            self.connection.set_app_data((sni, self.address))
+            if cached:
+                self.connection.set_session(cached[0])
         if sni:
             self.sni = sni
             self.connection.set_tlsext_host_name(sni.encode("idna"))
         self.connection.set_connect_state()
-        try:
-            self.connection.do_handshake()
-        except SSL.Error as v:
-            if self.ssl_verification_error:
-                raise self.ssl_verification_error
-            else:
-                raise exceptions.TlsException("SSL handshake error: %s" % repr(v))
+        timeout = self.connection.gettimeout()
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            try:
+                self.connection.do_handshake()
+                break
+            except SSL.WantReadError:
+                self._wait_for_handshake(deadline, [self.connection], [])
+            except SSL.WantWriteError:
+                self._wait_for_handshake(deadline, [], [self.connection])
+            except SSL.Error as v:
+                if self.ssl_verification_error:
+                    raise self.ssl_verification_error
+                else:
+                    raise exceptions.TlsException("SSL handshake error: %s" % repr(v))
 
         self.cert = certs.Cert(self.connection.get_peer_certificate())
 
         # Keep all server certificates in a list
-        for i in self.connection.get_peer_cert_chain():
-            self.server_certs.append(certs.Cert(i))
+        if cached and tls.session_reused(self.connection):
+            # A resumed session does not come with the certificate chain.
+            session_cache.record_resumed()
+            self.server_certs.extend(cached[1])
+        else:
+            for i in self.connection.get_peer_cert_chain():
+                self.server_certs.append(certs.Cert(i))
+        if session_cache is not None:
+            session_cache.put(self._session_key, self.connection.get_session(), self.server_certs)
 
         self.tls_established = True
         self.rfile.set_descriptor(self.connection)
         self.wfile.set_descriptor(self.connection)
 
+    def _wait_for_handshake(self, deadline, rlist, wlist):
+        """
+        A socket with a timeout is non-blocking underneath, so OpenSSL does not
+        wait for the peer during the handshake and we have to.
+        """
+        remaining = deadline - time.monotonic() if deadline is not None else 0
+        if remaining <= 0 or not any(select.select(rlist, wlist, [], remaining)[:2]):
+            raise exceptions.TlsException("SSL handshake timed out")
+
     def makesocket(self, family, type, proto):
         # some parties (cuckoo sandbox) need to hook this
         return socket.socket(family, type, proto)
 
-    def create_connection(self, timeout=None):
+    def _connect_socket(self, af, socktype, proto, timeout=None):
+        """
+        Create a socket for a connection attempt, bound to the source address.
+        """
+        sock = self.makesocket(af, socktype, proto)
+        try:
+            if timeout:
+                sock.settimeout(timeout)
+            if self.source_address:
+                sock.bind(self.source_address)
+            if self.spoof_source_address:
+                try:
+                    if not sock.getsockopt(socket.SOL_IP, socket.IP_TRANSPARENT):
+                        sock.setsockopt(socket.SOL_IP, socket.IP_TRANSPARENT, 1)  # pragma: windows no cover  pragma: osx no cover
+                except Exception as e:
+                    # socket.IP_TRANSPARENT might not be available on every OS and Python version
+                    raise exceptions.TcpException(
+                        "Failed to spoof the source address: " + str(e)
+                    )
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    def resolve(self, resolver=None):
+        """
+        Resolve the address of this connection, using the given resolver.Resolver if any.
+
+        Raises:
+            mitmproxy.exceptions.TcpException, if the name cannot be resolved.
+        """
+        try:
+            if resolver is not None:
+                return resolver.getaddrinfo(self.address[0], self.address[1])
+            return socket.getaddrinfo(self.address[0], self.address[1], 0, socket.SOCK_STREAM)
+        except (socket.error, IOError, UnicodeError) as err:
+            raise exceptions.TcpException(
+                'Error resolving "%s": %s' %
+                (self.address[0], err)
+            )
+
+    def create_connection(self, timeout=None, addrinfo=None, happy_eyeballs_delay=None):
         # Based on the official socket.create_connection implementation of Python 3.6.
         # https://github.com/python/cpython/blob/3cc5817cfaf5663645f4ee447eaed603d2ad290a/Lib/socket.py
+        if addrinfo is None:
+            addrinfo = socket.getaddrinfo(self.address[0], self.address[1], 0, socket.SOCK_STREAM)
+        if happy_eyeballs_delay and len(addrinfo) > 1:
+            return self._race_connections(addrinfo, happy_eyeballs_delay, timeout)
 
         err = None
-        for res in socket.getaddrinfo(self.address[0], self.address[1], 0, socket.SOCK_STREAM):
+        for res in addrinfo:
             af, socktype, proto, canonname, sa = res
             sock = None
             try:
-                sock = self.makesocket(af, socktype, proto)
-                if timeout:
-                    sock.settimeout(timeout)
-                if self.source_address:
-                    sock.bind(self.source_address)
-                if self.spoof_source_address:
-                    try:
-                        if not sock.getsockopt(socket.SOL_IP, socket.IP_TRANSPARENT):
-                            sock.setsockopt(socket.SOL_IP, socket.IP_TRANSPARENT, 1)  # pragma: windows no cover  pragma: osx no cover
-                    except Exception as e:
-                        # socket.IP_TRANSPARENT might not be available on every OS and Python version
-                        if sock is not None:
-                            sock.close()
-                        raise exceptions.TcpException(
-                            "Failed to spoof the source address: " + str(e)
-                        )
+                sock = self._connect_socket(af, socktype, proto, timeout)
                 sock.connect(sa)
                 return sock
 
@@ -450,9 +562,92 @@ class TCPClient(_Connection):
         else:
             raise socket.error("getaddrinfo returns an empty list")  # pragma: no cover
 
-    def connect(self):
+    def _race_connections(self, addrinfo, delay, timeout=None):
+        """
+        Happy Eyeballs (RFC 8305): Try the addresses in turn, alternating between
+        address families, and start the next attempt if the previous one has not
+        succeeded after delay seconds. The first established connection wins.
+        """
+        families = collections.OrderedDict()
+        for res in addrinfo:
+            families.setdefault(res[0], collections.deque()).append(res)
+        order = []
+        while families:
+            for af in list(families):
+                order.append(families[af].popleft())
+                if not families[af]:
+                    del families[af]
+
+        deadline = time.monotonic() + timeout if timeout else None
+        pending = {}
+        err = None
+        next_attempt = time.monotonic()
         try:
-            connection = self.create_connection()
+            while order or pending:
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    raise socket.timeout("timed out")
+                if order and now >= next_attempt:
+                    af, socktype, proto, canonname, sa = order.pop(0)
+                    try:
+                        sock = self._connect_socket(af, socktype, proto)
+                    except socket.error as e:
+                        err = e
+                        continue
+                    sock.setblocking(False)
+                    e = sock.connect_ex(sa)
+                    if e in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                        pending[sock] = sa
+                        next_attempt = now + delay
+                    else:
+                        sock.close()
+                        err = socket.error(e, os.strerror(e))
+                    continue
+
+                wait = []
+                if order:
+                    wait.append(next_attempt - now)
+                if deadline is not None:
+                    wait.append(deadline - now)
+                _, writable, _ = select.select([], list(pending), [], min(wait) if wait else None)
+                for sock in writable:
+                    e = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    if e == 0:
+                        del pending[sock]
+                        sock.settimeout(timeout)
+                        return sock
+                    del pending[sock]
+                    sock.close()
+                    err = socket.error(e, os.strerror(e))
+                    # Do not wait for the delay if an attempt has failed.
+                    next_attempt = time.monotonic()
+        finally:
+            for sock in pending:
+                sock.close()
+
+        if err is not None:
+            raise err
+        else:
+            raise socket.error("getaddrinfo returns an empty list")  # pragma: no cover
+
+    def connect(self, resolver=None, happy_eyeballs_delay=None, addrinfo=None, timeout=None):
+        """
+        Args:
+            resolver: A resolver.Resolver used to look up the address.
+            happy_eyeballs_delay: If set, race connection attempts to multiple addresses,
+                starting a new attempt after this many seconds.
+            addrinfo: The result of a previous resolve() call.
+            timeout: If set, the socket timeout in seconds, which applies to
+                connecting and to the TLS handshake as well.
+        """
+        if addrinfo is None:
+            addrinfo = self.resolve(resolver)
+        try:
+            connection = self.create_connection(
+                timeout=timeout,
+                addrinfo=addrinfo,
+                happy_eyeballs_delay=happy_eyeballs_delay
+            )
         except (socket.error, IOError) as err:
             raise exceptions.TcpException(
                 'Error connecting to "%s": %s' %
@@ -489,22 +684,35 @@ class BaseHandler(_Connection):
         self.server = server
         self.clientcert = None
 
-    def convert_to_tls(self, cert, key, **sslctx_kwargs):
+    def convert_to_tls(self, cert, key, context_cache=None, **sslctx_kwargs):
         """
         Convert connection to SSL.
         For a list of parameters, see tls.create_server_context(...)
+        If a tls.ServerContextCache is passed, its context for these
+        parameters is used, which allows clients to resume their session.
         """
-
-        context = tls.create_server_context(
-            cert=cert,
-            key=key,
-            **sslctx_kwargs)
-        self.connection = SSL.Connection(context, self.connection)
+        if context_cache is not None:
+            alpn_select_callback = sslctx_kwargs.pop("alpn_select_callback", None)
+            context = context_cache.context(
+                cert=cert,
+                key=key,
+                alpn_per_connection=alpn_select_callback is not None,
+                **sslctx_kwargs)
+            self.connection = SSL.Connection(context, self.connection)
+            self.connection.set_app_data(alpn_select_callback)
+        else:
+            context = tls.create_server_context(
+                cert=cert,
+                key=key,
+                **sslctx_kwargs)
+            self.connection = SSL.Connection(context, self.connection)
         self.connection.set_accept_state()
         try:
             self.connection.do_handshake()
         except SSL.Error as v:
             raise exceptions.TlsException("SSL handshake error: %s" % repr(v))
+        if context_cache is not None and tls.session_reused(self.connection):
+            context_cache.record_resumed()
         self.tls_established = True
         cert = self.connection.get_peer_certificate()
         if cert:
@@ -544,9 +752,165 @@ class Counter:
             self._count -= 1
 
 
+class WorkerPool:
+    """
+        A bounded pool of connection handler threads with an accept queue.
+
+        Worker threads are spawned lazily, up to max_workers. Connections that
+        arrive while all workers are busy wait in a queue of at most
+        queue_size entries.
+    """
+    def __init__(self, handler, max_workers, queue_size=0):
+        self.handler = handler
+        self.max_workers = max_workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.workers = []
+        self._busy = 0
+        self._pending = 0
+        # Shutdown signals in the queue, which are not connections.
+        self._stop_signals = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._room = threading.Condition(self._lock)
+        self.rejected = 0
+
+    @property
+    def queue_depth(self) -> int:
+        with self._lock:
+            return max(0, self.queue.qsize() - self._stop_signals)
+
+    @property
+    def busy(self) -> int:
+        with self._lock:
+            return self._busy
+
+    @property
+    def utilisation(self) -> float:
+        """
+            Fraction of the maximum number of workers currently handling a
+            connection.
+        """
+        return self.busy / self.max_workers
+
+    def has_capacity(self) -> bool:
+        return not self.queue.full()
+
+    def wait_for_capacity(self, timeout=None) -> bool:
+        """
+            Block until the queue has room, or until the timeout expires.
+        """
+        with self._room:
+            return self._room.wait_for(lambda: self._closed or self.has_capacity(), timeout)
+
+    def submit(self, connection, client_address, block=False, target=None) -> bool:
+        """
+            Queue a connection for handling. Returns False if the queue is
+            full and block is False, or if the pool has been shut down.
+            If target is given, it is passed on to the handler as well.
+
+            Raises threading.ThreadError if no worker thread can be started
+            to handle the connection.
+        """
+        with self._lock:
+            if self._closed:
+                return False
+            if self._pending >= len(self.workers) and len(self.workers) < self.max_workers:
+                try:
+                    self._spawn()
+                except threading.ThreadError:
+                    # The connection can still wait for a running worker.
+                    if not self.workers:
+                        raise
+            self._pending += 1
+        item = (connection, client_address) if target is None else (connection, client_address, target)
+        try:
+            self.queue.put(item, block=block)
+        except queue.Full:
+            with self._lock:
+                self._pending -= 1
+                self.rejected += 1
+            return False
+        return True
+
+    def _spawn(self):
+        t = basethread.BaseThread(
+            "TCPConnectionWorker (%s/%s)" % (len(self.workers) + 1, self.max_workers),
+            target=self._work,
+        )
+        t.setDaemon(1)
+        t.start()
+        self.workers.append(t)
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                with self._lock:
+                    self._stop_signals -= 1
+                # Pass the stop signal on to the next worker.
+                self._stop_next()
+                return
+            with self._lock:
+                self._busy += 1
+                self._room.notify_all()
+            try:
+                self.handler(*item)
+            finally:
+                with self._lock:
+                    self._busy -= 1
+                    self._pending -= 1
+
+    def shutdown(self):
+        """
+            Stop the workers once they are done with their current connection.
+            Connections that are still queued are closed.
+        """
+        with self._lock:
+            self._closed = True
+            self.workers = []
+            self._room.notify_all()
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                with self._lock:
+                    self._stop_signals -= 1
+            else:
+                close_socket(item[0])
+        self._stop_next()
+
+    def _stop_next(self):
+        with self._lock:
+            self._stop_signals += 1
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:  # pragma: no cover
+            # A connection submitted during shutdown took the last slot.
+            with self._lock:
+                self._stop_signals -= 1
+
+
 class TCPServer:
+    """
+        A threaded TCP server.
+
+        By default, every accepted connection is handled in its own thread.
+        If max_workers is set, connections are handed to a WorkerPool
+        instead, and queue_full_policy decides what happens to connections
+        that arrive while its queue is full:
+
+            reject: close the connection immediately.
+            delay: stop accepting until the queue has room again.
+            error: call handle_rejected, then close the connection.
 
-    def __init__(self, address):
+        With reuse_port, several servers can listen on the same address
+        using SO_REUSEPORT, and the kernel spreads connections across them.
+    """
+    QUEUE_FULL_POLICIES = ("reject", "delay", "error")
+
+    def __init__(self, address, max_workers=0, queue_size=0, queue_full_policy="reject", reuse_port=False):
         self.address = address
         self.__is_shut_down = threading.Event()
         self.__is_shut_down.set()
@@ -557,6 +921,9 @@ class TCPServer:
 
         self.socket = None
 
+        if queue_full_policy not in self.QUEUE_FULL_POLICIES:
+            raise ValueError("Unknown queue full policy: %s" % queue_full_policy)
+
         try:
             # First try to bind an IPv6 socket, with possible IPv4 if the OS supports it.
             # This allows us to accept connections for ::1 and 127.0.0.1 on the same socket.
@@ -565,6 +932,8 @@ class TCPServer:
             self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
             self.socket.setsockopt(IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+            if reuse_port:
+                self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             self.socket.bind(self.address)
         except socket.error:
             if self.socket:
@@ -576,16 +945,26 @@ class TCPServer:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            if reuse_port:
+                self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             self.socket.bind(self.address)
 
         self.address = self.socket.getsockname()
         self.socket.listen()
         self.handler_counter = Counter()
-
-    def connection_thread(self, connection, client_address):
+        self.worker_pool: Optional[WorkerPool] = None
+        if max_workers:
+            self.worker_pool = WorkerPool(self.connection_thread, max_workers, queue_size)
+        self.queue_full_policy = queue_full_policy
+        self._loop = None
+        self._accept_task = None
+        self._parked = set()
+
+    def connection_thread(self, connection, client_address, target=None):
+        parked = False
         with self.handler_counter:
             try:
-                self.handle_client_connection(connection, client_address)
+                parked = (target or self.handle_client_connection)(connection, client_address)
             except OSError as e:  # pragma: no cover
                 # This catches situations where the underlying connection is
                 # closed beneath us. Syscalls on the connection object at this
@@ -596,7 +975,48 @@ class TCPServer:
             except:
                 self.handle_error(connection, client_address)
             finally:
-                close_socket(connection)
+                if not parked:
+                    close_socket(connection)
+
+    def start_connection(self, connection, client_address, target=None):
+        """
+            Hand an accepted connection over to a handler thread, which calls
+            target or handle_client_connection.
+        """
+        if self.worker_pool is not None:
+            block = self.queue_full_policy == "delay"
+            try:
+                submitted = self.worker_pool.submit(connection, client_address, block=block, target=target)
+            except threading.ThreadError:
+                self.handle_error(connection, client_address)
+                connection.close()
+                return
+            if not submitted:
+                try:
+                    if self.queue_full_policy == "error":
+                        self.handle_rejected(connection, client_address)
+                except Exception:  # pragma: no cover
+                    pass
+                finally:
+                    close_socket(connection)
+            return
+        t = basethread.BaseThread(
+            "TCPConnectionHandler (%s: %s:%s -> %s:%s)" % (
+                self.__class__.__name__,
+                client_address[0],
+                client_address[1],
+                self.address[0],
+                self.address[1],
+            ),
+            target=self.connection_thread,
+            args=(connection, client_address, target),
+        )
+        t.setDaemon(1)
+        try:
+            t.start()
+        except threading.ThreadError:
+            self.handle_error(connection, client_address)
+            connection.close()
 
     def serve_forever(self, poll_interval=0.1):
         self.__is_shut_down.clear()
@@ -604,32 +1024,115 @@ class TCPServer:
             while not self.__shutdown_request:
                 r, w_, e_ = select.select([self.socket], [], [], poll_interval)
                 if self.socket in r:
+                    if not self._can_accept():
+                        # The listen socket stays readable, so wait for the
+                        # pool instead of spinning on select().
+                        self.worker_pool.wait_for_capacity(poll_interval)
+                        continue
                     connection, client_address = self.socket.accept()
-                    t = basethread.BaseThread(
-                        "TCPConnectionHandler (%s: %s:%s -> %s:%s)" % (
-                            self.__class__.__name__,
-                            client_address[0],
-                            client_address[1],
-                            self.address[0],
-                            self.address[1],
-                        ),
-                        target=self.connection_thread,
-                        args=(connection, client_address),
-                    )
-                    t.setDaemon(1)
-                    try:
-                        t.start()
-                    except threading.ThreadError:
-                        self.handle_error(connection, client_address)
-                        connection.close()
+                    self.start_connection(connection, client_address)
         finally:
             self.__shutdown_request = False
             self.__is_shut_down.set()
 
+    def serve_async(self, loop=None):
+        """
+            Accept connections on an asyncio event loop instead of a dedicated
+            polling thread. Accepted connections are parked on the loop until
+            the client sends its first byte, so connections that are opened
+            but not used yet (e.g. browser preconnects) do not hold a handler
+            thread. Handlers can park idle connections again with park().
+
+            Returns the accept task. The loop does not need to be running yet.
+        """
+        self._loop = loop or asyncio.get_event_loop()
+        self.socket.setblocking(False)
+        self._accept_task = self._loop.create_task(self._accept_loop(self._loop))
+        return self._accept_task
+
+    def park(self, connection, client_address, target) -> bool:
+        """
+            Hand an idle connection back to the event loop. Once the client
+            sends data, target(connection, client_address) is called on a
+            handler thread. Like handle_client_connection, target returns
+            True if it has parked the connection again.
+
+            This is thread-safe. Returns False if the server does not accept
+            connections on an event loop, in which case the caller has to
+            keep handling the connection itself.
+        """
+        if self._accept_task is None:
+            return False
+        self._loop.call_soon_threadsafe(self._park_soon, connection, client_address, target)
+        return True
+
+    def _park_soon(self, connection, client_address, target):
+        t = self._loop.create_task(self._park_connection(self._loop, connection, client_address, target))
+        self._parked.add(t)
+        t.add_done_callback(self._parked.discard)
+
+    def _can_accept(self):
+        return (
+            self.worker_pool is None or
+            self.queue_full_policy != "delay" or
+            self.worker_pool.has_capacity()
+        )
+
+    async def _accept_loop(self, loop):
+        while not self.__shutdown_request:
+            while not self._can_accept():
+                await asyncio.sleep(0.01)
+            try:
+                connection, client_address = await loop.sock_accept(self.socket)
+            except OSError:  # pragma: no cover
+                # The listen socket was closed beneath us.
+                break
+            connection.setblocking(True)
+            self._park_soon(connection, client_address, None)
+
+    async def _park_connection(self, loop, connection, client_address, target):
+        readable = loop.create_future()
+
+        def on_readable():
+            if not readable.done():
+                readable.set_result(None)
+
+        fd = connection.fileno()
+        try:
+            loop.add_reader(fd, on_readable)
+            try:
+                await readable
+            finally:
+                loop.remove_reader(fd)
+            # Do not block the event loop on a full worker queue. Connections
+            # that have already been served are never rejected.
+            while not self._can_accept() or (
+                target and self.worker_pool is not None and not self.worker_pool.has_capacity()
+            ):
+                await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            close_socket(connection)
+            raise
+        self.start_connection(connection, client_address, target)
+
+    def _cancel_async(self, accept_task):
+        accept_task.cancel()
+        for t in list(self._parked):
+            t.cancel()
+        self.__shutdown_request = False
+
     def shutdown(self):
         self.__shutdown_request = True
-        self.__is_shut_down.wait()
+        if self._accept_task is not None:
+            # The accept loop runs on the event loop we are (most likely)
+            # called from, so we must not block waiting for it.
+            self._loop.call_soon_threadsafe(self._cancel_async, self._accept_task)
+            self._accept_task = None
+        else:
+            self.__is_shut_down.wait()
         self.socket.close()
+        if self.worker_pool is not None:
+            self.worker_pool.shutdown()
         self.handle_shutdown()
 
     def handle_error(self, connection_, client_address, fp=sys.stderr):
@@ -646,9 +1149,16 @@ class TCPServer:
             print(exc, file=fp)
             print(u'-' * 40, file=fp)
 
+    def handle_rejected(self, connection, client_address):
+        """
+            Called for connections that are turned away because the worker
+            pool queue is full and queue_full_policy is "error".
+        """
+
     def handle_client_connection(self, conn, client_address):  # pragma: no cover
         """
-            Called after client connection.
+            Called after client connection. Returns True if the connection
+            has been parked with park() and must be left open.
         """
         raise NotImplementedError
 
@@ -2,10 +2,12 @@
 # then add options to disable certain methods
 # https://bugs.launchpad.net/pyopenssl/+bug/1020632/comments/3
 import binascii
+import collections
 import io
 import os
 import struct
 import threading
+import time
 import typing
 from ssl import match_hostname, CertificateError
 
@@ -229,6 +231,7 @@ def create_client_context(
 
     if sni is None and verify != SSL.VERIFY_NONE:
         raise exceptions.TlsException("Cannot validate certificate hostname without SNI")
+    default_sni, default_address = sni, address
 
     def verify_callback(
             conn: SSL.Connection,
@@ -237,6 +240,9 @@ def create_client_context(
             depth: int,
             is_cert_verified: bool
     ) -> bool:
+        # Contexts shared between connections get the connection's SNI
+        # and address from its app data.
+        sni, address = conn.get_app_data() or (default_sni, default_address)
         if is_cert_verified and depth == 0:
             # Verify hostname of leaf certificate.
             cert = certs.Cert(x509)
@@ -295,6 +301,242 @@ def create_client_context(
     return context
 
 
+class ClientSessionCache:
+    """
+    Caches TLS sessions of upstream connections, so that repeated connections
+    to a server can resume the previous session with an abbreviated handshake.
+
+    Sessions are keyed by server address, SNI and the client context
+    arguments, so that a session is never resumed with weaker verification
+    settings than it was established with. The SSL.Context for each set of
+    arguments is cached as well, instead of creating one per connection.
+    The arguments may be derived from the client's ClientHello (e.g. the
+    cipher list), so at most max_contexts contexts are kept.
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: float = 300, max_contexts: int = 32) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_contexts = max_contexts
+        self._lock = threading.Lock()
+        self._contexts: typing.Dict[tuple, SSL.Context] = collections.OrderedDict()
+        self._sessions: typing.Dict[tuple, tuple] = collections.OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.resumed = 0
+
+    def context(self, sni: str = None, address=None, **sslctx_kwargs) -> typing.Tuple[SSL.Context, tuple]:
+        """
+        Returns a client context for the given arguments (see
+        create_client_context) and the key of this set of arguments.
+        """
+        if sni is None and sslctx_kwargs.get("verify", SSL.VERIFY_NONE) != SSL.VERIFY_NONE:
+            raise exceptions.TlsException("Cannot validate certificate hostname without SNI")
+        key = tuple(sorted(
+            (k, tuple(v) if isinstance(v, list) else v)
+            for k, v in sslctx_kwargs.items()
+        ))
+        with self._lock:
+            context = self._contexts.get(key)
+            if context is not None:
+                self._contexts.move_to_end(key)
+        if context is None:
+            # SNI and address are passed per connection, using set_app_data.
+            context = create_client_context(sni="", **sslctx_kwargs)
+            with self._lock:
+                context = self._contexts.setdefault(key, context)
+                while len(self._contexts) > self.max_contexts:
+                    self._contexts.popitem(last=False)
+        return context, key
+
+    def get(self, key: tuple) -> typing.Optional[tuple]:
+        """
+        Returns a (session, server certificate chain) tuple, or None.
+        """
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry and time.time() - entry[2] < self.ttl:
+                self._sessions.move_to_end(key)
+                self.hits += 1
+                return entry[0], entry[1]
+            if entry:
+                del self._sessions[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple, session: SSL.Session, server_certs: typing.List[certs.Cert]) -> None:
+        with self._lock:
+            self._sessions[key] = (session, list(server_certs), time.time())
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_size:
+                self._sessions.popitem(last=False)
+
+    def record_resumed(self) -> None:
+        """
+        Count a handshake that resumed a cached session.
+        """
+        with self._lock:
+            self.resumed += 1
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class UpstreamCertCache:
+    """
+    Caches the certificate and negotiated ALPN protocol of upstream servers,
+    keyed by (host, port, sni). This allows us to answer a client's
+    ClientHello before the upstream connection is established.
+
+    The negotiated protocol depends on the protocols offered by the client,
+    so it is only valid for the same offer.
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: float = 300) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: typing.Dict[tuple, tuple] = collections.OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+            self, key: tuple, alpn_offers: typing.Sequence[bytes]
+    ) -> typing.Optional[typing.Tuple[certs.Cert, typing.Optional[bytes]]]:
+        """
+        Returns a (certificate, negotiated ALPN protocol) tuple, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry[3] < self.ttl and entry[1] == tuple(alpn_offers):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], entry[2]
+            if entry and time.time() - entry[3] >= self.ttl:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(
+            self,
+            key: tuple,
+            cert: certs.Cert,
+            alpn_offers: typing.Sequence[bytes],
+            alpn: typing.Optional[bytes]
+    ) -> None:
+        with self._lock:
+            self._entries[key] = (cert, tuple(alpn_offers), alpn, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ServerContextCache:
+    """
+    Caches the server contexts used for TLS with clients, so that the
+    certificate and key are loaded and the cipher list is set once per
+    certificate instead of once per connection.
+
+    A context keeps its session-id cache and session ticket keys, so clients
+    that connect again can resume their session with an abbreviated
+    handshake. The ALPN select callback is passed per connection, using
+    set_app_data.
+    """
+
+    def __init__(self, max_size: int = 100) -> None:
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._contexts: typing.Dict[tuple, tuple] = collections.OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.resumed = 0
+
+    def context(
+            self,
+            cert: typing.Union[certs.Cert, str],
+            key: SSL.PKey,
+            extra_chain_certs: typing.Iterable[certs.Cert] = None,
+            dhparams=None,
+            alpn_per_connection: bool = False,
+            **sslctx_kwargs
+    ) -> SSL.Context:
+        """
+        Returns a server context for the given arguments (see
+        create_server_context). If alpn_per_connection is True, connections
+        must pass their ALPN select callback with set_app_data.
+        """
+        extra_chain_certs = list(extra_chain_certs or [])
+        ctx_key = (
+            cert.digest("sha256") if isinstance(cert, certs.Cert) else cert,
+            # The key and dhparams objects are kept alive by the cache entry,
+            # so their ids are unique.
+            id(key),
+            id(dhparams),
+            tuple(c.digest("sha256") for c in extra_chain_certs),
+            alpn_per_connection,
+            tuple(sorted(
+                (k, tuple(v) if isinstance(v, list) else v)
+                for k, v in sslctx_kwargs.items()
+            )),
+        )
+        with self._lock:
+            entry = self._contexts.get(ctx_key)
+            if entry:
+                self._contexts.move_to_end(ctx_key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        def alpn_select_callback(conn, options):
+            return conn.get_app_data()(conn, options)
+
+        context = create_server_context(
+            cert,
+            key,
+            extra_chain_certs=extra_chain_certs,
+            dhparams=dhparams,
+            alpn_select_callback=alpn_select_callback if alpn_per_connection else None,
+            **sslctx_kwargs
+        )
+        context.set_session_cache_mode(SSL.SESS_CACHE_SERVER)
+        # Required to resume sessions if client certificates are requested.
+        context.set_session_id(b"mitmproxy")
+        with self._lock:
+            entry = self._contexts.setdefault(ctx_key, (context, key, dhparams))
+            self._contexts.move_to_end(ctx_key)
+            while len(self._contexts) > self.max_size:
+                self._contexts.popitem(last=False)
+        return entry[0]
+
+    def record_resumed(self) -> None:
+        """
+        Count a client handshake that resumed a session.
+        """
+        with self._lock:
+            self.resumed += 1
+
+    def __len__(self):
+        return len(self._contexts)
+
+
+def session_reused(connection: SSL.Connection) -> bool:
+    """
+    Check whether the handshake of a client connection resumed a session.
+    pyOpenSSL has no public API for this, so we return False if the binding
+    is not available.
+    """
+    try:
+        return bool(SSL._lib.SSL_session_reused(connection._ssl))
+    except AttributeError:  # pragma: no cover
+        return False
+
+
 def create_server_context(
         cert: typing.Union[certs.Cert, str],
         key: SSL.PKey,
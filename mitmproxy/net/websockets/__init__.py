@@ -1,5 +1,6 @@
 from .frame import FrameHeader
 from .frame import Frame
+from .frame import FrameReader
 from .frame import OPCODE
 from .frame import CLOSE_REASON
 from .masker import Masker
@@ -18,6 +19,7 @@ from .utils import get_server_accept
 __all__ = [
     "FrameHeader",
     "Frame",
+    "FrameReader",
     "OPCODE",
     "CLOSE_REASON",
     "Masker",
@@ -2,6 +2,7 @@ import os
 import struct
 import io
 
+from mitmproxy import exceptions
 from mitmproxy.net import tcp
 from mitmproxy.utils import strutils
 from mitmproxy.utils import bits
@@ -187,6 +188,54 @@ class FrameHeader:
             masking_key=masking_key,
         )
 
+    @classmethod
+    def from_buffer(cls, buf, offset=0):
+        """
+          parse a WebSocket frame header from buf, starting at offset
+
+          Returns a (header, header length) tuple, or None if buf does not
+          contain the complete header yet.
+        """
+        available = len(buf) - offset
+        if available < 2:
+            return None
+        first_byte = buf[offset]
+        second_byte = buf[offset + 1]
+        mask_bit = second_byte >> 7
+        length_code = second_byte & 0x7F
+
+        header_length = 2
+        if length_code == 126:
+            header_length += 2
+        elif length_code == 127:
+            header_length += 8
+        if mask_bit:
+            header_length += 4
+        if available < header_length:
+            return None
+
+        pos = offset + 2
+        if length_code <= 125:
+            payload_length = length_code
+        elif length_code == 126:
+            payload_length, = struct.unpack_from("!H", buf, pos)
+            pos += 2
+        else:
+            payload_length, = struct.unpack_from("!Q", buf, pos)
+            pos += 8
+
+        return cls(
+            fin=first_byte >> 7,
+            rsv1=(first_byte >> 6) & 1,
+            rsv2=(first_byte >> 5) & 1,
+            rsv3=(first_byte >> 4) & 1,
+            opcode=first_byte & 0xF,
+            mask=mask_bit,
+            length_code=length_code,
+            payload_length=payload_length,
+            masking_key=bytes(buf[pos:pos + 4]) if mask_bit else None,
+        ), header_length
+
     def __eq__(self, other):
         if isinstance(other, FrameHeader):
             return bytes(self) == bytes(other)
@@ -272,3 +321,85 @@ class Frame:
         if isinstance(other, Frame):
             return bytes(self) == bytes(other)
         return False
+
+
+class FrameReader:
+    """
+    Reads WebSocket frames from a file-like object.
+
+    Frame.from_file issues a separate read for every part of the header.
+    FrameReader instead reads everything that is available and parses all
+    complete frames from it. Incomplete frames are kept for the next read.
+    """
+
+    def __init__(self, fp, bufsize=65536):
+        self.fp = fp
+        self.bufsize = bufsize
+        self.buf = b""
+
+    def _split(self):
+        """
+          split all complete frames off the buffer
+        """
+        frames = []
+        offset = 0
+        while True:
+            parsed = FrameHeader.from_buffer(self.buf, offset)
+            if parsed is None:
+                break
+            header, header_length = parsed
+            payload_start = offset + header_length
+            end = payload_start + header.payload_length
+            if end > len(self.buf):
+                break
+            frames.append((header, self.buf[offset:payload_start], self.buf[payload_start:end]))
+            offset = end
+        if offset:
+            self.buf = self.buf[offset:]
+        return frames
+
+    def _read_frames(self):
+        """
+          returns a list of (header, header bytes, payload bytes) tuples
+        """
+        while True:
+            frames = self._split()
+            if frames:
+                return frames
+            parsed = FrameHeader.from_buffer(self.buf)
+            if parsed:
+                # The header is complete, read the rest of the payload in one go.
+                header, header_length = parsed
+                rest = self.fp.safe_read(header_length + header.payload_length - len(self.buf))
+                frame = (header, self.buf[:header_length], self.buf[header_length:] + rest)
+                self.buf = b""
+                return [frame]
+            data = self.fp.read1(self.bufsize)
+            if not data:
+                if self.buf:
+                    raise exceptions.TcpReadIncomplete(
+                        "Incomplete WebSocket frame: got %s bytes" % len(self.buf)
+                    )
+                raise exceptions.TcpDisconnect()
+            self.buf += data
+
+    def read_raw(self):
+        """
+          read at least one frame and return all complete frames that have
+          been received, as they were sent on the wire
+        """
+        return [head + payload for _, head, payload in self._read_frames()]
+
+    def read(self):
+        """
+          read at least one frame and return all complete frames that have
+          been received
+        """
+        frames = []
+        for header, _, payload in self._read_frames():
+            if header.mask == 1 and header.masking_key:
+                payload = Masker(header.masking_key)(payload)
+            frame = Frame(payload)
+            frame.header = header
+            frames.append(frame)
+        return frames
@@ -17,6 +17,16 @@ class Options(optmanager.OptManager):
             "server", bool, True,
             "Start a proxy server. Enabled by default."
         )
+        self.add_option(
+            "server_asyncio", bool, False,
+            """
+            Accept client connections on the main event loop instead of a
+            dedicated server thread. New connections and HTTP/1 connections
+            between two requests are parked on the event loop and only get a
+            handler thread once the client sends data. The protocol layers
+            still run on blocking handler threads.
+            """
+        )
         self.add_option(
             "showhost", bool, False,
             "Use the Host header to construct URLs for display."
@@ -45,6 +55,46 @@ class Options(optmanager.OptManager):
             certificate as the first entry.
             """
         )
+        self.add_option(
+            "cert_cache_size", int, 100,
+            """
+            Number of generated certificates kept in memory. The least
+            recently used certificates are evicted first.
+            """
+        )
+        self.add_option(
+            "cert_cache_persist", bool, False,
+            """
+            Store generated certificates in the confdir, so that they do not
+            have to be generated again after a restart.
+            """
+        )
+        self.add_option(
+            "cert_key_type", str, "rsa",
+            """
+            Key type for generated certificates. ECDSA (P-256) keys make TLS
+            handshakes with clients considerably cheaper. A new CA is created
+            with this key type; an existing CA of another type signs
+            certificates for a separate key stored next to it.
+            """,
+            choices=["rsa", "ecdsa"],
+        )
+        self.add_option(
+            "cert_prewarm", Sequence[str], [],
+            """
+            Generate certificates for these hosts at startup. Entries are of
+            the form host[:port]. If upstream_cert is set, the upstream server
+            is contacted to look up certificate details.
+            """
+        )
+        self.add_option(
+            "cert_prewarm_timeout", int, 10,
+            """
+            Timeout in seconds for connecting to and completing the TLS
+            handshake with an upstream server when looking up certificate
+            details for cert_prewarm.
+            """
+        )
         self.add_option(
             "ciphers_client", Optional[str], None,
             "Set supported ciphers for client connections using OpenSSL syntax."
@@ -67,6 +117,39 @@ class Options(optmanager.OptManager):
             regular expression and matched on the ip or the hostname.
             """
         )
+        self.add_option(
+            "connection_workers", int, 0,
+            """
+            Handle client connections with a bounded pool of this many worker
+            threads. By default, every client connection gets its own thread.
+            """
+        )
+        self.add_option(
+            "connection_queue_size", int, 0,
+            """
+            Maximum number of accepted client connections waiting for a free
+            worker. Only used with connection_workers. 0 means unbounded.
+            """
+        )
+        self.add_option(
+            "connection_queue_full", str, "reject",
+            """
+            What to do with new client connections when the connection queue is
+            full: "reject" closes them, "delay" stops accepting until the queue
+            has room again, "error" replies with a 503 Service Unavailable
+            response.
+            """,
+            choices=["reject", "delay", "error"],
+        )
+        self.add_option(
+            "server_processes", int, 1,
+            """
+            Number of proxy worker processes. With more than one, mitmdump
+            forks workers that share the listen address using SO_REUSEPORT,
+            and observer addons like save and dumper run in the main process.
+            Only supported by mitmdump.
+            """
+        )
         self.add_option(
             "listen_host", str, "",
             "Address to bind proxy to."
@@ -79,6 +162,41 @@ class Options(optmanager.OptManager):
             "upstream_bind_address", str, "",
             "Address to bind upstream requests to."
         )
+        self.add_option(
+            "upstream_pool_size", int, 0,
+            """
+            Maximum number of idle upstream HTTP/1 connections that are kept
+            open and shared between client connections. 0 disables the pool.
+            """
+        )
+        self.add_option(
+            "upstream_pool_per_host", int, 8,
+            "Maximum number of idle pooled connections per upstream server."
+        )
+        self.add_option(
+            "upstream_pool_timeout", int, 30,
+            "Seconds after which an idle pooled upstream connection is closed."
+        )
+        self.add_option(
+            "dns_cache_ttl", int, 0,
+            """
+            Seconds for which name resolution results for upstream connections
+            are cached. 0 disables the cache.
+            """
+        )
+        self.add_option(
+            "dns_cache_negative_ttl", int, 5,
+            "Seconds for which failed name resolutions are cached."
+        )
+        self.add_option(
+            "happy_eyeballs_delay", int, 0,
+            """
+            If a server has multiple addresses, start a connection attempt to
+            the next address (alternating between IPv6 and IPv4) after this many
+            milliseconds, and use whichever connects first. 0 tries the
+            addresses one after another.
+            """
+        )
         self.add_option(
             "mode", str, "regular",
             """
@@ -91,6 +209,19 @@ class Options(optmanager.OptManager):
             "upstream_cert", bool, True,
             "Connect to upstream server to look up certificate details."
         )
+        self.add_option(
+            "upstream_cert_cache_size", int, 0,
+            """
+            Number of upstream servers whose certificate details are cached.
+            On a hit, the client handshake completes without waiting for the
+            upstream connection, which is established when it is needed.
+            0 disables the cache.
+            """
+        )
+        self.add_option(
+            "upstream_cert_cache_ttl", int, 300,
+            "Seconds after which cached upstream certificate details expire."
+        )
 
         self.add_option(
             "http2", bool, True,
@@ -104,17 +235,76 @@ class Options(optmanager.OptManager):
             with misbehaving servers.
             """
         )
+        self.add_option(
+            "http2_stream_workers", int, 0,
+            """
+            Experimental: reuse up to this many threads for the streams of an
+            HTTP/2 connection. Every stream is still handled by blocking code
+            on a thread of its own while it runs. When all pooled threads are
+            busy, further streams get a new thread, so long-lived streams do
+            not hold up others. 0 starts a thread for every stream.
+            """
+        )
         self.add_option(
             "websocket", bool, True,
             "Enable/disable WebSocket support. "
             "WebSocket support is enabled by default.",
         )
+        self.add_option(
+            "websocket_message_limit", int, 0,
+            """
+            Keep at most this many messages of a WebSocket flow in memory.
+            Older messages are discarded, or written to save_stream_file as
+            the connection goes on. 0 means no limit.
+            """
+        )
+        self.add_option(
+            "websocket_message_size_limit", Optional[str], None,
+            """
+            Keep at most this many bytes of messages of a WebSocket flow in
+            memory. Understands k/m/g suffixes, i.e. 3m for 3 megabytes.
+            """
+        )
         self.add_option(
             "rawtcp", bool, False,
             "Enable/disable experimental raw TCP support. TCP connections starting with non-ascii "
             "bytes are treated as if they would match tcp_hosts. The heuristic is very rough, use "
             "with caution. Disabled by default. "
         )
+        self.add_option(
+            "tcp_message_limit", int, 0,
+            """
+            Keep at most this many messages of a TCP flow in memory. Older
+            messages are discarded, or written to a temporary file with
+            tcp_message_spill. 0 means no limit.
+            """
+        )
+        self.add_option(
+            "tcp_message_size_limit", Optional[str], None,
+            """
+            Keep at most this many bytes of messages of a TCP flow in memory.
+            Understands k/m/g suffixes, i.e. 3m for 3 megabytes.
+            """
+        )
+        self.add_option(
+            "tcp_message_spill", bool, False,
+            """
+            Write TCP messages that exceed tcp_message_limit or
+            tcp_message_size_limit to a temporary file instead of discarding
+            them.
+            """
+        )
+        self.add_option(
+            "tcp_message_interval", int, 0,
+            """
+            Run the tcp_message event at most once per this many milliseconds,
+            for all messages received in the meantime. Messages are forwarded
+            before the event runs, so changes to their content have no effect.
+            The new messages are the last flow.new_messages entries of
+            flow.messages. 0 runs the event for every message before it is
+            forwarded.
+            """
+        )
 
         self.add_option(
             "spoof_source_address", bool, False,
@@ -131,6 +321,14 @@ class Options(optmanager.OptManager):
             """,
             choices=list(tls.VERSION_CHOICES.keys()),
         )
+        self.add_option(
+            "ssl_client_context_cache_size", int, 100,
+            """
+            Number of TLS contexts for client connections kept for reuse,
+            which also allows clients to resume their TLS sessions.
+            Set to 0 to create a new context for every client connection.
+            """
+        )
         self.add_option(
             "ssl_version_server", str, "secure",
             """
@@ -154,6 +352,19 @@ class Options(optmanager.OptManager):
             "ssl_verify_upstream_trusted_ca", Optional[str], None,
             "Path to a PEM formatted trusted CA certificate."
         )
+        self.add_option(
+            "ssl_session_cache_size", int, 0,
+            """
+            Maximum number of upstream TLS sessions kept for resumption.
+            0 disables session resumption. Resumed connections are verified
+            with the same settings, but the upstream certificate chain is
+            taken from the cached session.
+            """
+        )
+        self.add_option(
+            "ssl_session_cache_ttl", int, 300,
+            "Seconds after which a cached upstream TLS session is no longer resumed."
+        )
         self.add_option(
             "tcp_hosts", Sequence[str], [],
             """
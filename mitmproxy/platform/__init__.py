@@ -17,23 +17,41 @@ def original_addr(csock: socket.socket) -> Tuple[str, int]:
     """
 
 
+SPLICE_F_MOVE = 1
+SPLICE_F_NONBLOCK = 2
+
+
+def splice(fd_in: int, fd_out: int, count: int, flags: int = 0) -> int:
+    """
+    Move up to count bytes between two file descriptors using splice(2),
+    so that the data does not have to be copied into userspace. One of the
+    file descriptors must be a pipe. Returns the number of bytes moved.
+    This function will be None if splice(2) is not available.
+    """
+
+
 if re.match(r"linux(?:2)?", sys.platform):
     from . import linux
 
     original_addr = linux.original_addr  # noqa
+    splice = linux.splice if linux._splice else None  # noqa
 elif sys.platform == "darwin" or sys.platform.startswith("freebsd"):
     from . import osx
 
     original_addr = osx.original_addr  # noqa
+    splice = None  # noqa
 elif sys.platform.startswith("openbsd"):
     from . import openbsd
 
     original_addr = openbsd.original_addr  # noqa
+    splice = None  # noqa
 elif sys.platform == "win32":
     from . import windows
 
     resolver = windows.Resolver()
     init_transparent_mode = resolver.setup  # noqa
     original_addr = resolver.original_addr  # noqa
+    splice = None  # noqa
 else:
     original_addr = None  # noqa
+    splice = None  # noqa
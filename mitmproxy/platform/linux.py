@@ -1,3 +1,7 @@
+import ctypes
+import ctypes.util
+import errno
+import os
 import socket
 import struct
 import typing
@@ -7,6 +11,32 @@ SO_ORIGINAL_DST = 80
 SOL_IPV6 = 41
 
 
+def _load_splice():
+    # os.splice only exists on Python 3.10+, so we call libc directly.
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        func = libc.splice
+    except (OSError, AttributeError):  # pragma: no cover
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_uint]
+    func.restype = ctypes.c_ssize_t
+    return func
+
+
+_splice = _load_splice()
+
+
+def splice(fd_in: int, fd_out: int, count: int, flags: int = 0) -> int:
+    while True:
+        size = _splice(fd_in, None, fd_out, None, count, flags)
+        if size >= 0:
+            return size
+        e = ctypes.get_errno()
+        if e != errno.EINTR:
+            # OSError picks the matching subclass, e.g. BlockingIOError for EAGAIN.
+            raise OSError(e, os.strerror(e))
+
+
 def original_addr(csock: socket.socket) -> typing.Tuple[str, int]:
     # Get the original destination on Linux.
     # In theory, this can be done using the following syscalls:
@@ -1,3 +1,4 @@
+import functools
 import os
 import re
 import typing
@@ -7,25 +8,89 @@ from OpenSSL import crypto
 from mitmproxy import exceptions
 from mitmproxy import options as moptions
 from mitmproxy import certs
+from mitmproxy.net import resolver
 from mitmproxy.net import server_spec
+from mitmproxy.net import tls
+from mitmproxy.proxy import pool
+from mitmproxy.utils import human
 
 CONF_BASENAME = "mitmproxy"
 
 
+# Patterns for plain hostnames, e.g. "^example\\.com:443$" or "^(.+\\.)?example\\.com:443$",
+# which can be looked up in a set instead of being matched as a regex.
+_HOSTNAME = r"(?:[a-zA-Z0-9-]+\\\.)*[a-zA-Z0-9-]+"
+_EXACT_PATTERN = re.compile(r"\^(?P<host>%s):(?P<port>\d+)\$" % _HOSTNAME)
+_SUFFIX_PATTERN = re.compile(r"\^\(\.(?P<q>[+*])\\\.\)\?(?P<host>%s):(?P<port>\d+)\$" % _HOSTNAME)
+# Patterns that cannot be part of a combined alternation: global flags must be at the start
+# of the expression, and group references would refer to the wrong group.
+_UNCOMBINABLE = re.compile(r"\(\?[aiLmsux]+\)|\(\?P=|\(\?\(|\\[1-9]")
+
+
 class HostMatcher:
+    """
+    Matches "host:port" against a list of regular expressions (case-insensitive search).
+
+    Patterns for plain hostnames are looked up in hash sets, all other patterns are
+    combined into a single regular expression. Recent decisions are cached.
+    """
+    CACHE_SIZE = 1024
 
     def __init__(self, patterns=tuple()):
         self.patterns = list(patterns)
+        # Compile every pattern on its own first, so that invalid patterns raise as before.
         self.regexes = [re.compile(p, re.IGNORECASE) for p in self.patterns]
 
+        self.exact: typing.Set[typing.Tuple[str, str]] = set()
+        # Hostnames with any subdomain, ".+" requires a non-empty subdomain, ".*" does not.
+        self.suffixes_plus: typing.Set[typing.Tuple[str, str]] = set()
+        self.suffixes_star: typing.Set[typing.Tuple[str, str]] = set()
+        combinable = []
+        self.uncombined = []
+        for pattern, rex in zip(self.patterns, self.regexes):
+            m = _EXACT_PATTERN.fullmatch(pattern)
+            if m:
+                self.exact.add((m.group("host").replace("\\", "").lower(), m.group("port")))
+                continue
+            m = _SUFFIX_PATTERN.fullmatch(pattern)
+            if m:
+                suffixes = self.suffixes_plus if m.group("q") == "+" else self.suffixes_star
+                suffixes.add((m.group("host").replace("\\", "").lower(), m.group("port")))
+                continue
+            if _UNCOMBINABLE.search(pattern):
+                self.uncombined.append(rex)
+            else:
+                combinable.append(pattern)
+        self.combined = None
+        if combinable:
+            self.combined = re.compile("|".join("(?:%s)" % p for p in combinable), re.IGNORECASE)
+
+        self._match = functools.lru_cache(maxsize=self.CACHE_SIZE)(self._match)
+
     def __call__(self, address):
         if not address:
             return False
+        return self._match(tuple(address))
+
+    def _match(self, address) -> bool:
         host = "%s:%s" % address
-        if any(rex.search(host) for rex in self.regexes):
+        if self.exact or self.suffixes_plus or self.suffixes_star:
+            hostname, _, port = host.rpartition(":")
+            hostname = hostname.lower()
+            if (
+                (hostname, port) in self.exact or
+                (hostname, port) in self.suffixes_plus or
+                (hostname, port) in self.suffixes_star
+            ):
+                return True
+            for i, c in enumerate(hostname):
+                if c == ".":
+                    parent = (hostname[i + 1:], port)
+                    if parent in self.suffixes_star or (i > 0 and parent in self.suffixes_plus):
+                        return True
+        if self.combined and self.combined.search(host):
             return True
-        else:
-            return False
+        return any(rex.search(host) for rex in self.uncombined)
 
     def __bool__(self):
         return bool(self.patterns)
@@ -40,6 +105,13 @@ class ProxyConfig:
         self.check_tcp: HostMatcher = None
         self.certstore: certs.CertStore = None
         self.upstream_server: typing.Optional[server_spec.ServerSpec] = None
+        self.upstream_pool: typing.Optional[pool.ConnectionPool] = None
+        self.tls_session_cache: typing.Optional[tls.ClientSessionCache] = None
+        self.tls_context_cache: typing.Optional[tls.ServerContextCache] = None
+        self.upstream_cert_cache: typing.Optional[tls.UpstreamCertCache] = None
+        self.resolver: typing.Optional[resolver.Resolver] = None
+        self.tcp_message_size_limit: typing.Optional[int] = None
+        self.websocket_message_size_limit: typing.Optional[int] = None
         self.configure(options, set(options.keys()))
         options.changed.connect(self.configure)
 
@@ -48,34 +120,104 @@ class ProxyConfig:
             self.check_ignore = HostMatcher(options.ignore_hosts)
         if "tcp_hosts" in updated:
             self.check_tcp = HostMatcher(options.tcp_hosts)
+        if "tcp_message_size_limit" in updated:
+            try:
+                self.tcp_message_size_limit = human.parse_size(options.tcp_message_size_limit)
+            except ValueError as e:
+                raise exceptions.OptionsError(e)
+        if "websocket_message_size_limit" in updated:
+            try:
+                self.websocket_message_size_limit = human.parse_size(options.websocket_message_size_limit)
+            except ValueError as e:
+                raise exceptions.OptionsError(e)
+        pool_options = {
+            "upstream_pool_size", "upstream_pool_per_host",
+            "upstream_pool_timeout", "spoof_source_address",
+            # Idle connections have been established with the old settings.
+            "upstream_bind_address", "client_certs", "ciphers_server",
+            "ssl_version_server", "ssl_insecure",
+            "ssl_verify_upstream_trusted_ca", "ssl_verify_upstream_trusted_confdir",
+        }
+        if pool_options & set(updated):
+            if options.upstream_pool_per_host < 1:
+                raise exceptions.OptionsError("upstream_pool_per_host must be at least 1.")
+            if self.upstream_pool is not None:
+                self.upstream_pool.clear()
+                self.upstream_pool = None
+            # Spoofed connections are bound to a single client's address.
+            if options.upstream_pool_size > 0 and not options.spoof_source_address:
+                self.upstream_pool = pool.ConnectionPool(
+                    options.upstream_pool_size,
+                    options.upstream_pool_per_host,
+                    options.upstream_pool_timeout,
+                )
 
-        certstore_path = os.path.expanduser(options.confdir)
-        if not os.path.exists(os.path.dirname(certstore_path)):
-            raise exceptions.OptionsError(
-                "Certificate Authority parent directory does not exist: %s" %
-                os.path.dirname(certstore_path)
-            )
-        self.certstore = certs.CertStore.from_store(
-            certstore_path,
-            CONF_BASENAME
-        )
-
-        for c in options.certs:
-            parts = c.split("=", 1)
-            if len(parts) == 1:
-                parts = ["*", parts[0]]
-
-            cert = os.path.expanduser(parts[1])
-            if not os.path.exists(cert):
-                raise exceptions.OptionsError(
-                    "Certificate file does not exist: %s" % cert
+        if {"ssl_session_cache_size", "ssl_session_cache_ttl"} & set(updated):
+            self.tls_session_cache = None
+            if options.ssl_session_cache_size > 0:
+                self.tls_session_cache = tls.ClientSessionCache(
+                    options.ssl_session_cache_size,
+                    options.ssl_session_cache_ttl,
                 )
-            try:
-                self.certstore.add_cert_file(parts[0], cert)
-            except crypto.Error:
+
+        if "ssl_client_context_cache_size" in updated:
+            self.tls_context_cache = None
+            if options.ssl_client_context_cache_size > 0:
+                self.tls_context_cache = tls.ServerContextCache(
+                    options.ssl_client_context_cache_size
+                )
+
+        if {"dns_cache_ttl", "dns_cache_negative_ttl"} & set(updated):
+            self.resolver = None
+            if options.dns_cache_ttl > 0:
+                self.resolver = resolver.Resolver(
+                    options.dns_cache_ttl,
+                    options.dns_cache_negative_ttl,
+                )
+
+        if {"upstream_cert_cache_size", "upstream_cert_cache_ttl"} & set(updated):
+            self.upstream_cert_cache = None
+            if options.upstream_cert_cache_size > 0:
+                self.upstream_cert_cache = tls.UpstreamCertCache(
+                    options.upstream_cert_cache_size,
+                    options.upstream_cert_cache_ttl,
+                )
+
+        # Regenerating the store would throw away all cached certificates.
+        if {"confdir", "certs", "cert_cache_size", "cert_cache_persist", "cert_key_type"} & set(updated):
+            if options.cert_cache_size < 1:
+                raise exceptions.OptionsError("cert_cache_size must be at least 1.")
+            certstore_path = os.path.expanduser(options.confdir)
+            if not os.path.exists(os.path.dirname(certstore_path)):
                 raise exceptions.OptionsError(
-                    "Invalid certificate format: %s" % cert
+                    "Certificate Authority parent directory does not exist: %s" %
+                    os.path.dirname(certstore_path)
                 )
+            self.certstore = certs.CertStore.from_store(
+                certstore_path,
+                CONF_BASENAME,
+                options.cert_cache_size,
+                options.cert_cache_persist,
+                options.cert_key_type,
+            )
+
+            for c in options.certs:
+                parts = c.split("=", 1)
+                if len(parts) == 1:
+                    parts = ["*", parts[0]]
+
+                cert = os.path.expanduser(parts[1])
+                if not os.path.exists(cert):
+                    raise exceptions.OptionsError(
+                        "Certificate file does not exist: %s" % cert
+                    )
+                try:
+                    self.certstore.add_cert_file(parts[0], cert)
+                except crypto.Error:
+                    raise exceptions.OptionsError(
+                        "Invalid certificate format: %s" % cert
+                    )
+
         m = options.mode
         if m.startswith("upstream:") or m.startswith("reverse:"):
             _, spec = server_spec.parse_with_mode(options.mode)
@@ -1,3 +1,4 @@
+from mitmproxy import exceptions
 from mitmproxy.proxy import protocol
 
 
@@ -9,8 +10,13 @@ class ReverseProxy(protocol.Layer, protocol.ServerConnectionMixin):
 
     def __call__(self):
         layer = self.ctx.next_layer(self)
+        idle = False
         try:
             layer()
+        except exceptions.ClientIdle:
+            # The server connection stays open while the client connection is parked.
+            idle = True
+            raise
         finally:
-            if self.server_conn.connected():
+            if self.server_conn.connected() and not idle:
                 self.disconnect()
@@ -50,8 +50,13 @@ class Socks5Proxy(protocol.Layer, protocol.ServerConnectionMixin):
         self.server_conn.address = connect_request.addr
 
         layer = self.ctx.next_layer(self)
+        idle = False
         try:
             layer()
+        except exceptions.ClientIdle:
+            # The server connection stays open while the client connection is parked.
+            idle = True
+            raise
         finally:
-            if self.server_conn.connected():
+            if self.server_conn.connected() and not idle:
                 self.disconnect()
@@ -15,8 +15,13 @@ class TransparentProxy(protocol.Layer, protocol.ServerConnectionMixin):
             raise exceptions.ProtocolException("Transparent mode failure: %s" % repr(e))
 
         layer = self.ctx.next_layer(self)
+        idle = False
         try:
             layer()
+        except exceptions.ClientIdle:
+            # The server connection stays open while the client connection is parked.
+            idle = True
+            raise
         finally:
-            if self.server_conn.connected():
+            if self.server_conn.connected() and not idle:
                 self.disconnect()
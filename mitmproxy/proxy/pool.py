@@ -0,0 +1,135 @@
+import collections
+import threading
+import time
+import typing
+
+from mitmproxy import connections
+from mitmproxy import exceptions
+from mitmproxy.net import tcp
+
+PoolKey = typing.Tuple[tuple, bool, typing.Optional[str]]
+
+
+class ConnectionPool:
+    """
+        A pool of idle upstream connections, shared by all client connections.
+
+        Connections are keyed by (address, tls, sni), so that a connection is
+        only handed out to a client connection that would have established
+        the exact same connection itself.
+    """
+
+    def __init__(self, max_idle: int, max_per_host: int, idle_timeout: float) -> None:
+        self.max_idle = max_idle
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+
+        self._lock = threading.Lock()
+        self._idle: typing.Dict[PoolKey, typing.Deque[connections.ServerConnection]] = {}
+        # All idle connections in release order, oldest first.
+        self._released: typing.Dict[connections.ServerConnection, typing.Tuple[PoolKey, float]] = (
+            collections.OrderedDict()
+        )
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(address, tls: bool, sni: typing.Optional[str]) -> PoolKey:
+        return tuple(address), bool(tls), sni if tls else None
+
+    def __len__(self):
+        return len(self._released)
+
+    def acquire(self, key: PoolKey) -> typing.Optional[connections.ServerConnection]:
+        """
+            Take an idle connection for key out of the pool.
+            Returns None if there is no usable connection.
+        """
+        while True:
+            with self._lock:
+                conns = self._idle.get(key)
+                if not conns:
+                    self.misses += 1
+                    return None
+                # The most recently used connection is the least likely to
+                # have been closed by the server.
+                conn = conns.pop()
+                _, released = self._remove(conn)
+            if time.time() - released < self.idle_timeout and self._alive(conn):
+                with self._lock:
+                    self.hits += 1
+                return conn
+            self._close(conn)
+
+    def release(self, conn: connections.ServerConnection) -> bool:
+        """
+            Return a connection to the pool after a complete request/response
+            exchange. Returns False if the pool is full and the connection
+            should be closed instead.
+        """
+        self.expire()
+        key = self.key(conn.address, conn.tls_established, conn.sni)
+        evicted = []
+        with self._lock:
+            conns = self._idle.get(key) or collections.deque()
+            if len(conns) >= self.max_per_host:
+                return False
+            conns.append(conn)
+            self._idle[key] = conns
+            self._released[conn] = (key, time.time())
+            while len(self._released) > self.max_idle:
+                oldest = next(iter(self._released))
+                self._idle[self._released[oldest][0]].remove(oldest)
+                self._remove(oldest)
+                evicted.append(oldest)
+        for c in evicted:
+            self._close(c)
+        return True
+
+    def expire(self) -> None:
+        """
+            Close all connections that have been idle for longer than idle_timeout.
+        """
+        now = time.time()
+        expired = []
+        with self._lock:
+            for conn, (key, released) in list(self._released.items()):
+                if now - released < self.idle_timeout:
+                    break
+                self._idle[key].remove(conn)
+                self._remove(conn)
+                expired.append(conn)
+        for conn in expired:
+            self._close(conn)
+
+    def clear(self) -> None:
+        with self._lock:
+            conns = list(self._released)
+            self._idle.clear()
+            self._released.clear()
+        for conn in conns:
+            self._close(conn)
+
+    def _remove(self, conn):
+        key, released = self._released.pop(conn)
+        if not self._idle[key]:
+            del self._idle[key]
+        return key, released
+
+    @staticmethod
+    def _alive(conn: connections.ServerConnection) -> bool:
+        # An idle HTTP/1 connection must not be readable: either the server
+        # has closed it, or it sent data we cannot attribute to any request.
+        try:
+            return not tcp.ssl_read_select([conn.connection], 0)
+        except (OSError, ValueError):
+            return False
+
+    @staticmethod
+    def _close(conn: connections.ServerConnection) -> None:
+        try:
+            conn.finish()
+        except exceptions.TcpException:
+            pass
+        conn.close()
@@ -140,16 +140,49 @@ class ServerConnectionMixin:
     def disconnect(self):
         """
         Deletes (and closes) an existing server connection.
+        Idle keep-alive connections are handed to the upstream pool instead, if enabled.
         Must not be called if there is no existing connection.
         """
-        self.log("serverdisconnect", "debug", [repr(self.server_conn.address)])
         address = self.server_conn.address
-        self.server_conn.finish()
-        self.server_conn.close()
+        pool = self.config.upstream_pool
+        if pool is not None and self.server_conn.keep_alive:
+            # The pool gets its own connection object, so that this one
+            # ends here like any other server connection.
+            idle = self.server_conn.detach()
+            if pool.release(idle):
+                self.log("serverrelease", "debug", [repr(address)])
+            else:
+                idle.finish()
+                idle.close()
+        else:
+            self.server_conn.finish()
+            self.server_conn.close()
+        self.log("serverdisconnect", "debug", [repr(address)])
         self.channel.tell("serverdisconnect", self.server_conn)
 
         self.server_conn = self.__make_server_conn(address)
 
+    def reuse_server_conn(self, address, tls, sni):
+        """
+        Connects the unconnected server connection by taking over an idle
+        connection to the same server from the upstream pool. Unlike
+        :py:meth:`connect`, serverconnect is called once the connection is
+        established.
+
+        Returns:
+            True, if a pooled connection is used.
+        """
+        pool = self.config.upstream_pool
+        if pool is None or self.server_conn.connected() or self.server_conn.address != address:
+            return False
+        conn = pool.acquire(pool.key(address, tls, sni))
+        if not conn:
+            return False
+        self.log("serverreuse", "debug", [repr(address)])
+        self.server_conn.take_over(conn)
+        self.channel.ask("serverconnect", self.server_conn)
+        return True
+
     def connect(self):
         """
         Establishes a server connection.
@@ -163,7 +196,10 @@ class ServerConnectionMixin:
         self.log("serverconnect", "debug", [repr(self.server_conn.address)])
         self.channel.ask("serverconnect", self.server_conn)
         try:
-            self.server_conn.connect()
+            self.server_conn.connect(
+                resolver=self.config.resolver,
+                happy_eyeballs_delay=self.config.options.happy_eyeballs_delay / 1000
+            )
         except exceptions.TcpException as e:
             raise exceptions.ProtocolException(
                 "Server connection to {} failed: {}".format(
@@ -50,6 +50,13 @@ class _HttpTransmissionLayer(base.Layer):
     def check_close_connection(self, f):
         raise NotImplementedError()
 
+    def client_idle(self):
+        """
+            Check whether the client connection can be parked until the client
+            sends its next request.
+        """
+        return False
+
 
 class ConnectServerConnection:
 
@@ -178,6 +185,9 @@ class HttpLayer(base.Layer):
         if self.mode == HTTPMode.transparent:
             self.__initial_server_tls = self.server_tls
             self.__initial_server_address = self.server_conn.address
+        self.resume()
+
+    def resume(self):
         while True:
             flow = http.HTTPFlow(
                 self.client_conn,
@@ -187,6 +197,11 @@ class HttpLayer(base.Layer):
             )
             if not self._process_flow(flow):
                 return
+            if self.park_idle and self.client_idle():
+                # Give the handler thread back while the client has nothing
+                # to send. The outer layers unwind, but the protocol stack
+                # below this layer is kept and we continue with resume().
+                raise exceptions.ClientIdle(self)
 
     def handle_regular_connect(self, f):
         self.connect_request = True
@@ -334,6 +349,7 @@ class HttpLayer(base.Layer):
                 )
 
                 def get_response():
+                    self.server_conn.keep_alive = False
                     self.send_request_headers(f.request)
                     if f.request.stream:
                         chunks = self.read_request_body(f.request)
@@ -396,6 +412,8 @@ class HttpLayer(base.Layer):
                 # no further manipulation of self.server_conn beyond this point
                 # we can safely set it as the final attribute value here.
                 f.server_conn = self.server_conn
+                if self.server_conn.reused_from:
+                    f.metadata["reused_server_conn"] = self.server_conn.reused_from
             else:
                 # response was set by an inline script.
                 # we now need to emulate the responseheaders hook.
@@ -425,6 +443,11 @@ class HttpLayer(base.Layer):
             if self.check_close_connection(f):
                 return False
 
+            if f.server_conn is self.server_conn and f.response.status_code != 101:
+                # The exchange is complete, so the server connection is idle
+                # and may be passed on to another client connection.
+                self.server_conn.keep_alive = self.mode is not HTTPMode.upstream
+
             # Handle 101 Switching Protocols
             if f.response.status_code == 101:
                 # Handle a successful HTTP 101 Switching Protocols Response,
@@ -490,7 +513,9 @@ class HttpLayer(base.Layer):
                 self.set_server_tls(tls, address[0])
             # Establish connection is necessary.
             if not self.server_conn.connected():
-                self.connect()
+                sni = self.server_sni if tls else None
+                if not self.reuse_server_conn(address, tls, sni):
+                    self.connect()
         else:
             if not self.server_conn.connected():
                 self.connect()
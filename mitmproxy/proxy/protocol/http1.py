@@ -1,5 +1,6 @@
 from mitmproxy import http
 from mitmproxy.proxy.protocol import http as httpbase
+from mitmproxy.net import tcp
 from mitmproxy.net.http import http1
 from mitmproxy.utils import human
 
@@ -59,6 +60,12 @@ class Http1Layer(httpbase._HttpTransmissionLayer):
             self.client_conn.wfile.write(chunk)
             self.client_conn.wfile.flush()
 
+    def client_idle(self):
+        try:
+            return not tcp.ssl_read_select([self.client_conn.connection], 0)
+        except (OSError, ValueError):  # pragma: no cover
+            return False
+
     def check_close_connection(self, flow):
         request_close = http1.connection_close(
             flow.request.http_version,
@@ -1,7 +1,9 @@
+import concurrent.futures
+import contextlib
 import threading
 import time
 import functools
-from typing import Dict, Callable, Any, List  # noqa
+from typing import Dict, Callable, Any, List, Optional  # noqa
 
 import h2.exceptions
 from h2 import connection
@@ -26,6 +28,26 @@ class SafeH2Connection(connection.H2Connection):
         super().__init__(*args, **kwargs)
         self.conn = conn
         self.lock = threading.RLock()
+        # Set while a deferred_send() block holds the lock.
+        self.send_deferred = False
+
+    def _send(self):
+        if not self.send_deferred:
+            self.conn.send(self.data_to_send())
+
+    @contextlib.contextmanager
+    def deferred_send(self):
+        """
+            Hold the lock and coalesce all data queued by the safe_* methods
+            in this block into a single write at the end.
+        """
+        with self.lock:
+            self.send_deferred = True
+            try:
+                yield
+            finally:
+                self.send_deferred = False
+            self.conn.send(self.data_to_send())
 
     def safe_acknowledge_received_data(self, acknowledged_size: int, stream_id: int):
         if acknowledged_size == 0:
@@ -33,7 +55,7 @@ class SafeH2Connection(connection.H2Connection):
 
         with self.lock:
             self.acknowledge_received_data(acknowledged_size, stream_id)
-            self.conn.send(self.data_to_send())
+            self._send()
 
     def safe_reset_stream(self, stream_id: int, error_code: int):
         with self.lock:
@@ -42,12 +64,12 @@ class SafeH2Connection(connection.H2Connection):
             except h2.exceptions.StreamClosedError:  # pragma: no cover
                 # stream is already closed - good
                 pass
-            self.conn.send(self.data_to_send())
+            self._send()
 
     def safe_update_settings(self, new_settings: Dict[int, Any]):
         with self.lock:
             self.update_settings(new_settings)
-            self.conn.send(self.data_to_send())
+            self._send()
 
     def safe_send_headers(self, raise_zombie: Callable, stream_id: int, headers: headers.Headers, **kwargs):
         with self.lock:
@@ -83,6 +105,10 @@ class SafeH2Connection(connection.H2Connection):
 
 class Http2Layer(base.Layer):
 
+    # Maximum number of bytes read from a connection at once. All frames in them
+    # are passed to h2 together, and everything sent in response is written at once.
+    read_size = 65536
+
     if False:
         # mypy type hints
         client_conn: connections.ClientConnection = None
@@ -101,6 +127,36 @@ class Http2Layer(base.Layer):
             validate_inbound_headers=False)
         self.connections[self.client_conn] = SafeH2Connection(self.client_conn, config=config)
 
+        self.stream_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        if self.config.options.http2_stream_workers:
+            self.stream_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.config.options.http2_stream_workers,
+                thread_name_prefix="Http2SingleStreamLayer",
+            )
+        # Number of streams handed to stream_executor that have not finished yet.
+        self.pooled_streams = 0
+        self.pooled_streams_lock = threading.Lock()
+
+    def _start_stream(self, stream):
+        if self.stream_executor:
+            with self.pooled_streams_lock:
+                pooled = self.pooled_streams < self.config.options.http2_stream_workers
+                if pooled:
+                    self.pooled_streams += 1
+            if pooled:
+                self.stream_executor.submit(self._run_pooled_stream, stream)
+                return
+        # Streams never wait for a pooled thread: a long-lived stream, e.g. a
+        # streamed response, must not hold up the others.
+        stream.start()
+
+    def _run_pooled_stream(self, stream):
+        try:
+            stream.run()
+        finally:
+            with self.pooled_streams_lock:
+                self.pooled_streams -= 1
+
     def _initiate_server_conn(self):
         if self.server_conn.connected():
             config = h2.config.H2Configuration(
@@ -171,7 +227,7 @@ class Http2Layer(base.Layer):
             self.streams[eid].priority_depends_on = event.priority_updated.depends_on
             self.streams[eid].priority_weight = event.priority_updated.weight
             self.streams[eid].handled_priority_event = event.priority_updated
-        self.streams[eid].start()
+        self._start_stream(self.streams[eid])
         self.streams[eid].request_arrived.set()
         return True
 
@@ -264,7 +320,7 @@ class Http2Layer(base.Layer):
         self.streams[event.pushed_stream_id].timestamp_end = time.time()
         self.streams[event.pushed_stream_id].request_arrived.set()
         self.streams[event.pushed_stream_id].request_data_finished.set()
-        self.streams[event.pushed_stream_id].start()
+        self._start_stream(self.streams[event.pushed_stream_id])
         return True
 
     def _handle_priority_updated(self, eid, event):
@@ -339,9 +395,11 @@ class Http2Layer(base.Layer):
 
                     with self.connections[source_conn].lock:
                         try:
-                            raw_frame = b''.join(http2.read_raw_frame(source_conn.rfile))
+                            data = source_conn.rfile.read1(self.read_size)
                         except:
-                            # read frame failed: connection closed
+                            data = b''
+                        if not data:
+                            # read failed: connection closed
                             self._kill_all_streams()
                             return
 
@@ -349,19 +407,22 @@ class Http2Layer(base.Layer):
                             self.log("HTTP/2 connection entered closed state already", "debug")
                             return
 
-                        incoming_events = self.connections[source_conn].receive_data(raw_frame)
-                        source_conn.send(self.connections[source_conn].data_to_send())
-
-                        for event in incoming_events:
-                            if not self._handle_event(event, source_conn, other_conn, is_server):
-                                # connection terminated: GoAway
-                                self._kill_all_streams()
-                                return
+                        with self.connections[source_conn].deferred_send():
+                            incoming_events = self.connections[source_conn].receive_data(data)
+                            for event in incoming_events:
+                                if not self._handle_event(event, source_conn, other_conn, is_server):
+                                    # connection terminated: GoAway
+                                    self._kill_all_streams()
+                                    return
 
                     self._cleanup_streams()
         except Exception as e:  # pragma: no cover
             self.log(repr(e), "info")
             self._kill_all_streams()
+        finally:
+            if self.stream_executor:
+                # Pooled streams are zombies by now and exit on their own.
+                self.stream_executor.shutdown(wait=False)
 
 
 def detect_zombie_stream(func):  # pragma: no cover
@@ -635,7 +696,7 @@ class Http2SingleStreamLayer(httpbase._HttpTransmissionLayer, basethread.BaseThr
         )
 
     def __call__(self):  # pragma: no cover
-        raise EnvironmentError('Http2SingleStreamLayer must be run as thread')
+        raise EnvironmentError('Http2SingleStreamLayer must be run as thread or by Http2Layer.stream_executor')
 
     def run(self):
         layer = httpbase.HttpLayer(self, self.mode)
@@ -1,4 +1,7 @@
+import os
+import select
 import socket
+import time
 
 from OpenSSL import SSL
 
@@ -6,14 +9,23 @@ import mitmproxy.net.tcp
 from mitmproxy import tcp
 from mitmproxy import flow
 from mitmproxy import exceptions
+from mitmproxy import platform
 from mitmproxy.proxy.protocol import base
 
 
 class RawTCPLayer(base.Layer):
     chunk_size = 4096
+    # Ignored plaintext connections are relayed with splice(2) where available (Linux),
+    # so that the data never has to be copied into userspace.
+    splice = platform.splice is not None
+    # The default pipe capacity on Linux.
+    splice_size = 65536
 
     def __init__(self, ctx, ignore=False):
         self.ignore = ignore
+        # Number and size of the messages in memory, as of the last _trim_messages().
+        self._message_count = 0
+        self._message_bytes = 0
         super().__init__(ctx)
 
     def __call__(self):
@@ -29,9 +41,24 @@ class RawTCPLayer(base.Layer):
         server = self.server_conn.connection
         conns = [client, server]
 
+        interval = self.config.options.tcp_message_interval / 1000
+        # Messages appended since the last tcp_message event if events are batched.
+        pending = 0
+        last_event = time.monotonic()
+
         try:
+            if (
+                self.ignore and self.splice and
+                not isinstance(client, SSL.Connection) and
+                not isinstance(server, SSL.Connection)
+            ):
+                return self._splice(client, server)
+
             while not self.channel.should_exit.is_set():
-                r = mitmproxy.net.tcp.ssl_read_select(conns, 10)
+                timeout = 10
+                if pending:
+                    timeout = max(0, last_event + interval - time.monotonic())
+                r = mitmproxy.net.tcp.ssl_read_select(conns, timeout)
                 for conn in r:
                     dst = server if conn == client else client
 
@@ -50,11 +77,25 @@ class RawTCPLayer(base.Layer):
                             return
                         continue
 
+                    if self.ignore:
+                        dst.sendall(buf[:size])
+                        continue
                     tcp_message = tcp.TCPMessage(dst == server, buf[:size].tobytes())
-                    if not self.ignore:
-                        f.messages.append(tcp_message)
+                    f.messages.append(tcp_message)
+                    if interval:
+                        dst.sendall(tcp_message.content)
+                        pending += 1
+                    else:
                         self.channel.ask("tcp_message", f)
-                    dst.sendall(tcp_message.content)
+                        dst.sendall(tcp_message.content)
+                        self._trim_messages(f)
+
+                if pending and time.monotonic() - last_event >= interval:
+                    f.new_messages = pending
+                    pending = 0
+                    self.channel.ask("tcp_message", f)
+                    self._trim_messages(f)
+                    last_event = time.monotonic()
 
         except (socket.error, exceptions.TcpException, SSL.Error) as e:
             if not self.ignore:
@@ -62,4 +103,75 @@ class RawTCPLayer(base.Layer):
                 self.channel.tell("tcp_error", f)
         finally:
             if not self.ignore:
+                if pending:
+                    f.new_messages = pending
+                    self.channel.tell("tcp_message", f)
                 self.channel.tell("tcp_end", f)
+                # Only this thread writes to the spill file.
+                f.close_spill_file()
+
+    def _trim_messages(self, f):
+        """
+            Apply tcp_message_limit and tcp_message_size_limit to a flow's messages.
+        """
+        opts = self.config.options
+        limit = opts.tcp_message_limit
+        size_limit = self.config.tcp_message_size_limit
+        if not limit and size_limit is None:
+            return
+        # Account for messages added since the last call.
+        for m in f.messages[self._message_count:]:
+            self._message_bytes += len(m.content)
+        drop = 0
+        if limit:
+            drop = max(0, len(f.messages) - limit)
+        size = self._message_bytes - sum(len(m.content) for m in f.messages[:drop])
+        if size_limit is not None:
+            while drop < len(f.messages) and size > size_limit:
+                size -= len(f.messages[drop].content)
+                drop += 1
+        if drop:
+            if opts.tcp_message_spill:
+                f.spill_messages(f.messages[:drop])
+            del f.messages[:drop]
+        self._message_bytes = size
+        self._message_count = len(f.messages)
+
+    def _splice(self, client, server):
+        """
+            Relay data between two plain sockets through a pipe per direction.
+        """
+        pipes = {}
+        try:
+            for conn in (client, server):
+                pipes[conn] = os.pipe()
+            conns = [client, server]
+            while not self.channel.should_exit.is_set():
+                r, _, _ = select.select(conns, [], [], 10)
+                for conn in r:
+                    dst = server if conn == client else client
+                    pipe_r, pipe_w = pipes[conn]
+                    try:
+                        size = platform.splice(
+                            conn.fileno(), pipe_w, self.splice_size,
+                            platform.SPLICE_F_MOVE | platform.SPLICE_F_NONBLOCK
+                        )
+                    except BlockingIOError:
+                        continue
+                    if not size:
+                        conns.remove(conn)
+                        dst.shutdown(socket.SHUT_WR)
+                        if len(conns) == 0:
+                            return
+                        continue
+                    # The pipe is always drained completely, so the next splice from the socket
+                    # can fill it up again.
+                    while size and not self.channel.should_exit.is_set():
+                        try:
+                            size -= platform.splice(pipe_r, dst.fileno(), size, platform.SPLICE_F_MOVE)
+                        except BlockingIOError:
+                            select.select([], [dst], [], 10)
+        finally:
+            for fds in pipes.values():
+                for fd in fds:
+                    os.close(fd)
@@ -1,6 +1,7 @@
-from typing import Optional  # noqa
+from typing import Iterable, List, Optional, Tuple  # noqa
 from typing import Union
 
+from mitmproxy import certs
 from mitmproxy import exceptions
 from mitmproxy.net import tls as net_tls
 from mitmproxy.proxy.protocol import base
@@ -210,6 +211,33 @@ DEFAULT_CLIENT_CIPHERS = (
 )
 
 
+def cert_identity(
+        host: Optional[bytes],
+        upstream_cert: Optional[certs.Cert],
+        names: Iterable[bytes]
+) -> Tuple[Optional[bytes], List[bytes], Optional[bytes]]:
+    """
+    Determine the Common Name (CN), Subject Alternative Names (SANs) and Organization Name
+    of the certificate we present for host, given the upstream certificate (if any) and
+    additional names such as SNI values.
+    """
+    sans = set(names)
+    organization = None
+    if upstream_cert:
+        sans.update(upstream_cert.altnames)
+        if upstream_cert.cn:
+            sans.add(host)
+            host = upstream_cert.cn.decode("utf8").encode("idna")
+        if upstream_cert.organization:
+            organization = upstream_cert.organization
+
+    # RFC 2818: If a subjectAltName extension of type dNSName is present, that MUST be used as the identity.
+    # In other words, the Common Name is irrelevant then.
+    if host:
+        sans.add(host)
+    return host, list(sans), organization
+
+
 class TlsLayer(base.Layer):
     """
     The TLS layer implements transparent TLS connections.
@@ -228,6 +256,8 @@ class TlsLayer(base.Layer):
 
         self._custom_server_sni = custom_server_sni
         self._client_hello: Optional[net_tls.ClientHello] = None
+        # Certificate and ALPN protocol of the upstream server from the upstream cert cache.
+        self._cached_upstream: Optional[Tuple[certs.Cert, Optional[bytes]]] = None
 
     def __call__(self):
         """
@@ -270,6 +300,15 @@ class TlsLayer(base.Layer):
                 )
             )
         )
+        if (
+            client_tls_requires_server_connection and
+            not self.config.options.add_upstream_certs_to_client_chain and
+            not self.server_conn.connected()
+        ):
+            # If we know the upstream certificate already, the server connection can be established lazily.
+            self._cached_upstream = self._get_cached_upstream()
+            if self._cached_upstream:
+                client_tls_requires_server_connection = False
         establish_server_tls_now = (
             (self.server_conn.connected() and self._server_tls) or
             client_tls_requires_server_connection
@@ -340,8 +379,11 @@ class TlsLayer(base.Layer):
         # This gets triggered if we haven't established an upstream connection yet.
         default_alpn = b'http/1.1'
 
-        if self.alpn_for_client_connection in options:
-            choice = bytes(self.alpn_for_client_connection)
+        alpn = self.alpn_for_client_connection
+        if not alpn and self._cached_upstream:
+            alpn = self._cached_upstream[1]
+        if alpn in options:
+            choice = bytes(alpn)
         elif default_alpn in options:
             choice = bytes(default_alpn)
         else:
@@ -351,8 +393,9 @@ class TlsLayer(base.Layer):
 
     def _establish_tls_with_client_and_server(self):
         try:
-            self.ctx.connect()
-            self._establish_tls_with_server()
+            if not self._reuse_server_conn():
+                self.ctx.connect()
+                self._establish_tls_with_server()
         except Exception:
             # If establishing TLS with the server fails, we try to establish TLS with the client nonetheless
             # to send an error message over TLS.
@@ -364,6 +407,13 @@ class TlsLayer(base.Layer):
 
         self._establish_tls_with_client()
 
+    def _reuse_server_conn(self):
+        # The upstream pool only holds idle HTTP/1 connections, which must
+        # not end up below a layer that relays arbitrary TCP.
+        if self.config.options.rawtcp or self.config.check_tcp(self.server_conn.address):
+            return False
+        return self.reuse_server_conn(self.server_conn.address, True, self.server_sni)
+
     def _establish_tls_with_client(self):
         self.log("Establish TLS with client", "debug")
         cert, key, chain_file = self._find_cert()
@@ -384,6 +434,7 @@ class TlsLayer(base.Layer):
                 chain_file=chain_file,
                 alpn_select_callback=self.__alpn_select_callback,
                 extra_chain_certs=extra_certs,
+                context_cache=self.config.tls_context_cache,
             )
             # Some TLS clients will not fail the handshake,
             # but will immediately throw an "unexpected eof" error on the first read.
@@ -398,22 +449,40 @@ class TlsLayer(base.Layer):
                 self._client_hello.sni or repr(self.server_conn.address)
             )
 
+    def _alpn_offers(self) -> Optional[List[bytes]]:
+        """
+        The ALPN protocols we offer to the server, derived from the client's offer.
+        """
+        alpn = None
+        if self._client_tls:
+            if self._client_hello.alpn_protocols:
+                # We only support http/1.1 and h2.
+                # If the server only supports spdy (next to http/1.1), it may select that
+                # and mitmproxy would enter TCP passthrough mode, which we want to avoid.
+                alpn = [
+                    x for x in self._client_hello.alpn_protocols if
+                    not (x.startswith(b"h2-") or x.startswith(b"spdy"))
+                ]
+            if alpn and b"h2" in alpn and not self.config.options.http2:
+                alpn.remove(b"h2")
+        return alpn
+
+    def _upstream_cert_cache_key(self):
+        return self.server_conn.address[0], self.server_conn.address[1], self.server_sni
+
+    def _get_cached_upstream(self):
+        if self.config.upstream_cert_cache is None or not self.server_conn.address:
+            return None
+        return self.config.upstream_cert_cache.get(
+            self._upstream_cert_cache_key(), self._alpn_offers() or ()
+        )
+
     def _establish_tls_with_server(self):
         self.log("Establish TLS with server", "debug")
         try:
-            alpn = None
-            if self._client_tls:
-                if self._client_hello.alpn_protocols:
-                    # We only support http/1.1 and h2.
-                    # If the server only supports spdy (next to http/1.1), it may select that
-                    # and mitmproxy would enter TCP passthrough mode, which we want to avoid.
-                    alpn = [
-                        x for x in self._client_hello.alpn_protocols if
-                        not (x.startswith(b"h2-") or x.startswith(b"spdy"))
-                    ]
-                if alpn and b"h2" in alpn and not self.config.options.http2:
-                    alpn.remove(b"h2")
-
+            alpn = self._alpn_offers()
+            # Only remember the negotiated protocol if it was chosen from the client's offer.
+            cacheable = self.config.upstream_cert_cache is not None and self.config.options.upstream_cert
             if self.client_conn.tls_established and self.client_conn.get_alpn_proto_negotiated():
                 # If the client has already negotiated an ALP, then force the
                 # server to use the same. This can only happen if the host gets
@@ -424,6 +493,7 @@ class TlsLayer(base.Layer):
                 #   * but after the server_conn change, the new host offers h2
                 #   * which results in garbage because the layers don' match.
                 alpn = [self.client_conn.get_alpn_proto_negotiated()]
+                cacheable = False
 
             # We pass through the list of ciphers send by the client, because some HTTP/2 servers
             # will select a non-HTTP/2 compatible cipher from our default list and then hang up
@@ -441,6 +511,7 @@ class TlsLayer(base.Layer):
             self.server_conn.establish_tls(
                 sni=self.server_sni,
                 alpn_protos=alpn,
+                session_cache=self.config.tls_session_cache,
                 **args
             )
             tls_cert_err = self.server_conn.ssl_verification_error
@@ -459,6 +530,14 @@ class TlsLayer(base.Layer):
                 )
             )
 
+        if cacheable and self.server_conn.cert:
+            self.config.upstream_cert_cache.put(
+                self._upstream_cert_cache_key(),
+                self.server_conn.cert,
+                alpn or (),
+                self.alpn_for_client_connection
+            )
+
         proto = self.alpn_for_client_connection.decode() if self.alpn_for_client_connection else '-'
         self.log("ALPN selected by server: {}".format(proto), "debug")
 
@@ -468,9 +547,6 @@ class TlsLayer(base.Layer):
         our certificate should have and then fetches a matching cert from the certstore.
         """
         host = None
-        sans = set()
-        organization = None
-
         # In normal operation, the server address should always be known at this point.
         # However, we may just want to establish TLS so that we can send an error message to the client,
         # in which case the address can be None.
@@ -485,20 +561,16 @@ class TlsLayer(base.Layer):
         )
         if use_upstream_cert:
             upstream_cert = self.server_conn.cert
-            sans.update(upstream_cert.altnames)
-            if upstream_cert.cn:
-                sans.add(host)
-                host = upstream_cert.cn.decode("utf8").encode("idna")
-            if upstream_cert.organization:
-                organization = upstream_cert.organization
+        elif self._cached_upstream and self.config.options.upstream_cert:
+            upstream_cert = self._cached_upstream[0]
+        else:
+            upstream_cert = None
+
         # Also add SNI values.
+        names = []
         if self._client_hello.sni:
-            sans.add(self._client_hello.sni.encode("idna"))
+            names.append(self._client_hello.sni.encode("idna"))
         if self._custom_server_sni:
-            sans.add(self._custom_server_sni.encode("idna"))
+            names.append(self._custom_server_sni.encode("idna"))
 
-        # RFC 2818: If a subjectAltName extension of type dNSName is present, that MUST be used as the identity.
-        # In other words, the Common Name is irrelevant then.
-        if host:
-            sans.add(host)
-        return self.config.certstore.get_cert(host, list(sans), organization)
+        return self.config.certstore.get_cert(*cert_identity(host, upstream_cert, names))
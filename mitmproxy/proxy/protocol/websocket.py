@@ -51,6 +51,10 @@ class WebSocketLayer(base.Layer):
         self.client_frame_buffer = []
         self.server_frame_buffer = []
 
+        # Number and size of the messages in memory, as of the last _trim_messages().
+        self._message_count = 0
+        self._message_bytes = 0
+
         self.connections: dict[object, WSConnection] = {}
 
         client_extensions = []
@@ -132,11 +136,40 @@ class WebSocketLayer(base.Layer):
                     data = self.connections[other_conn].send(Message(data=chunk, message_finished=final))
                     other_conn.send(data)
 
+            self._trim_messages()
+
         if self.flow.stream:
             data = self.connections[other_conn].send(Message(data=event.data, message_finished=event.message_finished))
             other_conn.send(data)
         return True
 
+    def _trim_messages(self):
+        """
+            Apply websocket_message_limit and websocket_message_size_limit to the flow's messages.
+            Removed messages are kept in flow.evicted_messages until the next websocket_message event.
+        """
+        limit = self.config.options.websocket_message_limit
+        size_limit = self.config.websocket_message_size_limit
+        if not limit and size_limit is None:
+            self.flow.evicted_messages = []
+            return
+        messages = self.flow.messages
+        # Account for messages added since the last call.
+        for m in messages[self._message_count:]:
+            self._message_bytes += len(m.content)
+        drop = 0
+        if limit:
+            drop = max(0, len(messages) - limit)
+        size = self._message_bytes - sum(len(m.content) for m in messages[:drop])
+        if size_limit is not None:
+            while drop < len(messages) and size > size_limit:
+                size -= len(messages[drop].content)
+                drop += 1
+        self.flow.evicted_messages = messages[:drop]
+        del messages[:drop]
+        self._message_bytes = size
+        self._message_count = len(messages)
+
     def _handle_ping(self, event, source_conn, other_conn, is_server):
         # Use event.response to create the approprate Pong response
         data = self.connections[other_conn].send(Ping())
@@ -186,6 +219,7 @@ class WebSocketLayer(base.Layer):
         self.channel.ask("websocket_start", self.flow)
 
         conns = [c.connection for c in self.connections.keys()]
+        readers = {c: websockets.FrameReader(c.rfile) for c in self.connections.keys()}
         close_received = False
 
         try:
@@ -199,8 +233,9 @@ class WebSocketLayer(base.Layer):
                     other_conn = self.server_conn if conn == self.client_conn.connection else self.client_conn
                     is_server = (source_conn == self.server_conn)
 
-                    frame = websockets.Frame.from_file(source_conn.rfile)
-                    data = self.connections[source_conn].receive_data(bytes(frame))
+                    # Frames are passed on as they are, wsproto takes care of unmasking.
+                    frames = readers[source_conn].read_raw()
+                    data = self.connections[source_conn].receive_data(b"".join(frames))
                     source_conn.send(data)
 
                     if close_received:
@@ -21,12 +21,16 @@ class RootContext:
             :py:meth:`.tell() <mitmproxy.controller.Channel.tell>` methods.
         config:
             The :py:class:`proxy server's configuration <mitmproxy.proxy.ProxyConfig>`
+        park_idle:
+            Whether layers may raise :py:class:`~mitmproxy.exceptions.ClientIdle`
+            to park the client connection between requests.
     """
 
-    def __init__(self, client_conn, config, channel):
+    def __init__(self, client_conn, config, channel, park_idle=False):
         self.client_conn = client_conn
         self.channel = channel
         self.config = config
+        self.park_idle = park_idle
 
     def next_layer(self, top_layer):
         """
@@ -9,6 +9,7 @@ from mitmproxy import log
 from mitmproxy import platform
 from mitmproxy.proxy import config
 from mitmproxy.proxy import modes
+from mitmproxy.proxy import protocol
 from mitmproxy.proxy import root_context
 from mitmproxy.net import tcp
 from mitmproxy.net.http import http1
@@ -28,6 +29,9 @@ class DummyServer:
     def serve_forever(self):
         pass
 
+    def serve_async(self, loop=None):
+        pass
+
     def shutdown(self):
         pass
 
@@ -43,7 +47,11 @@ class ProxyServer(tcp.TCPServer):
         self.config = config
         try:
             super().__init__(
-                (config.options.listen_host, config.options.listen_port)
+                (config.options.listen_host, config.options.listen_port),
+                max_workers=config.options.connection_workers,
+                queue_size=config.options.connection_queue_size,
+                queue_full_policy=config.options.connection_queue_full,
+                reuse_port=config.options.server_processes > 1,
             )
             if config.options.mode == "transparent":
                 platform.init_transparent_mode()
@@ -58,19 +66,42 @@ class ProxyServer(tcp.TCPServer):
     def set_channel(self, channel):
         self.channel = channel
 
+    def handle_rejected(self, conn, client_address):
+        error_response = http.make_error_response(
+            503, "Too many concurrent connections."
+        )
+        # With server_asyncio, this runs on the event loop, so we must not wait
+        # for the client. The response fits into an empty socket buffer.
+        conn.setblocking(False)
+        try:
+            conn.send(http1.assemble_response(error_response))
+        except OSError:
+            pass
+
     def handle_client_connection(self, conn, client_address):
         h = ConnectionHandler(
             conn,
             client_address,
             self.config,
-            self.channel
+            self.channel,
+            # Idle connections can only be parked on the event loop.
+            park_idle=self.config.options.server_asyncio,
         )
-        h.handle()
+        return self._handle(h, h.handle, conn)
+
+    def _handle(self, h, func, conn):
+        if not func():
+            return False
+        if self.park(conn, h.client_conn.address, lambda *_: self._handle(h, h.resume, conn)):
+            return True
+        # The server is shutting down.
+        h.close()
+        return False
 
 
 class ConnectionHandler:
 
-    def __init__(self, client_conn, client_address, config, channel):
+    def __init__(self, client_conn, client_address, config, channel, park_idle=False):
         self.config: config.ProxyConfig = config
         self.client_conn = connections.ClientConnection(
             client_conn,
@@ -79,12 +110,16 @@ class ConnectionHandler:
         """@type: mitmproxy.proxy.connection.ClientConnection"""
         self.channel = channel
         """@type: mitmproxy.controller.Channel"""
+        self.park_idle = park_idle
+        self.root_layer = None
+        self.idle_layer = None
 
     def _create_root_layer(self):
         root_ctx = root_context.RootContext(
             self.client_conn,
             self.config,
-            self.channel
+            self.channel,
+            self.park_idle,
         )
 
         mode = self.config.options.mode
@@ -112,13 +147,35 @@ class ConnectionHandler:
             raise ValueError("Unknown proxy mode: %s" % mode)
 
     def handle(self):
+        """
+            Handle the client connection. Returns True if the connection is
+            idle and can be parked until the client sends more data, at which
+            point resume() has to be called.
+        """
         self.log("clientconnect", "info")
+        return self._run(self._start)
 
-        root_layer = None
+    def resume(self):
+        """
+            Continue handling a connection after handle() or resume() returned
+            True.
+        """
+        return self._run(self.idle_layer.resume)
+
+    def _start(self):
+        self.root_layer = self._create_root_layer()
+        self.root_layer = self.channel.ask("clientconnect", self.root_layer)
+        self.root_layer()
+
+    def _run(self, func):
         try:
-            root_layer = self._create_root_layer()
-            root_layer = self.channel.ask("clientconnect", root_layer)
-            root_layer()
+            try:
+                func()
+            except exceptions.ClientIdle as e:
+                # Server connections stay open while the client is parked,
+                # so that its next request can reuse them.
+                self.idle_layer = e.layer
+                return True
         except exceptions.Kill:
             self.log("Connection killed", "info")
         except exceptions.ProtocolException as e:
@@ -150,9 +207,28 @@ class ConnectionHandler:
             print("mitmproxy has crashed!", file=sys.stderr)
             print("Please lodge a bug report at: https://github.com/mitmproxy/mitmproxy", file=sys.stderr)
 
+        self.close()
+        return False
+
+    def _disconnect_idle(self):
+        """
+            Close the server connections of the idle layer and the layers
+            around it. The outer layers have stopped running when the
+            connection was parked, so they cannot do this themselves once the
+            client connection is closed.
+        """
+        layer = self.idle_layer
+        while isinstance(layer, protocol.Layer):
+            if isinstance(layer, protocol.ServerConnectionMixin) and layer.server_conn.connected():
+                layer.disconnect()
+            layer = layer.ctx
+
+    def close(self):
+        if self.idle_layer is not None:
+            self._disconnect_idle()
         self.log("clientdisconnect", "info")
-        if root_layer is not None:
-            self.channel.tell("clientdisconnect", root_layer)
+        if self.root_layer is not None:
+            self.channel.tell("clientdisconnect", self.root_layer)
         self.client_conn.finish()
 
     def log(self, msg, level):
@@ -0,0 +1,215 @@
+"""
+    Run the proxy server in several worker processes.
+
+    Every worker is a fork of the main process with the complete addon chain,
+    and runs its own ProxyServer on the shared listen address (SO_REUSEPORT).
+    Addons that change flows therefore run in the worker that handles the
+    connection. Observers do not run in the workers: lifecycle events are
+    relayed to the main process over a socket pair instead, where the
+    observers see the flows of all workers as one stream.
+"""
+import asyncio
+import os
+import signal
+import socket
+import sys
+import threading
+import typing
+
+from mitmproxy import addonmanager
+from mitmproxy import controller
+from mitmproxy import exceptions
+from mitmproxy import flow
+from mitmproxy import http
+from mitmproxy import log
+from mitmproxy import websocket
+from mitmproxy.addons import script
+from mitmproxy.io import io
+from mitmproxy.io import tnetstring
+from mitmproxy.proxy import server
+
+# Events after which the main process forgets about a flow.
+FINAL_EVENTS = frozenset([
+    "response", "error",
+    "tcp_end", "tcp_error",
+    "websocket_end", "websocket_error",
+])
+
+
+class Relay:
+    """
+        Passes lifecycle events from a worker to the main process.
+    """
+    def __init__(self, sock: socket.socket) -> None:
+        self.wfile = sock.makefile("wb")
+
+    def __call__(self, name, message):
+        if isinstance(message, flow.Flow):
+            d = dict(event=name, flow=message.get_state())
+            if isinstance(message, websocket.WebSocketFlow):
+                # Evicted messages are not part of the flow state, but
+                # observers such as Save still need to see them.
+                d["evicted_messages"] = [m.get_state() for m in message.evicted_messages]
+        elif isinstance(message, log.LogEntry):
+            d = dict(event=name, log=[message.msg, message.level])
+        else:
+            # Connection and layer events refer to live objects only.
+            return
+        try:
+            tnetstring.dump(d, self.wfile)
+            self.wfile.flush()
+        except OSError:
+            # The main process has gone away, we are about to be shut down.
+            pass
+
+
+class WorkerGroup:
+    """
+        Takes the place of the ProxyServer in the main process. Forks the
+        workers and feeds the events they relay to the observers.
+    """
+    bound = True
+
+    def __init__(self, config, count: int) -> None:
+        self.config = config
+        self.count = count
+        # Bind once to report errors early and to fix the port if it is
+        # chosen by the OS, then leave the address to the workers.
+        probe = server.ProxyServer(config)
+        self.address = probe.address
+        probe.socket.close()
+
+        self.channel: controller.Channel = None
+        self.pids: typing.List[int] = []
+        self.flows: typing.Dict[str, flow.Flow] = {}
+        self._socks: typing.List[socket.socket] = []
+        self._readers: typing.List[threading.Thread] = []
+        self._shut_down = threading.Event()
+
+    def set_channel(self, channel):
+        self.channel = channel
+
+    def spawn(self, master) -> None:
+        """
+            Fork the workers. This must happen before the master starts any
+            threads or its event loop. Does not return in the workers.
+        """
+        for _ in range(self.count):
+            parent_sock, child_sock = socket.socketpair()
+            pid = os.fork()
+            if pid == 0:  # pragma: no cover
+                code = 1
+                try:
+                    parent_sock.close()
+                    for s in self._socks:
+                        s.close()
+                    code = self._run_worker(master, child_sock)
+                finally:
+                    os._exit(code)
+            child_sock.close()
+            self.pids.append(pid)
+            self._socks.append(parent_sock)
+
+    def _run_worker(self, master, sock) -> int:  # pragma: no cover
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        master.channel = controller.Channel(master, loop, master.should_exit)
+        # Reading and replaying flows is done once, by the main process.
+        master.options.update(
+            listen_port=self.address[1],
+            rfile=None,
+            client_replay=[],
+        )
+        try:
+            master.server = server.ProxyServer(self.config)
+        except exceptions.ServerException as e:
+            print(str(e), file=sys.stderr)
+            return 1
+        master.addons.relay = Relay(sock)
+        # Script watchers were scheduled on the main process' loop, which
+        # never runs here.
+        for a in addonmanager.traverse(master.addons.chain):
+            if isinstance(a, script.Script) and a.reloadtask:
+                a.reloadtask.get_coro().close()
+                a.reloadtask = asyncio.ensure_future(a.watcher())
+        for signame in ('SIGINT', 'SIGTERM'):
+            loop.add_signal_handler(getattr(signal, signame), master.shutdown)
+        master.run()
+        return 0
+
+    def serve_forever(self):
+        self._start_readers()
+        self._shut_down.wait()
+
+    def serve_async(self, loop=None):
+        self._start_readers()
+
+    def _start_readers(self):
+        for i, sock in enumerate(self._socks):
+            t = threading.Thread(
+                target=self._read,
+                args=(sock,),
+                name="WorkerGroup reader ({})".format(i),
+                daemon=True,
+            )
+            t.start()
+            self._readers.append(t)
+
+    def _read(self, sock):
+        rfile = sock.makefile("rb")
+        while True:
+            try:
+                d = tnetstring.load(rfile)
+            except (ValueError, OSError):
+                # The worker has exited.
+                return
+            asyncio.run_coroutine_threadsafe(self.observe(d), self.channel.loop)
+
+    async def observe(self, d):
+        """
+            Run the observers for an event relayed by a worker.
+        """
+        name = d["event"]
+        if "log" in d:
+            message = log.LogEntry(*d["log"])
+        else:
+            message = self._update_flow(name, d["flow"])
+            if "evicted_messages" in d:
+                message.evicted_messages = [
+                    websocket.WebSocketMessage.from_state(m) for m in d["evicted_messages"]
+                ]
+        await self.channel.master.addons.observe(name, message)
+
+    def _update_flow(self, name, state) -> flow.Flow:
+        f = self.flows.get(state["id"])
+        if f:
+            f.set_state(state)
+        else:
+            f = io.FLOW_TYPES[state["type"]].from_state(state)
+            if f.type == "websocket":
+                f.handshake_flow = self.flows.get(f.metadata.get("websocket_handshake"))
+            self.flows[f.id] = f
+        if name in FINAL_EVENTS:
+            if isinstance(f, http.HTTPFlow) and "websocket" in f.metadata and name == "response":
+                # Keep the handshake for the WebSocket flow that follows.
+                return f
+            del self.flows[f.id]
+            if f.type == "websocket" and f.handshake_flow:
+                self.flows.pop(f.handshake_flow.id, None)
+        return f
+
+    def shutdown(self):
+        for pid in self.pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in self.pids:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        self.pids = []
+        for s in self._socks:
+            s.close()
+        self._shut_down.set()
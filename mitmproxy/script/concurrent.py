@@ -1,21 +1,161 @@
 """
 This module provides a @concurrent decorator primitive to
 offload computations from mitmproxy's main master thread.
+
+All concurrent hooks share one bounded thread pool, which can be sized
+with the concurrent_workers and concurrent_queue_size options.
 """
+import collections
+import functools
+import sys
+import threading
+import time
+import traceback
+import typing
+from concurrent import futures
 
 from mitmproxy import eventsequence
-from mitmproxy.coretypes import basethread
 
+DEFAULT_WORKERS = 32
+
+
+class _Limit:
+    """
+        Concurrency limit for a single hook.
+    """
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.active = 0
+        self.pending: typing.Deque = collections.deque()
+
+
+class Executor:
+    """
+        A shared thread pool for @concurrent hooks.
+
+        At most queue_size hook invocations wait for a free worker. If the
+        queue is full, further invocations are held back in a backlog and
+        handed to the pool as soon as there is room again. The thread that
+        triggered the hook keeps waiting for its reply in the meantime, which
+        slows down the producer without blocking the event loop.
+    """
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, queue_size: int = 0) -> None:
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self._pool: typing.Optional[futures.ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.backlog: typing.Deque = collections.deque()
+
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self._total_wait = 0.0
+
+    def configure(self, max_workers: int, queue_size: int) -> None:
+        with self._lock:
+            if max_workers != self.max_workers and self._pool:
+                # Running and queued hooks finish on the old pool.
+                self._pool.shutdown(wait=False)
+                self._pool = None
+            self.max_workers = max_workers
+            self.queue_size = queue_size
+            self._drain()
+
+    @property
+    def mean_wait(self) -> float:
+        """
+            Mean time in seconds that completed invocations spent in the queue.
+        """
+        with self._lock:
+            return self._total_wait / self.completed if self.completed else 0.0
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        with self._lock:
+            queued, running, completed = self.queued, self.running, self.completed
+            backlog = len(self.backlog)
+        return dict(
+            queued=queued,
+            backlog=backlog,
+            running=running,
+            completed=completed,
+            mean_wait=self.mean_wait,
+        )
+
+    def submit(self, fn: typing.Callable, limit: typing.Optional[_Limit] = None) -> bool:
+        """
+            Schedule fn on the pool. Returns False if the queue is full and
+            fn has been put in the backlog instead.
+        """
+        with self._lock:
+            return self._submit((fn, time.time(), limit))
+
+    def _submit(self, job) -> bool:
+        # The lock is held, so that configure() cannot shut down the pool
+        # before the job has been handed to it.
+        if self.queue_size and self.queued >= self.queue_size:
+            self.backlog.append(job)
+            return False
+        self.queued += 1
+        limit = job[2]
+        if limit:
+            if limit.active >= limit.limit:
+                limit.pending.append(job)
+                return True
+            limit.active += 1
+        self._get_pool().submit(self._run, *job)
+        return True
+
+    def _drain(self):
+        while self.backlog and not (self.queue_size and self.queued >= self.queue_size):
+            self._submit(self.backlog.popleft())
+
+    def _get_pool(self) -> futures.ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = futures.ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="script.concurrent",
+            )
+        return self._pool
+
+    def _run(self, fn, submitted, limit):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self._total_wait += time.time() - submitted
+            self._drain()
+        try:
+            fn()
+        except Exception:
+            # Same as an uncaught exception in a thread.
+            traceback.print_exc(file=sys.stderr)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                if limit:
+                    if limit.pending:
+                        self._get_pool().submit(self._run, *limit.pending.popleft())
+                    else:
+                        limit.active -= 1
+
+
+executor = Executor()
 
-class ScriptThread(basethread.BaseThread):
-    name = "ScriptThread"
 
+def concurrent(fn=None, *, limit: typing.Optional[int] = None):
+    """
+        Run a hook on the shared script thread pool. Use as @concurrent, or
+        as @concurrent(limit=n) to run at most n invocations of the hook at
+        the same time.
+    """
+    if fn is None:
+        return functools.partial(concurrent, limit=limit)
 
-def concurrent(fn):
     if fn.__name__ not in eventsequence.Events - {"load", "configure"}:
         raise NotImplementedError(
             "Concurrent decorator not supported for '%s' method." % fn.__name__
         )
+    hook_limit = _Limit(limit) if limit else None
 
     def _concurrent(*args):
         # When annotating classmethods, "self" is passed as the first argument.
@@ -24,15 +164,14 @@ def concurrent(fn):
         obj = args[-1]
 
         def run():
-            fn(*args)
-            if obj.reply.state == "taken":
-                if not obj.reply.has_message:
-                    obj.reply.ack()
-                obj.reply.commit()
+            try:
+                fn(*args)
+            finally:
+                if obj.reply.state == "taken":
+                    if not obj.reply.has_message:
+                        obj.reply.ack()
+                    obj.reply.commit()
         obj.reply.take()
-        ScriptThread(
-            "script.concurrent (%s)" % fn.__name__,
-            target=run
-        ).start()
+        executor.submit(run, hook_limit)
 
     return _concurrent
@@ -1,10 +1,17 @@
+import os
+import struct
+import tempfile
 import time
+import weakref
 
-from typing import List
+from typing import BinaryIO, List, Optional
 
 from mitmproxy import flow
 from mitmproxy.coretypes import serializable
 
+# from_client, timestamp and content length of a spilled message.
+SPILL_HEADER = struct.Struct("!?dI")
+
 
 class TCPMessage(serializable.Serializable):
 
@@ -39,9 +46,66 @@ class TCPFlow(flow.Flow):
     def __init__(self, client_conn, server_conn, live=None):
         super().__init__("tcp", client_conn, server_conn, live)
         self.messages: List[TCPMessage] = []
+        # The number of messages at the end of self.messages that are new since
+        # the last tcp_message event. This is more than one if events are batched.
+        self.new_messages = 1
+        # Messages moved out of self.messages to limit memory usage, see spill_messages().
+        self.spill_path: Optional[str] = None
+        # Only open while messages are spilled, see close_spill_file().
+        self.spill_file: Optional[BinaryIO] = None
 
     _stateobject_attributes = flow.Flow._stateobject_attributes.copy()
     _stateobject_attributes["messages"] = List[TCPMessage]
 
+    def spill_messages(self, messages: List[TCPMessage]) -> None:
+        """
+        Write messages that have been removed from self.messages to a temporary file,
+        which is deleted along with the flow.
+        """
+        if self.spill_file is None:
+            if self.spill_path is None:
+                fd, self.spill_path = tempfile.mkstemp(prefix="mitmproxy-tcp-")
+                weakref.finalize(self, _remove_spill_file, self.spill_path)
+                self.spill_file = os.fdopen(fd, "wb")
+            else:
+                self.spill_file = open(self.spill_path, "ab")
+        for m in messages:
+            self.spill_file.write(SPILL_HEADER.pack(m.from_client, m.timestamp, len(m.content)))
+            self.spill_file.write(m.content)
+        self.spill_file.flush()
+
+    def close_spill_file(self) -> None:
+        """
+        Release the file descriptor used by spill_messages() once no more messages
+        are spilled. Spilled messages can still be read with spilled_messages().
+        """
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+
+    def spilled_messages(self) -> List[TCPMessage]:
+        """
+        Read back the messages written by spill_messages(), oldest first.
+        Spilled messages are not part of the flow state and are not saved with the flow.
+        """
+        if self.spill_path is None:
+            return []
+        messages = []
+        with open(self.spill_path, "rb") as f:
+            while True:
+                header = f.read(SPILL_HEADER.size)
+                if len(header) < SPILL_HEADER.size:
+                    break
+                from_client, timestamp, length = SPILL_HEADER.unpack(header)
+                messages.append(TCPMessage(from_client, f.read(length), timestamp))
+        return messages
+
     def __repr__(self):
         return "<TCPFlow ({} messages)>".format(len(self.messages))
+
+
+def _remove_spill_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:  # pragma: no cover
+        pass
@@ -14,11 +14,20 @@ class TestAddons(addonmanager.AddonManager):
     def __init__(self, master):
         super().__init__(master)
 
+    def has_subscribers(self, name, message=None):
+        # We record all log events, so they must always reach trigger().
+        return name == "log" or super().has_subscribers(name, message)
+
     def trigger(self, event, *args, **kwargs):
         if event == "log":
             self.master.logs.append(args[0])
         super().trigger(event, *args, **kwargs)
 
+    async def handle_lifecycle(self, name, message):
+        if name == "log":
+            self.master.logs.append(message)
+        await super().handle_lifecycle(name, message)
+
 
 class RecordingMaster(mitmproxy.master.Master):
     def __init__(self, *args, **kwargs):
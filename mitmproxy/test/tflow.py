@@ -184,6 +184,7 @@ def tserver_conn():
         ip_address=("192.168.0.1", 22),
         cert=None,
         timestamp_start=946681202,
+        timestamp_dns_setup=946681202,
         timestamp_tcp_setup=946681203,
         timestamp_tls_setup=946681204,
         timestamp_end=946681205,
@@ -16,6 +16,7 @@ from mitmproxy import options  # noqa
 from mitmproxy import optmanager  # noqa
 from mitmproxy import proxy  # noqa
 from mitmproxy import log  # noqa
+from mitmproxy.proxy import workers  # noqa
 from mitmproxy.utils import debug, arg_check  # noqa
 
 OPTIONS_FILE_NAME = "config.yaml"
@@ -96,7 +97,14 @@ def run(
         server: typing.Any = None
         if pconf.options.server:
             try:
-                server = proxy.server.ProxyServer(pconf)
+                if pconf.options.server_processes > 1:
+                    if not master.multiprocess:
+                        raise exceptions.OptionsError(
+                            "server_processes is only supported by mitmdump."
+                        )
+                    server = workers.WorkerGroup(pconf, pconf.options.server_processes)
+                else:
+                    server = proxy.server.ProxyServer(pconf)
             except exceptions.ServerException as v:
                 print(str(v), file=sys.stderr)
                 sys.exit(1)
@@ -113,6 +121,9 @@ def run(
         if extra:
             opts.update(**extra(args))
 
+        if isinstance(server, workers.WorkerGroup):
+            server.spawn(master)
+
         loop = asyncio.get_event_loop()
         for signame in ('SIGINT', 'SIGTERM'):
             try:
@@ -55,16 +55,16 @@ class UnsupportedLog:
             f.close_reason))
 
     def tcp_message(self, f):
-        message = f.messages[-1]
-        direction = "->" if message.from_client else "<-"
-        ctx.log.info("{client_host}:{client_port} {direction} tcp {direction} {server_host}:{server_port}".format(
-            client_host=f.client_conn.address[0],
-            client_port=f.client_conn.address[1],
-            server_host=f.server_conn.address[0],
-            server_port=f.server_conn.address[1],
-            direction=direction,
-        ))
-        ctx.log.debug(strutils.bytes_to_escaped_str(message.content))
+        for message in f.messages[-f.new_messages:]:
+            direction = "->" if message.from_client else "<-"
+            ctx.log.info("{client_host}:{client_port} {direction} tcp {direction} {server_host}:{server_port}".format(
+                client_host=f.client_conn.address[0],
+                client_port=f.client_conn.address[1],
+                server_host=f.server_conn.address[0],
+                server_port=f.server_conn.address[1],
+                direction=direction,
+            ))
+            ctx.log.debug(strutils.bytes_to_escaped_str(message.content))
 
 
 class ConsoleAddon:
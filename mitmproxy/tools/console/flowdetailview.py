@@ -134,6 +134,12 @@ def flowdetails(state, flow: http.HTTPFlow):
                 maybe_timestamp(sc, "timestamp_start")
             )
         )
+        parts.append(
+            (
+                "Server conn. name resolved",
+                maybe_timestamp(sc, "timestamp_dns_setup")
+            )
+        )
         parts.append(
             (
                 "Server conn. TCP handshake",
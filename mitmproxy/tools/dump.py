@@ -14,6 +14,7 @@ class ErrorCheck:
 
 
 class DumpMaster(master.Master):
+    multiprocess = True
 
     def __init__(
         self,
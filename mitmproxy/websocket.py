@@ -80,6 +80,12 @@ class WebSocketFlow(flow.Flow):
         """The HTTP flow containing the initial WebSocket handshake."""
         self.ended = False
         """True when the WebSocket connection has been closed."""
+        self.evicted_messages: List[WebSocketMessage] = []
+        """
+        Messages removed from messages by websocket_message_limit or websocket_message_size_limit
+        after the last websocket_message event. The WebSocket layer replaces them after every message.
+        They are not part of the flow state.
+        """
 
         self._inject_messages_client = queue.Queue(maxsize=1)
         self._inject_messages_server = queue.Queue(maxsize=1)
@@ -129,6 +135,19 @@ class WebSocketFlow(flow.Flow):
         f.set_state(state)
         return f
 
+    def get_partial_state(self, messages: List[WebSocketMessage]):
+        """
+        Retrieve the flow state with only the given messages, marked as partial.
+        FlowReader merges the messages of partial states into the next state of the same flow.
+        """
+        all_messages, self.messages = self.messages, messages
+        try:
+            d = self.get_state()
+        finally:
+            self.messages = all_messages
+        d['metadata'] = dict(d['metadata'], websocket_partial=True)
+        return d
+
     def __repr__(self):
         return "<WebSocketFlow ({} messages)>".format(len(self.messages))
 
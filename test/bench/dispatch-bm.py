@@ -0,0 +1,67 @@
+"""
+    Microbenchmark for addon event dispatch.
+
+    Compares the per-event cost of AddonManager.trigger, which uses cached
+    dispatch tables, against walking the addon chain with traverse() and
+    getattr() on every event, as AddonManager did before.
+
+    Usage: python dispatch-bm.py [iterations]
+"""
+import sys
+import timeit
+
+from mitmproxy import addonmanager
+from mitmproxy import addons
+from mitmproxy import master
+from mitmproxy import options
+from mitmproxy.test import tflow
+
+
+def legacy_trigger(manager, name, *args, **kwargs):
+    for i in manager.chain:
+        try:
+            with addonmanager.safecall():
+                for a in addonmanager.traverse([i]):
+                    func = getattr(a, name, None)
+                    if func and callable(func):
+                        func(*args, **kwargs)
+        except addonmanager.exceptions.AddonHalt:
+            return
+
+
+class Noop:
+    def __init__(self, n):
+        self.name = "noop%s" % n
+
+    def request(self, f):
+        pass
+
+
+def main(iterations):
+    m = master.Master(options.Options())
+    m.addons.add(*addons.default_addons())
+    m.addons.add(*[Noop(i) for i in range(5)])
+    f = tflow.tflow()
+
+    print("%s addons in chain" % len(m.addons))
+    for event in ("requestheaders", "request", "tcp_message"):
+        before = timeit.timeit(
+            lambda: legacy_trigger(m.addons, event, f),
+            number=iterations
+        )
+        after = timeit.timeit(
+            lambda: m.addons.trigger(event, f),
+            number=iterations
+        )
+        print(
+            "%-15s traverse: %6.2fus/event  dispatch table: %6.2fus/event  (%.1fx)" % (
+                event,
+                before / iterations * 1e6,
+                after / iterations * 1e6,
+                before / after,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
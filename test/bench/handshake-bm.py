@@ -0,0 +1,79 @@
+"""
+    Microbenchmark for TLS handshakes with clients.
+
+    Compares the server-side cost of handshakes with RSA and ECDSA (P-256)
+    leaf certificates, as selected by the cert_key_type option. Both ends
+    run in-process over memory BIOs; only time spent in the server's
+    handshake calls is counted.
+
+    Usage: python handshake-bm.py [handshakes]
+"""
+import sys
+import tempfile
+import time
+
+from OpenSSL import SSL
+
+from mitmproxy import certs
+from mitmproxy.net import tls
+from mitmproxy.proxy.protocol.tls import DEFAULT_CLIENT_CIPHERS
+
+
+def pump(src, dst):
+    try:
+        data = src.bio_read(65536)
+    except SSL.WantReadError:
+        return False
+    dst.bio_write(data)
+    return True
+
+
+def handshake(server_ctx, client_ctx):
+    server = SSL.Connection(server_ctx)
+    server.set_accept_state()
+    client = SSL.Connection(client_ctx)
+    client.set_connect_state()
+    client.set_tlsext_host_name(b"example.com")
+    spent = 0.0
+    done = set()
+    while len(done) < 2:
+        for name, conn in (("client", client), ("server", server)):
+            if name in done:
+                continue
+            start = time.perf_counter()
+            try:
+                conn.do_handshake()
+            except SSL.WantReadError:
+                pass
+            else:
+                done.add(name)
+            finally:
+                if conn is server:
+                    spent += time.perf_counter() - start
+        pump(client, server)
+        pump(server, client)
+    return spent
+
+
+def main(handshakes):
+    client_ctx = tls.create_client_context()
+    for key_type in certs.KEY_TYPES:
+        with tempfile.TemporaryDirectory() as confdir:
+            store = certs.CertStore.from_store(confdir, "bench", key_type=key_type)
+            cert, key, chain_file = store.get_cert(b"example.com", [b"example.com"])
+            server_ctx = tls.create_server_context(
+                cert,
+                key,
+                cipher_list=DEFAULT_CLIENT_CIPHERS,
+                dhparams=store.dhparams,
+            )
+            spent = sum(handshake(server_ctx, client_ctx) for _ in range(handshakes))
+        print("%-5s %8.1f handshakes/s  (%.2fms server time per handshake)" % (
+            key_type,
+            handshakes / spent,
+            spent / handshakes * 1e3,
+        ))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,50 @@
+"""
+    Microbenchmark for matching connections against ignore_hosts/tcp_hosts.
+
+    Compares the combined HostMatcher with trying every pattern in turn, for
+    growing lists of hostname patterns and a mix of matching and non-matching
+    addresses. The decision cache is cleared for every address.
+
+    Usage: python hostmatcher-bm.py [lookups]
+"""
+import re
+import sys
+import time
+
+from mitmproxy.proxy.config import HostMatcher
+
+
+def patterns(n):
+    for i in range(n):
+        if i % 2:
+            yield r"^(.+\.)?host%d\.example\.com:443$" % i
+        else:
+            yield r"^host%d\.example\.org:\d+$" % i
+
+
+def main(lookups):
+    for n in (10, 100, 1000):
+        p = list(patterns(n))
+        addresses = [("www.host%d.example.com" % i, 443) for i in range(0, 2 * n, 7)]
+        naive = [re.compile(x, re.IGNORECASE) for x in p]
+        m = HostMatcher(p)
+
+        start = time.perf_counter()
+        for i in range(lookups):
+            host = "%s:%s" % addresses[i % len(addresses)]
+            any(rex.search(host) for rex in naive)
+        t_naive = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(lookups):
+            m._match.cache_clear()
+            m(addresses[i % len(addresses)])
+        t_combined = time.perf_counter() - start
+
+        print("%5d patterns: per-pattern %7.2fus, combined %5.2fus per lookup" % (
+            n, t_naive / lookups * 1e6, t_combined / lookups * 1e6
+        ))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
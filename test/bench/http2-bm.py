@@ -0,0 +1,171 @@
+"""
+    Throughput benchmark for HTTP/2 through the proxy.
+
+    Starts a local h2 backend and mitmproxy in reverse proxy mode in front of
+    it, then downloads a response body of the given size on a number of
+    concurrent streams over a single client connection.
+
+    Usage: python http2-bm.py [streams] [kilobytes]
+"""
+import asyncio
+import queue
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import h2.config
+import h2.connection
+import h2.events
+import h2.settings
+from OpenSSL import SSL
+
+from mitmproxy import addons
+from mitmproxy import certs
+from mitmproxy import master
+from mitmproxy import options
+from mitmproxy.net import tcp
+from mitmproxy.net import tls
+from mitmproxy.proxy.config import ProxyConfig
+from mitmproxy.proxy.server import ProxyServer
+
+MAX_WINDOW = 2 ** 31 - 1
+
+
+def backend_connection(conn, size):
+    h2_conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False))
+    h2_conn.initiate_connection()
+    conn.sendall(h2_conn.data_to_send())
+    body = b"x" * h2_conn.max_outbound_frame_size
+    remaining = {}
+    while True:
+        try:
+            data = conn.recv(65536)
+        except SSL.Error:
+            return
+        if not data:
+            return
+        for event in h2_conn.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                h2_conn.send_headers(event.stream_id, [
+                    (":status", "200"),
+                    ("content-length", str(size)),
+                ])
+                remaining[event.stream_id] = size
+            elif isinstance(event, h2.events.StreamReset):
+                remaining.pop(event.stream_id, None)
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                return
+        # Send as much as the flow control windows allow.
+        for stream_id, left in list(remaining.items()):
+            n = min(left, h2_conn.local_flow_control_window(stream_id))
+            while n > 0:
+                chunk = min(n, h2_conn.max_outbound_frame_size)
+                h2_conn.send_data(stream_id, body[:chunk])
+                n -= chunk
+                left -= chunk
+            if left:
+                remaining[stream_id] = left
+            else:
+                h2_conn.end_stream(stream_id)
+                del remaining[stream_id]
+        conn.sendall(h2_conn.data_to_send())
+
+
+def start_backend(size, confdir):
+    cert, key, _ = certs.CertStore.from_store(confdir, "mitmproxy").get_cert(b"127.0.0.1", [])
+    context = tls.create_server_context(cert=cert, key=key, alpn_select=b"h2")
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen()
+
+    def accept():
+        while True:
+            s, _ = sock.accept()
+            conn = SSL.Connection(context, s)
+            conn.set_accept_state()
+            threading.Thread(target=backend_connection, args=(conn, size), daemon=True).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    return sock.getsockname()[1]
+
+
+def start_proxy(upstream_port, confdir):
+    opts = options.Options(
+        listen_host="127.0.0.1",
+        listen_port=0,
+        mode="reverse:https://127.0.0.1:%d" % upstream_port,
+        ssl_insecure=True,
+        confdir=confdir,
+    )
+    started = queue.Queue()
+
+    def run():
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        m = master.Master(opts)
+        m.addons.add(*addons.default_addons())
+        m.server = ProxyServer(ProxyConfig(opts))
+        started.put(m)
+        m.run()
+
+    threading.Thread(target=run, daemon=True).start()
+    return started.get()
+
+
+def download(port, streams):
+    client = tcp.TCPClient(("127.0.0.1", port))
+    client.connect()
+    client.convert_to_tls(sni="127.0.0.1", alpn_protos=[b"h2"])
+    h2_conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=True))
+    h2_conn.initiate_connection()
+    h2_conn.update_settings({h2.settings.SettingCodes.INITIAL_WINDOW_SIZE: MAX_WINDOW})
+    h2_conn.increment_flow_control_window(MAX_WINDOW - h2_conn.inbound_flow_control_window)
+    for i in range(streams):
+        h2_conn.send_headers(h2_conn.get_next_available_stream_id(), [
+            (":method", "GET"),
+            (":scheme", "https"),
+            (":authority", "127.0.0.1"),
+            (":path", "/"),
+        ], end_stream=True)
+    client.wfile.write(h2_conn.data_to_send())
+    client.wfile.flush()
+
+    received = 0
+    ended = 0
+    while ended < streams:
+        data = client.rfile.read1(65536)
+        if not data:
+            raise RuntimeError("Connection closed after %d of %d streams" % (ended, streams))
+        for event in h2_conn.receive_data(data):
+            if isinstance(event, h2.events.DataReceived):
+                received += len(event.data)
+                h2_conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            elif isinstance(event, h2.events.StreamEnded):
+                ended += 1
+            elif isinstance(event, h2.events.StreamReset):
+                raise RuntimeError("Stream %d reset" % event.stream_id)
+        client.wfile.write(h2_conn.data_to_send())
+        client.wfile.flush()
+    client.finish()
+    return received
+
+
+def main(streams, kilobytes):
+    with tempfile.TemporaryDirectory() as confdir:
+        backend_port = start_backend(kilobytes * 1024, confdir)
+        m = start_proxy(backend_port, confdir)
+        try:
+            start = time.perf_counter()
+            received = download(m.server.address[1], streams)
+            spent = time.perf_counter() - start
+        finally:
+            m.shutdown()
+    print("%d streams of %dKB: %.1f MB/s" % (streams, kilobytes, received / spent / 1024 ** 2))
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 1024,
+    )
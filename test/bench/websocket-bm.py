@@ -0,0 +1,80 @@
+"""
+    Microbenchmark for reading masked WebSocket frames from a socket.
+
+    Compares Frame.from_file with FrameReader, for 1KB and 1MB frames.
+    FrameReader.read unmasks payloads like Frame.from_file does;
+    FrameReader.read_raw returns the frames as they were received, which is
+    what the proxy passes on to wsproto.
+
+    Usage: python websocket-bm.py [megabytes]
+"""
+import os
+import socket
+import sys
+import threading
+import time
+
+from mitmproxy.net import tcp
+from mitmproxy.net import websockets
+
+
+def send(sock, frame, count):
+    data = frame * min(count, 64)
+    sent = 0
+    while sent < count:
+        sock.sendall(data)
+        sent += 64
+    sock.shutdown(socket.SHUT_WR)
+
+
+def run(read, frame, count):
+    a, b = socket.socketpair()
+    t = threading.Thread(target=send, args=(a, frame, count))
+    t.start()
+    rfile = tcp.Reader(socket.SocketIO(b, "rb"))
+    start = time.perf_counter()
+    read(rfile, count)
+    spent = time.perf_counter() - start
+    t.join()
+    a.close()
+    b.close()
+    return spent
+
+
+def from_file(rfile, count):
+    for _ in range(count):
+        websockets.Frame.from_file(rfile)
+
+
+def frame_reader(rfile, count):
+    r = websockets.FrameReader(rfile)
+    while count > 0:
+        count -= len(r.read())
+
+
+def frame_reader_raw(rfile, count):
+    r = websockets.FrameReader(rfile)
+    while count > 0:
+        count -= len(r.read_raw())
+
+
+def main(megabytes):
+    for size in (1024, 1024 ** 2):
+        frame = bytes(websockets.Frame(os.urandom(size), mask=1))
+        # Round up to a multiple of the 64 frames sent at once.
+        count = -(-megabytes * 1024 ** 2 // size // 64) * 64
+        for name, read in (
+            ("Frame.from_file", from_file),
+            ("FrameReader.read", frame_reader),
+            ("FrameReader.read_raw", frame_reader_raw),
+        ):
+            spent = run(read, frame, count)
+            print("%7s frames  %-21s %8.1f MB/s" % (
+                "1KB" if size == 1024 else "1MB",
+                name,
+                count * size / spent / 1024 ** 2,
+            ))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 64)
@@ -1,6 +1,8 @@
+import ipaddress
 from unittest import mock
 import pytest
 
+from mitmproxy import exceptions
 from mitmproxy.addons import block
 from mitmproxy.test import taddons
 
@@ -65,3 +67,85 @@ async def test_block_global(block_global, block_private, should_be_killed, addre
                 assert await tctx.master.await_log("killed", "warn")
             else:
                 assert not layer.reply.kill.called
+
+
+def test_prefix_trie():
+    t = block.PrefixTrie([
+        ipaddress.ip_network("10.0.0.0/8"),
+        ipaddress.ip_network("10.1.0.0/16"),
+        ipaddress.ip_network("192.168.1.1/32"),
+        ipaddress.ip_network("2001:db8::/32"),
+    ])
+    assert len(t) == 4
+    for a in ("10.0.0.1", "10.1.2.3", "10.255.255.255", "192.168.1.1", "2001:db8::1"):
+        assert ipaddress.ip_address(a) in t
+    for a in ("11.0.0.1", "192.168.1.2", "192.168.1.0", "2001:db9::1", "::ffff:10.0.0.1"):
+        assert ipaddress.ip_address(a) not in t
+    assert ipaddress.ip_address("1.1.1.1") not in block.PrefixTrie()
+
+    t.add(ipaddress.ip_network("0.0.0.0/0"))
+    assert ipaddress.ip_address("1.1.1.1") in t
+    assert ipaddress.ip_address("::1") not in t
+
+
+def test_load_networks(tmpdir):
+    p = tmpdir.join("networks")
+    p.write("# comment\n\n10.0.0.1/8  # not strict\n2001:db8::/32\n")
+    t = block.load_networks(str(p))
+    assert len(t) == 2
+    assert ipaddress.ip_address("10.2.3.4") in t
+
+    p.write("10.0.0.0/8\nfoo\n")
+    with pytest.raises(exceptions.OptionsError, match="line 2"):
+        block.load_networks(str(p))
+    with pytest.raises(exceptions.OptionsError, match="Could not read"):
+        block.load_networks(str(tmpdir.join("nonexistent")))
+
+
+@pytest.mark.parametrize("address, killed_by", [
+    ("127.0.0.1", None),
+    ("10.0.0.1", None),
+    ("10.6.6.6", "block_list"),
+    ("::ffff:10.6.6.6", "block_list"),
+    ("1.1.1.1", None),
+    ("8.8.8.8", "allow_list"),
+    ("192.168.1.1", "allow_list"),
+])
+@pytest.mark.asyncio
+async def test_lists(tmpdir, address, killed_by):
+    allow = tmpdir.join("allow")
+    allow.write("10.0.0.0/8\n1.1.1.0/24\n")
+    deny = tmpdir.join("deny")
+    deny.write("10.6.0.0/16\n")
+    ar = block.Block()
+    with taddons.context(ar) as tctx:
+        tctx.configure(ar, allow_list=str(allow), block_list=str(deny))
+        with mock.patch('mitmproxy.proxy.protocol.base.Layer') as layer:
+            layer.client_conn.address = (address,)
+            ar.clientconnect(layer)
+            if killed_by:
+                assert layer.reply.kill.called
+                assert await tctx.master.await_log("killed by " + killed_by, "warn")
+            else:
+                assert not layer.reply.kill.called
+
+
+def test_reload(tmpdir):
+    deny = tmpdir.join("deny")
+    deny.write("10.0.0.0/8\n")
+    ar = block.Block()
+    with taddons.context(ar) as tctx:
+        tctx.configure(ar, block_list=str(deny))
+        assert ipaddress.ip_address("1.1.1.1") not in ar.deny
+        deny.write("1.1.1.1\n")
+        tctx.command(ar.reload)
+        assert ipaddress.ip_address("1.1.1.1") in ar.deny
+        assert ipaddress.ip_address("10.0.0.1") not in ar.deny
+
+        deny.write("invalid\n")
+        with pytest.raises(exceptions.OptionsError):
+            ar.reload()
+        assert ipaddress.ip_address("1.1.1.1") in ar.deny
+
+        tctx.configure(ar, block_list=None)
+        assert ar.deny is None
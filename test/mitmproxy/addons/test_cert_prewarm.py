@@ -0,0 +1,81 @@
+import socket
+import time
+
+import pytest
+from unittest import mock
+
+from mitmproxy import certs
+from mitmproxy import exceptions
+from mitmproxy.addons import cert_prewarm
+from mitmproxy.net import tcp
+from mitmproxy.proxy.protocol import tls
+from mitmproxy.test import taddons
+
+from ..net import tservers
+
+
+class NoopHandler(tcp.BaseHandler):
+    def handle(self):
+        pass
+
+
+class TestCertPrewarm(tservers.ServerTestBase):
+    handler = NoopHandler
+    ssl = True
+
+    def test_configure(self):
+        a = cert_prewarm.CertPrewarm()
+        with taddons.context(a) as tctx:
+            tctx.configure(a, cert_prewarm=["example.com", "127.0.0.1:8443"])
+            assert a.addresses == [("example.com", 443), ("127.0.0.1", 8443)]
+            with pytest.raises(exceptions.OptionsError):
+                tctx.configure(a, cert_prewarm=["example.com:99999"])
+
+    def test_running(self):
+        a = cert_prewarm.CertPrewarm()
+        with taddons.context(a) as tctx:
+            tctx.configure(a, cert_prewarm=["example.com"])
+            tctx.master.server = mock.MagicMock()
+            with mock.patch.object(a, "prewarm") as prewarm:
+                a.running()
+                a.thread.join()
+            assert prewarm.call_args[0][1] == [("example.com", 443)]
+            assert prewarm.call_args[0][4] == 10
+
+    def test_prewarm(self, tmpdir):
+        ca = certs.CertStore.from_store(str(tmpdir), "test")
+        channel = mock.Mock()
+        a = cert_prewarm.CertPrewarm()
+        a.prewarm(ca, [("example.com", 443), ("127.0.0.1", 443)], False, channel)
+        assert ca.misses == 2
+        ca.get_cert(b"example.com", [b"example.com"])
+        ca.get_cert(*tls.cert_identity(b"127.0.0.1", None, []))
+        assert ca.hits == 2
+
+    def test_prewarm_upstream_cert(self, tmpdir):
+        ca = certs.CertStore.from_store(str(tmpdir), "test")
+        channel = mock.Mock()
+        a = cert_prewarm.CertPrewarm()
+        upstream_cert = a.fetch_cert("127.0.0.1", self.port, channel)
+        assert upstream_cert.cn == b"xn--mitmproxyss-t8a8u4c.example.com"
+        a.prewarm(ca, [("127.0.0.1", self.port)], True, channel)
+        ca.get_cert(*tls.cert_identity(b"127.0.0.1", upstream_cert, []))
+        assert ca.hits == 1
+
+    def test_fetch_cert_error(self):
+        channel = mock.Mock()
+        a = cert_prewarm.CertPrewarm()
+        assert a.fetch_cert("127.0.0.1", 0, channel) is None
+        assert channel.tell.call_args[0][1].level == "warn"
+
+    def test_fetch_cert_timeout(self):
+        channel = mock.Mock()
+        a = cert_prewarm.CertPrewarm()
+        # The connection is accepted by the kernel, but the handshake never completes.
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            s.listen()
+            start = time.monotonic()
+            assert a.fetch_cert("127.0.0.1", s.getsockname()[1], channel, timeout=0.2) is None
+            assert time.monotonic() - start < 5
+        assert "timed out" in channel.tell.call_args[0][1].msg
@@ -160,6 +160,12 @@ def test_validation_simple():
         with pytest.raises(exceptions.OptionsError):
             tctx.configure(sa, body_size_limit = "invalid")
         tctx.configure(sa, body_size_limit = "1m")
+        with pytest.raises(exceptions.OptionsError, match="TCP message size limit"):
+            tctx.configure(sa, tcp_message_size_limit = "invalid")
+        tctx.configure(sa, tcp_message_size_limit = "1m")
+        with pytest.raises(exceptions.OptionsError, match="WebSocket message size limit"):
+            tctx.configure(sa, websocket_message_size_limit = "invalid")
+        tctx.configure(sa, websocket_message_size_limit = "1m")
 
         with pytest.raises(exceptions.OptionsError, match="mutually exclusive"):
             tctx.configure(
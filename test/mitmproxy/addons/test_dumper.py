@@ -184,6 +184,14 @@ def test_tcp():
         f = tflow.ttcpflow()
         d.tcp_message(f)
         assert "it's me" in sio.getvalue()
+        assert "hello" not in sio.getvalue()
+        sio.truncate(0)
+
+        # Batched events cover several messages.
+        f.new_messages = 2
+        d.tcp_message(f)
+        assert "hello" in sio.getvalue()
+        assert "it's me" in sio.getvalue()
         sio.truncate(0)
 
         f = tflow.ttcpflow(client_conn=True, err=True)
@@ -56,6 +56,33 @@ def test_websocket(tmpdir):
         assert rd(p)
 
 
+def test_websocket_evicted(tmpdir):
+    sa = save.Save()
+    with taddons.context(sa) as tctx:
+        p = str(tmpdir.join("foo"))
+        tctx.configure(sa, save_stream_file=p)
+
+        f = tflow.twebsocketflow()
+        messages = f.messages[:]
+        sa.websocket_start(f)
+        f.evicted_messages = [f.messages.pop(0)]
+        sa.websocket_message(f)
+        f.evicted_messages = [f.messages.pop(0)]
+        sa.websocket_end(f)
+
+        f2 = tflow.twebsocketflow()
+        sa.websocket_start(f2)
+        f2.evicted_messages = [f2.messages.pop(0)]
+        sa.websocket_message(f2)
+        tctx.configure(sa, save_stream_file=None)
+
+        flows = rd(p)
+        assert len(flows) == 2
+        for loaded in flows:
+            assert [m.get_state() for m in loaded.messages] == [m.get_state() for m in messages]
+            assert "websocket_partial" not in loaded.metadata
+
+
 def test_save_command(tmpdir):
     sa = save.Save()
     with taddons.context() as tctx:
@@ -1 +1,22 @@
-# TODO: write tests
+import io
+
+from mitmproxy import io as mio
+from mitmproxy.test import tflow
+
+
+def test_partial_websocket_flow():
+    f = tflow.twebsocketflow()
+    messages = [m.get_state() for m in f.messages]
+    sio = io.BytesIO()
+    w = mio.FlowWriter(sio)
+    w.add_partial(f, f.messages[:1])
+    w.add_partial(f, f.messages[1:])
+    w.add(tflow.tflow())
+    sio.seek(0)
+
+    # The file ends before the complete flow state.
+    flows = list(mio.FlowReader(sio).stream())
+    assert len(flows) == 2
+    assert flows[1].id == f.id
+    assert [m.get_state() for m in flows[1].messages] == messages
+    assert "websocket_partial" not in flows[1].metadata
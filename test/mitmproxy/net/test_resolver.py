@@ -0,0 +1,60 @@
+import socket
+from unittest import mock
+
+import pytest
+
+from mitmproxy.net import resolver
+
+
+def test_cache():
+    r = resolver.Resolver()
+    with mock.patch("socket.getaddrinfo", return_value=["addr"]) as m:
+        assert r.getaddrinfo("example.com", 80) == ["addr"]
+        assert r.getaddrinfo("example.com", 80) == ["addr"]
+        assert r.getaddrinfo("example.com", 443) == ["addr"]
+    assert m.call_count == 2
+    assert (r.hits, r.misses) == (1, 2)
+    assert len(r) == 2
+    r.clear()
+    assert len(r) == 0
+
+
+def test_negative():
+    r = resolver.Resolver(negative_ttl=10)
+    with mock.patch("socket.getaddrinfo", side_effect=socket.gaierror(-2, "Name or service not known")) as m:
+        for _ in range(2):
+            with pytest.raises(socket.gaierror, match="not known"):
+                r.getaddrinfo("example.invalid", 80)
+    assert m.call_count == 1
+
+    r = resolver.Resolver(negative_ttl=0)
+    with mock.patch("socket.getaddrinfo", side_effect=socket.gaierror(-2, "Name or service not known")) as m:
+        for _ in range(2):
+            with pytest.raises(socket.gaierror):
+                r.getaddrinfo("example.invalid", 80)
+    assert m.call_count == 2
+
+
+def test_ttl():
+    r = resolver.Resolver(ttl=10)
+    with mock.patch("socket.getaddrinfo", return_value=["addr"]) as m:
+        r.getaddrinfo("example.com", 80)
+        with mock.patch("time.time", return_value=2 ** 40):
+            r.getaddrinfo("example.com", 80)
+    assert m.call_count == 2
+
+
+def test_max_size():
+    r = resolver.Resolver(max_size=2)
+    with mock.patch("socket.getaddrinfo", return_value=["addr"]):
+        r.getaddrinfo("a", 80)
+        r.getaddrinfo("b", 80)
+        r.getaddrinfo("a", 80)
+        r.getaddrinfo("c", 80)
+    assert len(r) == 2
+    assert ("b", 80) not in r._entries
+
+
+def test_localhost():
+    r = resolver.Resolver()
+    assert r.getaddrinfo("localhost", 80)
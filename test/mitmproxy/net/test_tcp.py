@@ -1,4 +1,7 @@
 from io import BytesIO
+import asyncio
+import errno
+import os
 import re
 import queue
 import time
@@ -10,6 +13,7 @@ from unittest import mock
 from OpenSSL import SSL
 
 from mitmproxy import certs
+from mitmproxy.net import resolver
 from mitmproxy.net import tcp
 from mitmproxy import exceptions
 from mitmproxy.utils import data
@@ -149,6 +153,206 @@ class TestEcho(tservers.ServerTestBase):
             assert c.rfile.readline() == testval
 
 
+class TestServerReusePort:
+
+    def test_reuse_port(self):
+        a = tcp.TCPServer(("127.0.0.1", 0), reuse_port=True)
+        b = tcp.TCPServer(("127.0.0.1", a.address[1]), reuse_port=True)
+        assert a.address == b.address
+        a.socket.close()
+        b.socket.close()
+
+
+class TestServerAsync:
+
+    def test_echo(self):
+        q = queue.Queue()
+        s = tservers._TServer(None, q, EchoHandler, ("127.0.0.1", 0))
+        loop = asyncio.new_event_loop()
+        s.serve_async(loop)
+        t = threading.Thread(target=loop.run_forever)
+        t.start()
+        try:
+            idle = tcp.TCPClient(("127.0.0.1", s.address[1]))
+            with idle.connect():
+                testval = b"echo!\n"
+                c = tcp.TCPClient(("127.0.0.1", s.address[1]))
+                with c.connect():
+                    c.wfile.write(testval)
+                    c.wfile.flush()
+                    assert c.rfile.readline() == testval
+                # The idle connection has been accepted, but it is still
+                # parked on the event loop without a handler thread.
+                s.wait_for_silence()
+                for _ in range(100):
+                    if len(s._parked) == 1:
+                        break
+                    time.sleep(0.01)
+                assert len(s._parked) == 1
+        finally:
+            s.shutdown()
+            loop.call_soon_threadsafe(loop.stop)
+            t.join()
+            loop.run_until_complete(asyncio.sleep(0))
+            loop.close()
+        assert not s._parked
+
+
+class TestWorkerPool:
+
+    def test_submit(self):
+        ev = threading.Event()
+        handled = queue.Queue()
+
+        def handler(connection, client_address):
+            ev.wait()
+            handled.put(client_address)
+
+        p = tcp.WorkerPool(handler, 2, queue_size=1)
+        assert p.submit(None, 1)
+        assert p.submit(None, 2)
+        for _ in range(100):
+            if p.busy == 2:
+                break
+            time.sleep(0.01)
+        assert len(p.workers) == 2
+        assert p.utilisation == 1
+        assert p.submit(None, 3)
+        assert p.queue_depth == 1
+        assert not p.has_capacity()
+        assert not p.submit(None, 4)
+        assert p.rejected == 1
+
+        ev.set()
+        assert sorted(handled.get(timeout=5) for _ in range(3)) == [1, 2, 3]
+        assert len(p.workers) == 2
+        p.shutdown()
+        assert not p.workers
+        # The shutdown signal is not a queued connection.
+        assert p.queue_depth == 0
+
+    def test_shutdown_full_queue(self):
+        ev = threading.Event()
+        p = tcp.WorkerPool(lambda *args: ev.wait(), 1, queue_size=1)
+        a, b = socket.socketpair()
+        assert p.submit(None, 1)
+        for _ in range(100):
+            if p.busy == 1:
+                break
+            time.sleep(0.01)
+        assert p.submit(a, 2)
+        assert not p.has_capacity()
+        # Must neither block on the full queue nor leave the queued
+        # connection open.
+        p.shutdown()
+        assert b.recv(1) == b""
+        assert not p.submit(None, 3)
+        ev.set()
+        b.close()
+
+    def test_spawn_error(self):
+        p = tcp.WorkerPool(lambda *args: None, 1)
+        with mock.patch("mitmproxy.net.tcp.basethread.BaseThread.start", side_effect=threading.ThreadError):
+            with pytest.raises(threading.ThreadError):
+                p.submit(None, 1)
+        assert p.queue_depth == 0
+
+
+class TestServerWorkerPool:
+
+    class Server(tcp.TCPServer):
+        def __init__(self, *args, **kwargs):
+            self.release = threading.Event()
+            super().__init__(*args, **kwargs)
+
+        def handle_client_connection(self, conn, client_address):
+            self.release.wait()
+            conn.sendall(b"handled")
+
+        def handle_rejected(self, conn, client_address):
+            conn.sendall(b"busy")
+
+    def test_invalid_policy(self):
+        with pytest.raises(ValueError):
+            tcp.TCPServer(("127.0.0.1", 0), queue_full_policy="foo")
+
+    @pytest.mark.parametrize("policy, rejected", [
+        ("reject", b""),
+        ("error", b"busy"),
+    ])
+    def test_queue_full(self, policy, rejected):
+        s = self.Server(("127.0.0.1", 0), max_workers=1, queue_size=1, queue_full_policy=policy)
+        t = threading.Thread(target=s.serve_forever)
+        t.start()
+        try:
+            clients = [tcp.TCPClient(("127.0.0.1", s.address[1])) for _ in range(3)]
+            clients[0].connect()
+            for _ in range(100):
+                if s.worker_pool.busy == 1:
+                    break
+                time.sleep(0.01)
+            clients[1].connect()
+            for _ in range(100):
+                if s.worker_pool.queue_depth == 1:
+                    break
+                time.sleep(0.01)
+            clients[2].connect()
+            assert clients[2].rfile.read(4) == rejected
+            assert s.worker_pool.rejected == 1
+
+            s.release.set()
+            assert clients[0].rfile.read(7) == b"handled"
+            assert clients[1].rfile.read(7) == b"handled"
+            for c in clients:
+                c.close()
+        finally:
+            s.shutdown()
+            t.join()
+        assert not s.worker_pool.workers
+
+    def test_queue_full_delay(self):
+        class Server(self.Server):
+            checks = 0
+
+            def _can_accept(self):
+                self.checks += 1
+                return super()._can_accept()
+
+        s = Server(("127.0.0.1", 0), max_workers=1, queue_size=1, queue_full_policy="delay")
+        t = threading.Thread(target=s.serve_forever)
+        t.start()
+        try:
+            clients = [tcp.TCPClient(("127.0.0.1", s.address[1])) for _ in range(3)]
+            for c in clients:
+                c.connect()
+            for _ in range(100):
+                if s.worker_pool.queue_depth == 1:
+                    break
+                time.sleep(0.01)
+            checks = s.checks
+            time.sleep(0.5)
+            # The server waits for room in the queue instead of spinning.
+            assert s.checks - checks < 20
+            assert s.worker_pool.rejected == 0
+
+            s.release.set()
+            for c in clients:
+                assert c.rfile.read(7) == b"handled"
+                c.close()
+        finally:
+            s.shutdown()
+            t.join()
+
+    def test_spawn_error(self):
+        s = self.Server(("127.0.0.1", 0), max_workers=1)
+        a, b = socket.socketpair()
+        with mock.patch("mitmproxy.net.tcp.basethread.BaseThread.start", side_effect=threading.ThreadError):
+            s.start_connection(a, ("127.0.0.1", 0))
+        assert b.recv(1) == b""
+        b.close()
+        s.shutdown()
+
+
 class HardDisconnectHandler(tcp.BaseHandler):
 
     def handle(self):
@@ -630,6 +834,68 @@ class TestTCPClient(tservers.ServerTestBase):
         with pytest.raises(exceptions.TcpException, match="Failed to spoof"):
             c.connect()
 
+    def test_resolve(self):
+        c = tcp.TCPClient(("localhost", self.port))
+        r = resolver.Resolver()
+        with c.connect(resolver=r):
+            pass
+        assert r.misses == 1
+        c = tcp.TCPClient(("example.invalid", self.port))
+        with pytest.raises(exceptions.TcpException, match="Error resolving"):
+            c.connect()
+
+    def _addrinfo(self, *ports):
+        return [
+            (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", port))
+            for port in ports
+        ]
+
+    def test_happy_eyeballs(self):
+        # An unused port, so that the first attempt fails.
+        s = socket.socket()
+        s.bind(("127.0.0.1", 0))
+        closed_port = s.getsockname()[1]
+        s.close()
+
+        c = tcp.TCPClient(("127.0.0.1", self.port))
+        with c.connect(happy_eyeballs_delay=0.05, addrinfo=self._addrinfo(closed_port, self.port)):
+            assert c.ip_address == ("127.0.0.1", self.port)
+            assert c.connection.gettimeout() is None
+
+        c = tcp.TCPClient(("127.0.0.1", self.port))
+        with pytest.raises(exceptions.TcpException, match="Error connecting"):
+            c.connect(happy_eyeballs_delay=0.05, addrinfo=self._addrinfo(closed_port, closed_port))
+
+    def test_happy_eyeballs_delay(self):
+        # The first attempt never completes: the read end of a pipe never becomes writable.
+        r, w = os.pipe()
+        slow = mock.Mock()
+        slow.connect_ex.return_value = errno.EINPROGRESS
+        slow.fileno.return_value = r
+        calls = []
+
+        def makesocket(family, type, proto):
+            calls.append(family)
+            if len(calls) == 1:
+                return slow
+            return socket.socket(family, type, proto)
+
+        c = tcp.TCPClient(("127.0.0.1", self.port))
+        c.makesocket = makesocket
+        addrinfo = [
+            (socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("::1", 1)),
+            (socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("::1", 2)),
+        ] + self._addrinfo(self.port)
+        try:
+            with c.connect(happy_eyeballs_delay=0.05, addrinfo=addrinfo):
+                assert c.ip_address == ("127.0.0.1", self.port)
+        finally:
+            os.close(r)
+            os.close(w)
+        # Address families are interleaved, so the IPv4 address is tried second.
+        assert calls == [socket.AF_INET6, socket.AF_INET]
+        assert slow.close.called
+
 
 class TestTCPServer:
 
@@ -658,6 +924,14 @@ class TestFileLike:
         d = s.read(-1)
         assert d.startswith(b"abc") and d.endswith(b"xyz")
 
+    def test_read1(self):
+        s = tcp.Reader(BytesIO(b"foobar"))
+        s.start_log()
+        assert s.read1(4) == b"foob"
+        assert s.read1(100) == b"ar"
+        assert s.read1(100) == b""
+        assert s.get_log() == b"foobar"
+
     def test_wrap(self):
         s = BytesIO(b"foobar\nfoobar")
         s.flush()
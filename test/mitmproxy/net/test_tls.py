@@ -1,10 +1,15 @@
 import io
+import socket
+import ssl
+import threading
 
 import pytest
+from OpenSSL import SSL, crypto
 
+from mitmproxy import certs
 from mitmproxy import exceptions
 from mitmproxy.net import tls
-from mitmproxy.net.tcp import TCPClient
+from mitmproxy.net.tcp import BaseHandler, TCPClient
 from test.mitmproxy.net.test_tcp import EchoHandler
 from . import tservers
 
@@ -155,3 +160,165 @@ class TestClientHello:
         ))
         with pytest.raises(exceptions.TlsProtocolException, message='Cannot parse Client Hello'):
             tls.ClientHello.from_file(rfile)
+
+
+class TestClientSessionCache:
+    def test_context(self):
+        c = tls.ClientSessionCache()
+        ctx, key = c.context(sni="example.com", alpn_protos=[b"h2"])
+        assert c.context(sni="other.example.com", alpn_protos=[b"h2"]) == (ctx, key)
+        ctx2, key2 = c.context(sni="example.com")
+        assert ctx2 is not ctx
+        assert key2 != key
+        with pytest.raises(exceptions.TlsException, match="without SNI"):
+            c.context(verify=SSL.VERIFY_PEER)
+
+    def test_context_limit(self):
+        c = tls.ClientSessionCache(max_contexts=2)
+        ctx, _ = c.context(cipher_list="AES128-SHA")
+        c.context(cipher_list="AES256-SHA")
+        assert c.context(cipher_list="AES128-SHA")[0] is ctx
+        c.context(cipher_list="AES128-GCM-SHA256")
+        assert len(c._contexts) == 2
+        assert c.context(cipher_list="AES128-SHA")[0] is ctx
+        assert len(c._contexts) == 2
+
+    def test_get_put(self):
+        c = tls.ClientSessionCache(max_size=2)
+        assert c.get("a") is None
+        c.put("a", "session", ["cert"])
+        assert c.get("a") == ("session", ["cert"])
+        c.put("b", "session", [])
+        c.get("a")
+        c.put("c", "session", [])
+        assert len(c) == 2
+        assert c.get("b") is None
+        assert c.get("a")
+        assert (c.hits, c.misses) == (3, 2)
+
+    def test_ttl(self):
+        c = tls.ClientSessionCache(ttl=0)
+        c.put("a", "session", [])
+        assert c.get("a") is None
+        assert len(c) == 0
+
+    def test_resume(self, tdata):
+        server_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        server_ctx.load_cert_chain(
+            tdata.path("mitmproxy/net/data/verificationcerts/trusted-leaf.crt"),
+            tdata.path("mitmproxy/net/data/verificationcerts/trusted-leaf.key"),
+        )
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        sock.listen(5)
+
+        def serve():
+            for _ in range(2):
+                conn, _ = sock.accept()
+                with server_ctx.wrap_socket(conn, server_side=True) as s:
+                    s.sendall(s.recv(1024))
+
+        t = threading.Thread(target=serve, daemon=True)
+        t.start()
+
+        cache = tls.ClientSessionCache()
+        chains = []
+        for _ in range(2):
+            c = TCPClient(sock.getsockname())
+            with c.connect():
+                c.convert_to_tls(
+                    sni="example.mitmproxy.org",
+                    verify=SSL.VERIFY_PEER,
+                    ca_pemfile=tdata.path("mitmproxy/net/data/verificationcerts/trusted-root.crt"),
+                    session_cache=cache,
+                )
+                c.wfile.write(b"echo!\n")
+                c.wfile.flush()
+                assert c.rfile.readline() == b"echo!\n"
+                chains.append(c.server_certs)
+        t.join()
+        sock.close()
+        assert cache.resumed == 1
+        assert chains[0] == chains[1]
+
+
+class TestUpstreamCertCache:
+    def test_get_put(self):
+        c = tls.UpstreamCertCache(max_size=2)
+        assert c.get("a", ()) is None
+        c.put("a", "cert", [b"h2", b"http/1.1"], b"h2")
+        assert c.get("a", [b"h2", b"http/1.1"]) == ("cert", b"h2")
+        assert c.get("a", [b"http/1.1"]) is None
+        c.put("b", "cert", (), None)
+        c.get("a", [b"h2", b"http/1.1"])
+        c.put("c", "cert", (), None)
+        assert len(c) == 2
+        assert c.get("b", ()) is None
+        assert (c.hits, c.misses) == (2, 3)
+
+    def test_ttl(self):
+        c = tls.UpstreamCertCache(ttl=0)
+        c.put("a", "cert", (), None)
+        assert c.get("a", ()) is None
+        assert len(c) == 0
+
+
+class TestServerContextCache:
+    def _cert(self, tdata):
+        with open(tdata.path("mitmproxy/net/data/server.crt"), "rb") as f:
+            cert = certs.Cert.from_pem(f.read())
+        with open(tdata.path("mitmproxy/net/data/server.key"), "rb") as f:
+            key = crypto.load_privatekey(crypto.FILETYPE_PEM, f.read())
+        return cert, key
+
+    def test_context(self, tdata):
+        cert, key = self._cert(tdata)
+        c = tls.ServerContextCache(max_size=2)
+        ctx = c.context(cert, key, cipher_list="AES128-SHA")
+        assert c.context(cert, key, cipher_list="AES128-SHA") is ctx
+        assert c.context(cert, key, cipher_list="AES256-SHA") is not ctx
+        assert c.context(cert, key, alpn_per_connection=True) is not ctx
+        assert len(c) == 2
+        assert (c.hits, c.misses) == (1, 3)
+
+    def test_resume(self, tdata):
+        cert, key = self._cert(tdata)
+        cache = tls.ServerContextCache()
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        sock.listen(5)
+        alpn = []
+
+        def alpn_select(conn, options):
+            alpn.append(options)
+            return options[0]
+
+        def serve():
+            for _ in range(2):
+                conn, address = sock.accept()
+                h = BaseHandler(conn, address, None)
+                h.convert_to_tls(cert, key, context_cache=cache, alpn_select_callback=alpn_select)
+                h.wfile.write(h.rfile.readline())
+                h.wfile.flush()
+                h.finish()
+                conn.close()
+
+        t = threading.Thread(target=serve, daemon=True)
+        t.start()
+
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+        ctx.set_alpn_protocols(["http/1.1"])
+        session = None
+        for _ in range(2):
+            with ctx.wrap_socket(socket.create_connection(sock.getsockname()), session=session) as s:
+                s.sendall(b"echo!\n")
+                assert s.recv(1024) == b"echo!\n"
+                assert s.selected_alpn_protocol() == "http/1.1"
+                session = s.session
+        t.join()
+        sock.close()
+        assert len(alpn) == 2
+        assert cache.resumed == 1
+        assert len(cache) == 1
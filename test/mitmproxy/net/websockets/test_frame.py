@@ -2,6 +2,7 @@ import os
 import codecs
 import pytest
 
+from mitmproxy import exceptions
 from mitmproxy.net import websockets
 from mitmproxy.test import tutils
 
@@ -90,6 +91,21 @@ class TestFrameHeader:
         round(opcode=websockets.OPCODE.PING)
         round(masking_key=b"test")
 
+    @pytest.mark.parametrize("kwargs", [
+        dict(),
+        dict(fin=True, rsv1=True, rsv2=True, rsv3=True, opcode=websockets.OPCODE.PING),
+        dict(payload_length=100),
+        dict(payload_length=1000, masking_key=b"test"),
+        dict(payload_length=100000),
+    ])
+    def test_from_buffer(self, kwargs):
+        h = websockets.FrameHeader(**kwargs)
+        b = bytes(h)
+        assert websockets.FrameHeader.from_buffer(b) == (h, len(b))
+        assert websockets.FrameHeader.from_buffer(b"xx" + b, 2) == (h, len(b))
+        for i in range(len(b)):
+            assert websockets.FrameHeader.from_buffer(b[:i]) is None
+
     def test_human_readable(self):
         f = websockets.FrameHeader(
             masking_key=b"test",
@@ -164,3 +180,44 @@ class TestFrame:
         )
         serialized = bytes(frame)
         assert frame == websockets.Frame.from_bytes(serialized)
+
+
+class TestFrameReader:
+    def frames(self):
+        return [
+            websockets.Frame(b"foo", fin=True, opcode=websockets.OPCODE.TEXT),
+            websockets.Frame(os.urandom(70000), mask=1),
+            websockets.Frame(b"", fin=True, opcode=websockets.OPCODE.PING, masking_key=b"test"),
+            websockets.Frame(os.urandom(200), fin=True, masking_key=b"abcd"),
+        ]
+
+    def test_read(self):
+        frames = self.frames()
+        r = websockets.FrameReader(tutils.treader(b"".join(bytes(f) for f in frames)))
+        received = []
+        while len(received) < len(frames):
+            received.extend(r.read())
+        assert received == frames
+        assert received[3].payload == frames[3].payload
+        with pytest.raises(exceptions.TcpDisconnect):
+            r.read()
+
+    def test_read_raw(self):
+        frames = [bytes(f) for f in self.frames()]
+        r = websockets.FrameReader(tutils.treader(b"".join(frames)), bufsize=100)
+        received = []
+        while len(received) < len(frames):
+            received.extend(r.read_raw())
+        assert received == frames
+
+    def test_many_frames(self):
+        frames = [websockets.Frame(b"x" * i, mask=1) for i in range(100)]
+        r = websockets.FrameReader(tutils.treader(b"".join(bytes(f) for f in frames)))
+        assert r.read() == frames
+
+    @pytest.mark.parametrize("length", [1, 3])
+    def test_incomplete(self, length):
+        data = bytes(websockets.Frame(b"foobar"))
+        r = websockets.FrameReader(tutils.treader(data[:length]))
+        with pytest.raises(exceptions.TcpException):
+            r.read()
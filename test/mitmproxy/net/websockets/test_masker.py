@@ -1,4 +1,6 @@
 import codecs
+import os
+
 import pytest
 
 from mitmproxy.net import websockets
@@ -21,3 +23,11 @@ class TestMasker:
 
         data = websockets.Masker(b"abcd")(data)
         assert data == b"".join(input)
+
+    @pytest.mark.parametrize("length", [0, 1, 2047, 2048, 2049, 100000])
+    @pytest.mark.parametrize("offset", [0, 1, 2, 3, 6])
+    def test_mask(self, length, offset):
+        key = os.urandom(4)
+        data = os.urandom(length)
+        expected = bytes(b ^ key[(offset + i) % 4] for i, b in enumerate(data))
+        assert websockets.Masker(key).mask(offset, data) == expected
@@ -0,0 +1,28 @@
+import os
+import socket
+import sys
+
+import pytest
+
+from mitmproxy import platform
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Linux only")
+def test_splice():
+    assert platform.splice is not None
+    a, b = socket.socketpair()
+    r, w = os.pipe()
+    try:
+        with pytest.raises(BlockingIOError):
+            platform.splice(b.fileno(), w, 1024, platform.SPLICE_F_NONBLOCK)
+        a.sendall(b"foobar")
+        assert platform.splice(b.fileno(), w, 1024, platform.SPLICE_F_MOVE) == 6
+        assert platform.splice(r, a.fileno(), 6) == 6
+        assert b.recv(1024) == b"foobar"
+        with pytest.raises(OSError):
+            platform.splice(r, w, 1)
+    finally:
+        for s in (a, b):
+            s.close()
+        for fd in (r, w):
+            os.close(fd)
@@ -3,8 +3,10 @@
 
 import os
 import tempfile
+import threading
 import traceback
 import pytest
+from unittest import mock
 import h2
 
 from mitmproxy import options
@@ -12,6 +14,7 @@ from mitmproxy import options
 import mitmproxy.net
 from ...net import tservers as net_tservers
 from mitmproxy import exceptions
+from mitmproxy.proxy.protocol.http2 import Http2Layer, SafeH2Connection
 from mitmproxy.net.http import http1, http2
 from pathod.language import generators
 
@@ -813,6 +816,50 @@ class TestMaxConcurrentStreams(_Http2Test):
             assert b"Stream-ID " in flow.response.content
 
 
+class TestMaxConcurrentStreamsStreamWorkers(TestMaxConcurrentStreams):
+
+    def test_max_concurrent_streams(self):
+        self.options.http2_stream_workers = 2
+        try:
+            with mock.patch.object(
+                Http2Layer, "_run_pooled_stream",
+                autospec=True, side_effect=Http2Layer._run_pooled_stream
+            ) as run_pooled:
+                super().test_max_concurrent_streams()
+        finally:
+            self.options.http2_stream_workers = 0
+        assert run_pooled.called
+
+
+def test_stream_workers_overflow():
+    ctx = mock.MagicMock()
+    ctx.config.options.http2_stream_workers = 1
+    layer = Http2Layer(ctx, "regular")
+    blocked = threading.Event()
+    release = threading.Event()
+    long_lived = mock.Mock(run=lambda: (blocked.set(), release.wait(5)))
+    short = mock.Mock()
+    layer._start_stream(long_lived)
+    assert blocked.wait(5)
+    # The only pooled thread is busy, so the next stream gets its own thread.
+    layer._start_stream(short)
+    assert short.start.called
+    release.set()
+    layer.stream_executor.shutdown(wait=True)
+    assert layer.pooled_streams == 0
+
+
+class TestPushPromiseStreamWorkers(TestPushPromise):
+
+    def setup(self):
+        super().setup()
+        self.options.http2_stream_workers = 1
+
+    def teardown(self):
+        self.options.http2_stream_workers = 0
+        super().teardown()
+
+
 class TestConnectionTerminated(_Http2Test):
 
     @classmethod
@@ -966,3 +1013,31 @@ class TestResponseStreaming(_Http2Test):
             assert data
         else:
             assert data is None
+
+
+class TestSafeH2Connection:
+
+    def test_deferred_send(self):
+        conn = mock.Mock()
+        h2_conn = SafeH2Connection(conn, config=h2.config.H2Configuration(client_side=True))
+        h2_conn.initiate_connection()
+        h2_conn.data_to_send()
+
+        h2_conn.safe_update_settings({h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: 10})
+        assert conn.send.call_count == 1
+
+        conn.reset_mock()
+        with h2_conn.deferred_send():
+            h2_conn.safe_update_settings({h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: 20})
+            h2_conn.safe_update_settings({h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: 30})
+            assert not conn.send.called
+        assert conn.send.call_count == 1
+        frames = conn.send.call_args[0][0]
+        assert frames.count(b'\x00\x00\x06\x04\x00\x00\x00\x00\x00') == 2
+
+        conn.reset_mock()
+        with pytest.raises(ValueError):
+            with h2_conn.deferred_send():
+                raise ValueError()
+        assert not h2_conn.send_deferred
+        assert not conn.send.called
@@ -1 +1,116 @@
-# TODO: write tests
+import gc
+import os
+import socket
+import threading
+from unittest import mock
+
+import pytest
+
+from mitmproxy import options
+from mitmproxy import tcp
+from mitmproxy.proxy.protocol import rawtcp
+from mitmproxy.utils import human
+
+
+class TestRawTCPLayer:
+    def relay(self, data, ignore=False, **opts):
+        ctx = mock.Mock()
+        ctx.config.options = options.Options(**opts)
+        ctx.config.tcp_message_size_limit = human.parse_size(ctx.config.options.tcp_message_size_limit)
+        ctx.channel.should_exit = threading.Event()
+        client, client_peer = socket.socketpair()
+        server, server_peer = socket.socketpair()
+        ctx.client_conn.connection = client
+        ctx.server_conn.connection = server
+
+        layer = rawtcp.RawTCPLayer(ctx, ignore=ignore)
+        t = threading.Thread(target=layer)
+        t.start()
+        client_peer.sendall(data)
+        client_peer.shutdown(socket.SHUT_WR)
+        received = b""
+        while True:
+            d = server_peer.recv(65536)
+            if not d:
+                break
+            received += d
+        server_peer.shutdown(socket.SHUT_WR)
+        t.join(10)
+        assert not t.is_alive()
+        assert client_peer.recv(1) == b""
+        for s in (client, client_peer, server, server_peer):
+            s.close()
+        assert received == data
+        return ctx.channel
+
+    @pytest.mark.parametrize("splice", [True, False])
+    def test_ignore(self, splice):
+        with mock.patch.object(rawtcp.RawTCPLayer, "splice", splice and rawtcp.RawTCPLayer.splice):
+            with mock.patch.object(rawtcp.platform, "splice", wraps=rawtcp.platform.splice) as m:
+                channel = self.relay(b"x" * 200000, ignore=True)
+        assert not channel.ask.called
+        assert not channel.tell.called
+        assert m.called == (splice and rawtcp.RawTCPLayer.splice)
+
+    def test_messages(self):
+        channel = self.relay(b"x" * 20000)
+        events = [c[0][0] for c in channel.ask.call_args_list]
+        assert events[0] == "tcp_start"
+        assert len(events) > 1 and set(events[1:]) == {"tcp_message"}
+        f = channel.ask.call_args[0][1]
+        assert b"".join(m.content for m in f.messages) == b"x" * 20000
+        assert f.spilled_messages() == []
+
+    @pytest.mark.parametrize("opts", [
+        dict(tcp_message_limit=2),
+        dict(tcp_message_size_limit="5k"),
+    ])
+    def test_limit(self, opts):
+        data = bytes(range(256)) * 100
+        channel = self.relay(data, tcp_message_spill=True, **opts)
+        f = channel.ask.call_args[0][1]
+        if "tcp_message_limit" in opts:
+            assert len(f.messages) == 2
+        else:
+            assert sum(len(m.content) for m in f.messages) <= 5 * 1024
+        spilled = f.spilled_messages()
+        assert spilled
+        assert b"".join(m.content for m in spilled + f.messages) == data
+        assert all(m.from_client for m in spilled)
+        # The spill file is closed with the connection, but can still be read.
+        assert f.spill_file is None
+        assert [m.get_state() for m in f.spilled_messages()] == [m.get_state() for m in spilled]
+
+    def test_limit_discard(self):
+        channel = self.relay(b"x" * 20000, tcp_message_limit=1)
+        f = channel.ask.call_args[0][1]
+        assert len(f.messages) == 1
+        assert f.spill_path is None
+
+    def test_interval(self):
+        channel = self.relay(b"x" * 20000, tcp_message_interval=60000)
+        assert [c[0][0] for c in channel.ask.call_args_list] == ["tcp_start"]
+        assert [c[0][0] for c in channel.tell.call_args_list] == ["tcp_message", "tcp_end"]
+        f = channel.tell.call_args[0][1]
+        assert b"".join(m.content for m in f.messages) == b"x" * 20000
+        assert f.new_messages == len(f.messages) > 1
+
+
+def test_spilled_messages():
+    f = tcp.TCPFlow(None, None)
+    f.spill_messages([tcp.TCPMessage(True, b"foo", 1), tcp.TCPMessage(False, b"", 2)])
+    f.spill_messages([tcp.TCPMessage(False, b"bar", 3)])
+    for _ in range(2):
+        spilled = f.spilled_messages()
+        assert [m.get_state() for m in spilled] == [(True, b"foo", 1), (False, b"", 2), (False, b"bar", 3)]
+    f.close_spill_file()
+    assert f.spill_file is None
+    f.spill_messages([tcp.TCPMessage(True, b"baz", 4)])
+    f.close_spill_file()
+    assert [m.content for m in f.spilled_messages()] == [b"foo", b"", b"bar", b"baz"]
+
+    # The file is removed along with the flow.
+    path = f.spill_path
+    del f
+    gc.collect()
+    assert not os.path.exists(path)
@@ -2,6 +2,7 @@ import pytest
 import os
 import struct
 import tempfile
+import time
 import traceback
 
 from mitmproxy import options
@@ -197,6 +198,36 @@ class TestSimple(_WebSocketTest):
         assert self.master.state.flows[1].messages[4].content == b'\xde\xad\xbe\xef'
         assert self.master.state.flows[1].messages[4].type == websockets.OPCODE.BINARY
 
+    def test_message_limit(self):
+        class Evicted:
+            messages = []
+
+            def websocket_message(self, f):
+                self.messages.extend(f.evicted_messages)
+
+        self.proxy.set_addons(Evicted())
+        self.options.websocket_message_limit = 2
+        try:
+            self.setup_connection()
+            websockets.Frame.from_file(self.client.rfile)
+            for payload in (b'foo', b'bar'):
+                self.client.wfile.write(bytes(websockets.Frame(fin=1, mask=1, opcode=websockets.OPCODE.BINARY, payload=payload)))
+                self.client.wfile.flush()
+                websockets.Frame.from_file(self.client.rfile)
+            self.client.wfile.write(bytes(websockets.Frame(fin=1, mask=1, opcode=websockets.OPCODE.CLOSE)))
+            self.client.wfile.flush()
+
+            f = self.master.state.flows[1]
+            for _ in range(100):
+                if f.ended:
+                    break
+                time.sleep(0.05)
+            assert [m.content for m in f.messages] == [b'bar', b'bar']
+            evicted = Evicted.messages + f.evicted_messages
+            assert [m.content for m in evicted] == ['server-foobar', b'foo', b'foo']
+        finally:
+            self.options.websocket_message_limit = 0
+
     def test_change_payload(self):
         class Addon:
             def websocket_message(self, f):
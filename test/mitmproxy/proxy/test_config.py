@@ -1,8 +1,56 @@
+import re
+
 import pytest
 
 from mitmproxy import options
 from mitmproxy import exceptions
-from mitmproxy.proxy.config import ProxyConfig
+from mitmproxy.proxy.config import HostMatcher, ProxyConfig
+
+
+class TestHostMatcher:
+    patterns = [
+        r"^example\.com:443$",
+        r"^(.+\.)?google\.com:443$",
+        r"^(.*\.)?mozilla\.org:80$",
+        r"apple\.com",
+        r"^10\.0\.0\.\d+:\d+$",
+        r"(?i)^CASE\.example:1$",
+        r"^(a)\1\.example:1$",
+    ]
+    addresses = [
+        ("example.com", 443), ("EXAMPLE.com", 443), ("example.com", 80), ("www.example.com", 443),
+        ("google.com", 443), ("www.google.com", 443), ("a.b.google.com", 443), (".google.com", 443),
+        ("notgoogle.com", 443), ("google.com", 80),
+        ("mozilla.org", 80), (".mozilla.org", 80), ("x.mozilla.org", 80), ("mozilla.org", 443),
+        ("www.apple.com", 1), ("apple.community", 1), ("10.0.0.1", 22), ("10.0.1.1", 22),
+        ("case.example", 1), ("aa.example", 1), ("ab.example", 1),
+    ]
+
+    def test_equivalence(self):
+        m = HostMatcher(self.patterns)
+        assert m.exact and m.suffixes_plus and m.suffixes_star and m.uncombined
+        for address in self.addresses:
+            expected = any(
+                re.search(p, "%s:%s" % address, re.IGNORECASE) for p in self.patterns
+            )
+            assert m(address) == expected, address
+
+    def test_empty(self):
+        m = HostMatcher()
+        assert not m
+        assert not m(("example.com", 443))
+        assert not m(None)
+        assert HostMatcher([".*"])
+
+    def test_invalid(self):
+        with pytest.raises(re.error):
+            HostMatcher(["("])
+
+    def test_cache(self):
+        m = HostMatcher(["example"])
+        assert m(["example.com", 443])
+        assert m(("example.com", 443))
+        assert m._match.cache_info().hits == 1
 
 
 class TestProxyConfig:
@@ -17,3 +65,83 @@ class TestProxyConfig:
         opts.certs = [tdata.path("mitmproxy/data/dumpfile-011")]
         with pytest.raises(exceptions.OptionsError, match="Invalid certificate format"):
             ProxyConfig(opts)
+
+    def test_upstream_pool(self):
+        opts = options.Options()
+        pc = ProxyConfig(opts)
+        assert pc.upstream_pool is None
+        opts.upstream_pool_size = 10
+        assert pc.upstream_pool.max_idle == 10
+        upstream_pool = pc.upstream_pool
+        opts.ssl_insecure = True
+        assert pc.upstream_pool is not upstream_pool
+        opts.spoof_source_address = True
+        assert pc.upstream_pool is None
+        with pytest.raises(exceptions.OptionsError, match="upstream_pool_per_host"):
+            opts.update(spoof_source_address=False, upstream_pool_per_host=0)
+
+    def test_certstore(self):
+        opts = options.Options()
+        pc = ProxyConfig(opts)
+        certstore = pc.certstore
+        opts.ssl_insecure = True
+        assert pc.certstore is certstore
+        opts.cert_cache_size = 10
+        assert pc.certstore is not certstore
+        assert pc.certstore.cache_size == 10
+        with pytest.raises(exceptions.OptionsError, match="cert_cache_size"):
+            opts.cert_cache_size = 0
+
+    def test_tls_context_cache(self):
+        opts = options.Options()
+        pc = ProxyConfig(opts)
+        assert pc.tls_context_cache.max_size == 100
+        opts.ssl_client_context_cache_size = 0
+        assert pc.tls_context_cache is None
+
+    def test_resolver(self):
+        opts = options.Options()
+        pc = ProxyConfig(opts)
+        assert pc.resolver is None
+        opts.update(dns_cache_ttl=60, dns_cache_negative_ttl=1)
+        assert (pc.resolver.ttl, pc.resolver.negative_ttl) == (60, 1)
+        opts.dns_cache_ttl = 0
+        assert pc.resolver is None
+
+    def test_tcp_message_size_limit(self):
+        opts = options.Options()
+        pc = ProxyConfig(opts)
+        assert pc.tcp_message_size_limit is None
+        opts.tcp_message_size_limit = "2k"
+        assert pc.tcp_message_size_limit == 2048
+        with pytest.raises(exceptions.OptionsError):
+            opts.tcp_message_size_limit = "foo"
+        assert pc.tcp_message_size_limit == 2048
+
+    def test_websocket_message_size_limit(self):
+        opts = options.Options()
+        pc = ProxyConfig(opts)
+        assert pc.websocket_message_size_limit is None
+        opts.websocket_message_size_limit = "1m"
+        assert pc.websocket_message_size_limit == 1024 ** 2
+        with pytest.raises(exceptions.OptionsError):
+            opts.websocket_message_size_limit = "foo"
+
+    def test_upstream_cert_cache(self):
+        opts = options.Options()
+        pc = ProxyConfig(opts)
+        assert pc.upstream_cert_cache is None
+        opts.update(upstream_cert_cache_size=10, upstream_cert_cache_ttl=60)
+        assert pc.upstream_cert_cache.max_size == 10
+        assert pc.upstream_cert_cache.ttl == 60
+
+    def test_tls_session_cache(self):
+        opts = options.Options()
+        pc = ProxyConfig(opts)
+        assert pc.tls_session_cache is None
+        opts.ssl_session_cache_size = 1000
+        assert pc.tls_session_cache.max_size == 1000
+        opts.ssl_session_cache_ttl = 10
+        assert pc.tls_session_cache.ttl == 10
+        opts.ssl_session_cache_size = 0
+        assert pc.tls_session_cache is None
@@ -0,0 +1,103 @@
+import socket
+from unittest import mock
+
+from mitmproxy.proxy import pool
+
+
+class FakeConnection:
+    def __init__(self, address=("example.com", 80), tls=False, sni=None):
+        self.address = address
+        self.tls_established = tls
+        self.sni = sni
+        self.connection, self.peer = socket.socketpair()
+        self.closed = False
+
+    def finish(self):
+        pass
+
+    def close(self):
+        self.closed = True
+        self.connection.close()
+        self.peer.close()
+
+
+def key(c):
+    return pool.ConnectionPool.key(c.address, c.tls_established, c.sni)
+
+
+class TestConnectionPool:
+    def test_acquire_release(self):
+        p = pool.ConnectionPool(10, 10, 60)
+        c = FakeConnection()
+        assert p.acquire(key(c)) is None
+        assert p.release(c)
+        assert len(p) == 1
+        assert p.acquire(pool.ConnectionPool.key(c.address, True, "example.com")) is None
+        assert p.acquire(key(c)) is c
+        assert len(p) == 0
+        assert p.hits == 1
+        assert p.misses == 2
+
+    def test_key(self):
+        assert pool.ConnectionPool.key(["a", 80], False, "a") == (("a", 80), False, None)
+        assert pool.ConnectionPool.key(("a", 443), True, "b") == (("a", 443), True, "b")
+
+    def test_lifo(self):
+        p = pool.ConnectionPool(10, 10, 60)
+        a, b = FakeConnection(), FakeConnection()
+        p.release(a)
+        p.release(b)
+        assert p.acquire(key(a)) is b
+        assert p.acquire(key(a)) is a
+
+    def test_max_per_host(self):
+        p = pool.ConnectionPool(10, 1, 60)
+        a, b = FakeConnection(), FakeConnection()
+        c = FakeConnection(("example.org", 80))
+        assert p.release(a)
+        assert not p.release(b)
+        assert p.release(c)
+        assert len(p) == 2
+
+    def test_max_idle(self):
+        p = pool.ConnectionPool(2, 10, 60)
+        conns = [FakeConnection(("example.com", i)) for i in range(3)]
+        for c in conns:
+            assert p.release(c)
+        assert len(p) == 2
+        assert conns[0].closed
+        assert p.acquire(key(conns[0])) is None
+        assert p.acquire(key(conns[2])) is conns[2]
+
+    def test_timeout(self):
+        p = pool.ConnectionPool(10, 10, 60)
+        a, b = FakeConnection(), FakeConnection(("example.org", 80))
+        with mock.patch("time.time", return_value=0):
+            p.release(a)
+            p.release(b)
+        with mock.patch("time.time", return_value=30):
+            p.expire()
+            assert len(p) == 2
+        with mock.patch("time.time", return_value=61):
+            assert p.acquire(key(a)) is None
+            assert a.closed
+            p.expire()
+            assert b.closed
+        assert len(p) == 0
+
+    def test_stale(self):
+        p = pool.ConnectionPool(10, 10, 60)
+        a, b = FakeConnection(), FakeConnection()
+        p.release(a)
+        p.release(b)
+        b.peer.close()
+        assert p.acquire(key(a)) is a
+        assert b.closed
+
+    def test_clear(self):
+        p = pool.ConnectionPool(10, 10, 60)
+        c = FakeConnection()
+        p.release(c)
+        p.clear()
+        assert c.closed
+        assert len(p) == 0
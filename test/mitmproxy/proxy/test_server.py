@@ -16,6 +16,7 @@ from mitmproxy.net import socks
 from mitmproxy.net import tcp
 from mitmproxy.net.http import http1
 from mitmproxy.proxy.config import HostMatcher
+from mitmproxy.proxy.protocol import RawTCPLayer
 from mitmproxy.utils import data
 from pathod import pathoc
 from pathod import pathod
@@ -111,6 +112,15 @@ class TcpMixin:
 
         self._ignore_off()
 
+    @pytest.mark.parametrize("splice", [True, False])
+    def test_ignore_large(self, splice):
+        self._ignore_on()
+        with mock.patch.object(RawTCPLayer, "splice", splice and RawTCPLayer.splice):
+            r = self.pathod("200:b@1m")
+        self._ignore_off()
+        assert r.status_code == 200
+        assert len(r.content) == 1024 ** 2
+
     def _tcpproxy_on(self):
         assert not hasattr(self, "_tcpproxy_backup")
         self._tcpproxy_backup = self.options.tcp_hosts
@@ -274,6 +284,48 @@ class TestHTTPS(tservers.HTTPProxyTest, CommonMixin, TcpMixin):
             assert p.request("get:/:i0,'invalid\r\n\r\n'").status_code == 400
 
 
+class ParkMixin:
+
+    @classmethod
+    def get_options(cls):
+        opts = super().get_options()
+        opts.server_asyncio = True
+        return opts
+
+    def wait_parked(self):
+        server = self.master.server
+        for _ in range(200):
+            if server.handler_counter.count == 0 and len(server._parked) == 1:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def test_keepalive_parked(self):
+        if self.ssl:
+            response = "/p/200:b@1"
+        else:
+            response = "%s/p/200:b@1" % self.server.urlbase
+        p = self.pathoc()
+        with p.connect():
+            assert p.request("get:'%s'" % response).status_code == 200
+            # The connection is idle, so it does not hold a handler thread.
+            assert self.wait_parked()
+            assert p.request("get:'%s'" % response).status_code == 200
+            assert self.wait_parked()
+        flows = self.master.state.flows
+        assert flows[-2].client_conn is flows[-1].client_conn
+        # The server connection is kept open while the client is parked.
+        assert flows[-2].server_conn is flows[-1].server_conn
+
+
+class TestHTTPAsync(ParkMixin, tservers.HTTPProxyTest, CommonMixin):
+    pass
+
+
+class TestHTTPSAsync(ParkMixin, tservers.HTTPProxyTest, CommonMixin):
+    ssl = True
+
+
 class TestHTTPSCertfile(tservers.HTTPProxyTest, CommonMixin):
     ssl = True
     certfile = True
@@ -410,6 +462,29 @@ class TestReverse(tservers.ReverseProxyTest, CommonMixin, TcpMixin):
         req = self.master.state.flows[0].request
         assert req.host_header == "127.0.0.1"
 
+    def test_upstream_pool(self):
+        self.options.upstream_pool_size = 4
+        try:
+            upstream_pool = self.master.server.config.upstream_pool
+            for _ in range(2):
+                p = self.pathoc()
+                with p.connect():
+                    assert p.request("get:/p/200:b@1").status_code == 200
+                for _ in range(100):
+                    if len(upstream_pool):
+                        break
+                    time.sleep(0.01)
+            flows = self.master.state.flows
+            # Each flow has its own server connection on the same socket.
+            assert flows[0].server_conn.id != flows[1].server_conn.id
+            assert flows[0].server_conn.timestamp_end
+            assert flows[1].metadata["reused_server_conn"] == flows[0].server_conn.id
+            assert "reused_server_conn" not in flows[0].metadata
+            assert flows[1].server_conn.timestamp_start > flows[0].server_conn.timestamp_end
+            assert upstream_pool.hits == 1
+        finally:
+            self.options.upstream_pool_size = 0
+
     @pytest.mark.asyncio
     async def test_selfconnection(self):
         self.options.mode = "reverse:http://127.0.0.1:0"
@@ -1027,6 +1102,28 @@ class TestProxyChainingSSLReconnect(tservers.HTTPUpstreamProxyTest):
                 p.request("get:'/p/418:b\"content3\"'")
 
 
+class TestHTTPSUpstreamCertCache(tservers.HTTPProxyTest):
+    ssl = True
+    ssloptions = pathod.SSLOptions(cn=b"example.mitmproxy.org")
+
+    @classmethod
+    def get_options(cls):
+        opts = super().get_options()
+        opts.upstream_cert_cache_size = 10
+        return opts
+
+    def test_cache(self):
+        # Without SNI, the upstream certificate is needed for the client handshake.
+        for _ in range(2):
+            p = self.pathoc()
+            with p.connect():
+                assert p.server_certs[0].cn == b"example.mitmproxy.org"
+                assert p.request("get:'/p/200'").status_code == 200
+        cache = self.master.server.config.upstream_cert_cache
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert self.master.state.flows[-1].server_conn.cert.cn == b"example.mitmproxy.org"
+
+
 class AddUpstreamCertsToClientChainMixin:
 
     ssl = True
@@ -0,0 +1,227 @@
+import asyncio
+import http.server
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from mitmproxy import addonmanager
+from mitmproxy import io
+from mitmproxy import log
+from mitmproxy.proxy import config
+from mitmproxy.proxy import workers
+from mitmproxy.test import taddons
+from mitmproxy.test import tflow
+from mitmproxy.test import tutils
+
+
+@addonmanager.observer
+class Recorder:
+    def __init__(self):
+        self.seen = []
+
+    def request(self, f):
+        self.seen.append(("request", f))
+
+    def response(self, f):
+        self.seen.append(("response", f))
+
+    def websocket_start(self, f):
+        self.seen.append(("websocket_start", f))
+
+    def log(self, entry):
+        if entry.msg == "from worker":
+            self.seen.append(("log", entry))
+
+
+def test_relay():
+    a, b = socket.socketpair()
+    r = workers.Relay(a)
+    f = tflow.tflow(resp=True)
+    r("response", f)
+    r("clientconnect", f.client_conn)
+    r("log", log.LogEntry("foo", "info"))
+    wf = tflow.twebsocketflow()
+    wf.evicted_messages = [wf.messages.pop(0)]
+    r("websocket_message", wf)
+    r.wfile.close()
+    a.close()
+    rfile = b.makefile("rb")
+    d = workers.tnetstring.load(rfile)
+    assert d["event"] == "response"
+    assert d["flow"]["id"] == f.id
+    assert "evicted_messages" not in d
+    assert workers.tnetstring.load(rfile) == dict(event="log", log=["foo", "info"])
+    d = workers.tnetstring.load(rfile)
+    assert len(d["flow"]["messages"]) == len(wf.messages)
+    assert d["evicted_messages"] == [list(wf.evicted_messages[0].get_state())]
+    with pytest.raises(ValueError):
+        workers.tnetstring.load(rfile)
+
+
+@pytest.mark.asyncio
+async def test_worker_group():
+    with taddons.context() as tctx:
+        tctx.options.update(listen_port=0, server_processes=2)
+        group = workers.WorkerGroup(config.ProxyConfig(tctx.options), 2)
+        assert group.address[1]
+        group.set_channel(tctx.master.channel)
+        rec = Recorder()
+        tctx.master.addons.add(rec)
+
+        a, b = socket.socketpair()
+        group._socks.append(b)
+        group.serve_async()
+        relay = workers.Relay(a)
+
+        f = tflow.tflow()
+        relay("request", f)
+        f.response = tutils.tresp()
+        relay("response", f)
+        relay("log", log.LogEntry("from worker", "info"))
+        relay.wfile.close()
+        a.close()
+        for t in group._readers:
+            t.join()
+        for _ in range(100):
+            if len(rec.seen) == 3:
+                break
+            await asyncio.sleep(0.01)
+        assert [e for e, _ in rec.seen] == ["request", "response", "log"]
+        # Both events refer to the same flow object in the main process.
+        assert rec.seen[0][1] is rec.seen[1][1]
+        assert rec.seen[1][1].response
+        assert not group.flows
+
+        group.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_worker_group_websocket():
+    with taddons.context() as tctx:
+        tctx.options.update(listen_port=0, server_processes=2)
+        group = workers.WorkerGroup(config.ProxyConfig(tctx.options), 2)
+        group.set_channel(tctx.master.channel)
+        rec = Recorder()
+        tctx.master.addons.add(rec)
+
+        wf = tflow.twebsocketflow()
+        hf = wf.handshake_flow
+        await group.observe(dict(event="response", flow=hf.get_state()))
+        assert hf.id in group.flows
+        evicted = wf.messages.pop(0)
+        await group.observe(dict(
+            event="websocket_start",
+            flow=wf.get_state(),
+            evicted_messages=[evicted.get_state()],
+        ))
+        assert rec.seen[-1][1].handshake_flow is group.flows[hf.id]
+        assert [m.get_state() for m in rec.seen[-1][1].evicted_messages] == [evicted.get_state()]
+        await group.observe(dict(event="websocket_end", flow=wf.get_state()))
+        assert not group.flows
+        group.shutdown()
+
+
+def test_shutdown_waits():
+    ev = threading.Event()
+    with taddons.context() as tctx:
+        tctx.options.update(listen_port=0, server_processes=2)
+        group = workers.WorkerGroup(config.ProxyConfig(tctx.options), 2)
+        t = threading.Thread(target=lambda: (group.serve_forever(), ev.set()))
+        t.start()
+        group.shutdown()
+        t.join()
+        assert ev.is_set()
+
+
+class _Upstream(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(proxy_port, upstream_port):
+    with socket.create_connection(("127.0.0.1", proxy_port), timeout=10) as s:
+        s.sendall(
+            b"GET http://127.0.0.1:%d/ HTTP/1.1\r\n"
+            b"Host: 127.0.0.1:%d\r\n"
+            b"Connection: close\r\n\r\n" % (upstream_port, upstream_port)
+        )
+        data = b""
+        while True:
+            d = s.recv(4096)
+            if not d:
+                return data
+            data += d
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork()")
+def test_mitmdump_workers(tmpdir):
+    upstream = http.server.HTTPServer(("127.0.0.1", 0), _Upstream)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    upstream_port = upstream.server_address[1]
+
+    script = tmpdir.join("worker.py")
+    script.write(
+        "import os\n"
+        "def response(flow):\n"
+        "    flow.response.headers['x-worker'] = str(os.getpid())\n"
+    )
+    outfile = str(tmpdir.join("flows"))
+    port = _free_port()
+    p = subprocess.Popen(
+        [
+            sys.executable, "-c", "from mitmproxy.tools.main import mitmdump; mitmdump()",
+            "-q", "--listen-host", "127.0.0.1", "--listen-port", str(port),
+            "--set", "server_processes=2", "--set", "confdir=%s" % tmpdir,
+            "-s", str(script), "-w", outfile,
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        # Wait until the workers listen and have loaded the script.
+        pids = set()
+        deadline = time.time() + 20
+        while time.time() < deadline:
+            try:
+                resp = _get(port, upstream_port)
+            except OSError:
+                time.sleep(0.1)
+                continue
+            if b"x-worker" in resp:
+                break
+            time.sleep(0.1)
+        for _ in range(20):
+            resp = _get(port, upstream_port)
+            assert resp.split(b"\r\n")[0].endswith(b"200 OK")
+            pids.add(resp.split(b"x-worker: ")[1].split(b"\r\n")[0])
+        # The script runs in the workers, not in the main process.
+        assert len(pids) == 2
+        assert str(p.pid).encode() not in pids
+    finally:
+        p.send_signal(signal.SIGTERM)
+        p.wait(timeout=20)
+        upstream.shutdown()
+        upstream.server_close()
+
+    with open(outfile, "rb") as f:
+        flows = list(io.FlowReader(f).stream())
+    # The main process received and saved the flows of all workers.
+    worker_flows = [f for f in flows if "x-worker" in f.response.headers]
+    assert len(worker_flows) >= 20
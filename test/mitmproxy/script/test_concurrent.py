@@ -1,13 +1,30 @@
+import importlib
+import threading
+import time
+
 import pytest
 
 from mitmproxy.test import tflow
 from mitmproxy.test import taddons
 
 from mitmproxy import controller
-import time
+from mitmproxy import exceptions
+from mitmproxy.addons import script
 
 from .. import tservers
 
+# mitmproxy.script.concurrent is shadowed by the decorator of the same name.
+concurrent = importlib.import_module("mitmproxy.script.concurrent")
+
+
+def wait_for(cond, timeout=5):
+    start = time.time()
+    while time.time() - start < timeout:
+        if cond():
+            return
+        time.sleep(0.01)
+    raise AssertionError("Condition not met")
+
 
 class Thing:
     def __init__(self):
@@ -57,3 +74,122 @@ class TestConcurrent(tservers.MasterTest):
                     if f1.reply.state == f2.reply.state == "committed":
                         return
                 raise ValueError("Script never acked")
+
+
+class TestExecutor:
+    def test_submit(self):
+        e = concurrent.Executor(max_workers=2)
+        ev = threading.Event()
+        for _ in range(4):
+            assert e.submit(ev.wait)
+        wait_for(lambda: e.running == 2)
+        assert e.stats()["queued"] == 2
+        ev.set()
+        wait_for(lambda: e.completed == 4)
+        assert e.stats() == dict(queued=0, backlog=0, running=0, completed=4, mean_wait=e.mean_wait)
+        assert e.mean_wait >= 0
+
+    def test_queue_full(self):
+        e = concurrent.Executor(max_workers=1, queue_size=1)
+        ev = threading.Event()
+        assert e.submit(ev.wait)
+        wait_for(lambda: e.running == 1)
+        assert e.submit(ev.wait)
+        caller = threading.current_thread()
+        ran_in = []
+        assert not e.submit(lambda: ran_in.append(threading.current_thread()))
+        # The backlog is not run by the caller, but once there is room.
+        assert e.stats()["backlog"] == 1
+        assert not ran_in
+        ev.set()
+        wait_for(lambda: e.completed == 3)
+        assert ran_in and ran_in[0] is not caller
+        assert e.stats()["backlog"] == 0
+
+        e.configure(2, 0)
+        assert e.max_workers == 2
+        assert e.submit(lambda: None)
+        wait_for(lambda: e.completed == 4)
+
+    def test_configure_backlog(self):
+        e = concurrent.Executor(max_workers=1, queue_size=1)
+        ev = threading.Event()
+        e.submit(ev.wait)
+        wait_for(lambda: e.running == 1)
+        e.submit(lambda: None)
+        assert not e.submit(lambda: None)
+        e.configure(1, 2)
+        assert not e.backlog
+        ev.set()
+        wait_for(lambda: e.completed == 3)
+
+    def test_configure_race(self):
+        e = concurrent.Executor(max_workers=1)
+        done = threading.Event()
+
+        def reconfigure():
+            n = 1
+            while not done.is_set():
+                n = n % 4 + 1
+                e.configure(n, 0)
+
+        t = threading.Thread(target=reconfigure)
+        t.start()
+        try:
+            for _ in range(500):
+                e.submit(lambda: None)
+        finally:
+            done.set()
+            t.join()
+        wait_for(lambda: e.completed == 500)
+
+    def test_limit(self):
+        e = concurrent.Executor(max_workers=4)
+        limit = concurrent._Limit(1)
+        ev = threading.Event()
+        running = []
+
+        def job():
+            running.append(limit.active)
+            ev.wait()
+
+        for _ in range(3):
+            assert e.submit(job, limit)
+        wait_for(lambda: e.running == 1)
+        assert len(limit.pending) == 2
+        ev.set()
+        wait_for(lambda: e.completed == 3)
+        assert running == [1, 1, 1]
+        assert limit.active == 0
+
+    def test_error(self, capsys):
+        e = concurrent.Executor(max_workers=1)
+
+        def err():
+            raise ValueError("concurrent error")
+
+        e.submit(err)
+        wait_for(lambda: e.completed == 1)
+        assert "concurrent error" in capsys.readouterr().err
+
+    def test_decorator_limit(self):
+        @concurrent.concurrent(limit=2)
+        def request(f):
+            pass
+
+        f = tflow.tflow()
+        f.reply = controller.Reply(f)
+        request(f)
+        wait_for(lambda: f.reply.state == "committed")
+
+
+def test_options():
+    with taddons.context() as tctx:
+        sl = script.ScriptLoader()
+        tctx.master.addons.add(sl)
+        tctx.configure(sl, concurrent_workers=4, concurrent_queue_size=10)
+        assert concurrent.executor.max_workers == 4
+        assert concurrent.executor.queue_size == 10
+        with pytest.raises(exceptions.OptionsError):
+            tctx.configure(sl, concurrent_workers=0)
+        tctx.configure(sl, concurrent_workers=concurrent.DEFAULT_WORKERS, concurrent_queue_size=0)
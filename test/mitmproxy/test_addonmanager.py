@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from unittest import mock
 
@@ -7,6 +8,7 @@ from mitmproxy import addonmanager
 from mitmproxy import exceptions
 from mitmproxy import options
 from mitmproxy import command
+from mitmproxy import controller
 from mitmproxy import master
 from mitmproxy.test import taddons
 from mitmproxy.test import tflow
@@ -196,3 +198,179 @@ class D:
 
     def log(self, x):
         self.w = x
+
+
+def test_dispatch_table():
+    o = options.Options()
+    m = master.Master(o)
+    a = addonmanager.AddonManager(m)
+    one = TAddon("one")
+    a.add(one)
+    a.trigger("running")
+    assert "running" in a._dispatch
+    assert one.running_called
+
+    two = TAddon("two")
+    a.add(two)
+    assert not a._dispatch
+    a.trigger("running")
+    assert two.running_called
+
+    # Changes to sub-addons need an explicit invalidation.
+    three = TAddon("three")
+    two.addons = [three]
+    a.trigger("running")
+    assert not three.running_called
+    a.invalidate()
+    a.trigger("running")
+    assert three.running_called
+
+    two.addons = []
+    a.remove(two)
+    assert not a._dispatch
+    assert a._dispatch_table("running") == [[one.running]]
+
+
+class AsyncAddon:
+    def __init__(self):
+        self.event = asyncio.Event()
+        self.done = False
+
+    async def request(self, f):
+        await self.event.wait()
+        self.done = True
+
+    async def running(self):
+        self.done = True
+
+
+class AsyncError:
+    async def request(self, f):
+        raise ValueError("async hook error")
+
+
+@pytest.mark.asyncio
+async def test_async_hooks():
+    with taddons.context(loadcore=False) as tctx:
+        a = AsyncAddon()
+        tctx.master.addons.add(a)
+
+        f = tflow.tflow()
+        f.reply = controller.Reply(f)
+        t = asyncio.ensure_future(tctx.master.addons.handle_lifecycle("request", f))
+        await asyncio.sleep(0.1)
+        assert not a.done
+        assert f.reply.state == "start"
+
+        a.event.set()
+        await t
+        assert a.done
+        assert f.reply.state == "committed"
+
+        # Coroutines returned to the synchronous trigger run in the background.
+        a.done = False
+        tctx.master.addons.trigger("running")
+        assert not a.done
+        await asyncio.sleep(0)
+        assert a.done
+
+        tctx.master.addons.add(AsyncError())
+        f = tflow.tflow()
+        await tctx.master.addons.handle_lifecycle("request", f)
+        assert await tctx.master.await_log("async hook error")
+
+
+@addonmanager.observer
+class ObserverAddon:
+    def __init__(self):
+        self.seen = []
+
+    def request(self, f):
+        self.seen.append(f.reply.state)
+
+
+class PartialObserver:
+    def __init__(self):
+        self.seen = []
+
+    def request(self, f):
+        self.seen.append(("request", f.reply.state))
+
+    @addonmanager.observer
+    def response(self, f):
+        self.seen.append(("response", f.reply.state))
+
+
+@pytest.mark.asyncio
+async def test_observers():
+    with taddons.context(loadcore=False) as tctx:
+        a = tctx.master.addons
+        o, p = ObserverAddon(), PartialObserver()
+        a.add(o, p)
+        assert addonmanager.is_observer(o.request)
+        assert not addonmanager.is_observer(p.request)
+        assert addonmanager.is_observer(p.response)
+
+        f = tflow.tflow()
+        f.reply = controller.Reply(f)
+        await a.handle_lifecycle("request", f)
+        # The regular handler runs first, even though it comes later in the chain.
+        assert p.seen == [("request", "start")]
+        # The proxy goes on to change the flow after a request, so observers
+        # run before the reply.
+        assert o.seen == ["start"]
+        f.reply.q.get_nowait()
+
+        f.reply = controller.Reply(f)
+        await a.handle_lifecycle("response", f)
+        assert p.seen[-1] == ("response", "committed")
+        f.reply.q.get_nowait()
+
+        # A WebSocket handshake is linked to its WebSocket flow later on.
+        f.reply = controller.Reply(f)
+        f.metadata["websocket"] = True
+        await a.handle_lifecycle("response", f)
+        assert p.seen[-1] == ("response", "start")
+        f.reply.q.get_nowait()
+
+        # Observers are still regular subscribers for the synchronous trigger.
+        a.trigger("request", f)
+        assert len(o.seen) == 2
+
+        await a.handle_lifecycle("nonexistent", f)
+        assert await tctx.master.await_log("unknown event")
+
+
+@pytest.mark.asyncio
+async def test_relay():
+    with taddons.context(loadcore=False) as tctx:
+        a = tctx.master.addons
+        o, p = ObserverAddon(), PartialObserver()
+        a.add(o, p)
+        relayed = []
+        a.relay = lambda name, message: relayed.append((name, message.reply.state))
+        assert a.has_subscribers("tcp_message")
+
+        f = tflow.tflow()
+        f.reply = controller.Reply(f)
+        await a.handle_lifecycle("request", f)
+        assert p.seen == [("request", "start")]
+        assert o.seen == []
+        assert relayed == [("request", "start")]
+        f.reply.q.get_nowait()
+
+        # Flows are relayed before the reply, even after final events.
+        f.reply = controller.Reply(f)
+        await a.handle_lifecycle("response", f)
+        assert relayed[-1] == ("response", "start")
+        f.reply.q.get_nowait()
+
+        a.relay = None
+        await a.observe("request", f)
+        await a.observe("response", f)
+        assert o.seen == ["committed"]
+        assert p.seen[-1] == ("response", "committed")
+        assert len(p.seen) == 2
+
+        await a.observe("nonexistent", f)
+        assert await tctx.master.await_log("unknown event")
@@ -1,4 +1,10 @@
 import os
+import threading
+import pytest
+from unittest import mock
+
+import OpenSSL
+
 from mitmproxy import certs
 from ..conftest import skip_windows
 
@@ -43,6 +49,25 @@ class TestCertStore:
 
         assert ca.default_ca.get_serial_number() == ca2.default_ca.get_serial_number()
 
+    @pytest.mark.parametrize("ca_type", certs.KEY_TYPES)
+    @pytest.mark.parametrize("key_type", certs.KEY_TYPES)
+    def test_key_type(self, tmpdir, ca_type, key_type):
+        certs.CertStore.create_store(str(tmpdir), "test", key_type=ca_type)
+        ca = certs.CertStore.from_store(str(tmpdir), "test", key_type=key_type)
+        assert certs.get_key_type(ca.default_privatekey) == ca_type
+        cert, key, chain_file = ca.get_cert(b"foo.com", [b"foo.com"])
+        assert certs.get_key_type(key) == key_type
+        assert OpenSSL.crypto.dump_publickey(OpenSSL.crypto.FILETYPE_PEM, cert.x509.get_pubkey()) == \
+            OpenSSL.crypto.dump_publickey(OpenSSL.crypto.FILETYPE_PEM, key)
+        store = OpenSSL.crypto.X509Store()
+        store.add_cert(ca.default_ca)
+        OpenSSL.crypto.X509StoreContext(store, cert.x509).verify_certificate()
+
+        # The separate leaf key is stored and reused.
+        ca2 = certs.CertStore.from_store(str(tmpdir), "test", key_type=key_type)
+        assert ca2.leaf_fingerprint == ca.leaf_fingerprint
+        assert (ca2.leaf_privatekey is ca2.default_privatekey) == (ca_type == key_type)
+
     def test_create_no_common_name(self, tmpdir):
         ca = certs.CertStore.from_store(str(tmpdir), "test")
         assert ca.get_cert(None, [])[0].cn is None
@@ -71,28 +96,107 @@ class TestCertStore:
         assert b"*.baz.com" in cert.altnames
 
     def test_expire(self, tmpdir):
-        ca = certs.CertStore.from_store(str(tmpdir), "test")
-        ca.STORE_CAP = 3
+        ca = certs.CertStore.from_store(str(tmpdir), "test", cache_size=3)
         ca.get_cert(b"one.com", [])
         ca.get_cert(b"two.com", [])
         ca.get_cert(b"three.com", [])
 
-        assert (b"one.com", ()) in ca.certs
-        assert (b"two.com", ()) in ca.certs
-        assert (b"three.com", ()) in ca.certs
+        assert (b"one.com", (), None) in ca.generated
+        assert (b"two.com", (), None) in ca.generated
+        assert (b"three.com", (), None) in ca.generated
 
         ca.get_cert(b"one.com", [])
 
-        assert (b"one.com", ()) in ca.certs
-        assert (b"two.com", ()) in ca.certs
-        assert (b"three.com", ()) in ca.certs
+        assert (b"one.com", (), None) in ca.generated
+        assert (b"two.com", (), None) in ca.generated
+        assert (b"three.com", (), None) in ca.generated
 
         ca.get_cert(b"four.com", [])
 
-        assert (b"one.com", ()) not in ca.certs
-        assert (b"two.com", ()) in ca.certs
-        assert (b"three.com", ()) in ca.certs
-        assert (b"four.com", ()) in ca.certs
+        # one.com has been used recently, so two.com is evicted.
+        assert (b"one.com", (), None) in ca.generated
+        assert (b"two.com", (), None) not in ca.generated
+        assert (b"three.com", (), None) in ca.generated
+        assert (b"four.com", (), None) in ca.generated
+        assert (ca.hits, ca.misses, ca.evictions) == (1, 4, 1)
+
+    def test_organization(self, tmpdir):
+        ca = certs.CertStore.from_store(str(tmpdir), "test")
+        c1 = ca.get_cert(b"foo.com", [], b"Foo")[0]
+        c2 = ca.get_cert(b"foo.com", [], b"Bar")[0]
+        assert c1.organization == b"Foo"
+        assert c2.organization == b"Bar"
+        assert ca.get_cert(b"foo.com", [], b"Foo")[0] is c1
+
+    def test_persist(self, tmpdir):
+        ca = certs.CertStore.from_store(str(tmpdir), "test", persist=True)
+        c1 = ca.get_cert(b"foo.com", [b"foo.com"], b"Foo")[0]
+        assert tmpdir.join("test-certs").check(dir=1)
+
+        ca2 = certs.CertStore.from_store(str(tmpdir), "test", persist=True)
+        assert ca2.get_cert(b"foo.com", [b"foo.com"], b"Foo")[0] == c1
+        assert ca2.loaded == 1
+        # Different identity, different certificate.
+        assert ca2.get_cert(b"foo.com", [b"foo.com"])[0] != c1
+        assert ca2.loaded == 1
+
+        # Certificates signed by another CA are not used.
+        ca3 = certs.CertStore.from_store(str(tmpdir.join("other")), "test", persist=True)
+        ca3.cache_dir = ca.cache_dir
+        assert ca3.get_cert(b"foo.com", [b"foo.com"], b"Foo")[0] != c1
+        assert ca3.loaded == 0
+
+    def test_persist_expired(self, tmpdir):
+        ca = certs.CertStore.from_store(str(tmpdir), "test", persist=True)
+        c1 = ca.get_cert(b"foo.com", [])[0]
+        ca2 = certs.CertStore.from_store(str(tmpdir), "test", persist=True)
+        ca2.MIN_REMAINING_VALIDITY = c1.notafter - c1.notbefore
+        assert ca2.get_cert(b"foo.com", [])[0] != c1
+        assert ca2.loaded == 0
+
+        with open(ca._cache_path((b"foo.com", (), None)), "wb") as f:
+            f.write(b"invalid")
+        ca3 = certs.CertStore.from_store(str(tmpdir), "test", persist=True)
+        assert ca3.get_cert(b"foo.com", [])
+        assert ca3.loaded == 0
+
+    def test_single_flight(self, tmpdir):
+        ca = certs.CertStore.from_store(str(tmpdir), "test")
+        started = threading.Event()
+        release = threading.Event()
+        dummy_cert = certs.dummy_cert
+
+        def slow_dummy_cert(*args):
+            started.set()
+            release.wait(5)
+            return dummy_cert(*args)
+
+        with mock.patch("mitmproxy.certs.dummy_cert", side_effect=slow_dummy_cert) as m:
+            f = ca.prewarm(b"foo.com", [b"a.com", b"b.com"])
+            assert started.wait(5)
+            results = []
+            threads = [
+                threading.Thread(target=lambda: results.append(ca.get_cert(b"foo.com", [b"b.com", b"a.com"])))
+                for _ in range(3)
+            ]
+            for t in threads:
+                t.start()
+            release.set()
+            for t in threads:
+                t.join()
+            assert m.call_count == 1
+        assert f.result().cert == results[0][0]
+        assert all(r[0] == results[0][0] for r in results)
+        assert (ca.misses, ca.coalesced + ca.hits) == (1, 3)
+        assert not ca._pending
+
+    def test_generate_error(self, tmpdir):
+        ca = certs.CertStore.from_store(str(tmpdir), "test")
+        with mock.patch("mitmproxy.certs.dummy_cert", side_effect=ValueError):
+            with pytest.raises(ValueError):
+                ca.get_cert(b"foo.com", [])
+        assert not ca._pending
+        assert ca.get_cert(b"foo.com", [])
 
     def test_overrides(self, tmpdir):
         ca1 = certs.CertStore.from_store(str(tmpdir.join("ca1")), "test")
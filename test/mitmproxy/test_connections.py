@@ -147,6 +147,35 @@ class TestServerConnection:
         c.close()
         d.shutdown()
 
+    def test_detach(self):
+        d = test.Daemon()
+        c = connections.ServerConnection((d.IFACE, d.port))
+        c.connect()
+        sock = c.connection
+        idle = c.detach()
+        assert not c.connected()
+        assert c.timestamp_end
+        assert idle.connected()
+        assert idle.connection is sock
+        assert idle.reused_from == c.id
+
+        c2 = connections.ServerConnection((d.IFACE, d.port))
+        c2.take_over(idle)
+        assert not idle.connected()
+        assert c2.reused_from == c.id
+        assert c2.ip_address == c.ip_address
+        assert c2.timestamp_start >= c.timestamp_end
+
+        f = tflow.tflow()
+        f.request.path = "/p/200:da"
+        c2.wfile.write(http1.assemble_request(f.request))
+        c2.wfile.flush()
+        assert http1.read_response(c2.rfile, f.request, 1000)
+
+        c2.finish()
+        c2.close()
+        d.shutdown()
+
     def test_terminate_error(self):
         d = test.Daemon()
         c = connections.ServerConnection((d.IFACE, d.port))
@@ -237,6 +266,7 @@ class TestServerConnectionTLS(tservers.ServerTestBase):
             client_certs = tdata.path(client_certs)
         c = connections.ServerConnection(("127.0.0.1", self.port))
         c.connect()
+        assert c.timestamp_start <= c.timestamp_dns_setup <= c.timestamp_tcp_setup
         c.establish_tls(client_certs=client_certs)
         assert c.connected()
         assert c.tls_established
@@ -5,6 +5,7 @@ import pytest
 from mitmproxy.exceptions import Kill, ControlException
 from mitmproxy import controller
 from mitmproxy.test import taddons
+from mitmproxy.test import tflow
 import mitmproxy.ctx
 
 
@@ -135,3 +136,28 @@ class TestDummyReply:
     def test_del(self):
         reply = controller.DummyReply()
         reply.__del__()
+
+
+@pytest.mark.asyncio
+async def test_channel_unsubscribed():
+    class TAddon:
+        def request(self, f):
+            pass
+
+    with taddons.context(TAddon()) as tctx:
+        m = tctx.master
+        f = tflow.ttcpflow()
+        # Dispatch tables are built lazily, so we don't know about subscribers yet.
+        assert m.addons.has_subscribers("tcp_message", f)
+        await m.addons.handle_lifecycle("tcp_message", f)
+        assert not m.addons.has_subscribers("tcp_message", f)
+
+        # The loop is not running, so this would block forever if the message
+        # was sent to the master.
+        assert m.channel.ask("tcp_message", f) is f
+        assert f.reply.state == "committed"
+        m.channel.tell("tcp_message", f)
+
+        f = tflow.tflow()
+        await m.addons.handle_lifecycle("request", f)
+        assert m.addons.has_subscribers("request", f)
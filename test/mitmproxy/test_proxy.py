@@ -67,6 +67,27 @@ class TestProxyServer:
         with pytest.raises(Exception, match="Error starting proxy server"):
             ProxyServer(conf)
 
+    def test_worker_pool(self):
+        conf = ProxyConfig(options.Options(
+            listen_host="127.0.0.1",
+            listen_port=0,
+            connection_workers=4,
+            connection_queue_size=8,
+            connection_queue_full="error",
+        ))
+        s = ProxyServer(conf)
+        try:
+            assert s.worker_pool.max_workers == 4
+            assert s.worker_pool.queue.maxsize == 8
+            conn = mock.Mock()
+            s.handle_rejected(conn, ("127.0.0.1", 1234))
+            conn.setblocking.assert_called_with(False)
+            assert b"503 Service Unavailable" in conn.send.call_args[0][0]
+            conn.send.side_effect = BlockingIOError()
+            s.handle_rejected(conn, ("127.0.0.1", 1234))
+        finally:
+            s.socket.close()
+
 
 class TestDummyServer:
 
@@ -85,6 +85,7 @@ export default function(){
             22
         ],
         "ssl_established": false,
+        "timestamp_dns_setup": 1.5,
         "timestamp_end": 4.0,
         "timestamp_ssl_setup": 3.0,
         "timestamp_start": 1.0,
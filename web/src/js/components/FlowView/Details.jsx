@@ -64,6 +64,10 @@ export function Timing({ flow }) {
             title: "Server conn. initiated",
             t: sc.timestamp_start,
             deltaTo: req.timestamp_start
+        }, {
+            title: "Server conn. name resolved",
+            t: sc.timestamp_dns_setup,
+            deltaTo: req.timestamp_start
         }, {
             title: "Server conn. TCP handshake",
             t: sc.timestamp_tcp_setup,